@@ -0,0 +1 @@
+@call "%~dp0..\tools\py.cmd" "%~dp0fitparquet" %*
@@ -20,9 +20,14 @@ from .exceptions import *
 from .records import *
 from .reader import *
 from .processors import *
+from .columns import *
+from .index import *
 
 from . import types
 from . import profile
 from . import utils
 from . import processors
 from . import reader
+from . import columns
+from . import index
+from . import batch
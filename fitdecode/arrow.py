@@ -0,0 +1,411 @@
+# fitdecode
+#
+# Copyright (c) 2018-2019 Jean-Charles Lefebvre
+# All rights reserved.
+#
+# This code is licensed under the MIT License.
+# See the LICENSE.txt file at the root of this project.
+
+"""
+Export of FIT data messages to Apache Arrow record batches and tables, and to
+Parquet files.
+
+This module is built on top of `fitdecode.columns`. pyarrow and NumPy are
+optional dependencies of fitdecode, imported on demand by the functions of
+this module only.
+"""
+
+import os.path
+
+from . import columns as _columns
+from .processors import FIT_UTC_REFERENCE
+from .reader import FitReader
+
+__all__ = [
+    'DEFAULT_BATCH_SIZE',
+    'iter_batches', 'read_tables', 'read_table', 'write_parquet']
+
+
+#: Default maximum number of rows of the record batches
+DEFAULT_BATCH_SIZE = 64 * 1024
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError('fitdecode.arrow requires pyarrow') from None
+    return pyarrow
+
+
+# struct format character to Arrow type factory name
+_ARROW_TYPES = {
+    'b': 'int8', 'B': 'uint8',
+    'h': 'int16', 'H': 'uint16',
+    'i': 'int32', 'I': 'uint32',
+    'q': 'int64', 'Q': 'uint64',
+    'f': 'float32', 'd': 'float64',
+    's': 'string'}
+
+
+def _arrow_field(pa, name, field_def, scaled, is_array):
+    # the `pyarrow.Field` of a column, which only depends on the profile and
+    # on the first definition of the field met (see
+    # `fitdecode.columns._MesgColumns.fields`), not on its values, so that
+    # every batch of a message type gets the same type
+    field_type = _columns._field_type(name, field_def)
+    if field_type is None:
+        # unknown field
+        base_type = field_def.base_type
+    else:
+        base_type = getattr(field_type, 'base_type', field_type)
+
+    field = getattr(field_def, 'field', None)
+    type_name = getattr(field_type, 'name', None)
+
+    if base_type.fmt == 's':
+        arrow_type = pa.string()
+    elif scaled and (
+            getattr(field, 'scale', None) or getattr(field, 'offset', None)):
+        # see `fitdecode.columns.decode_column`
+        arrow_type = pa.float64()
+    elif type_name in ('date_time', 'local_date_time'):
+        arrow_type = pa.timestamp(
+            's', tz='UTC' if type_name == 'date_time' else None)
+    elif getattr(field_type, 'enum', None):
+        arrow_type = pa.dictionary(pa.int32(), pa.string())
+    else:
+        arrow_type = getattr(pa, _ARROW_TYPES[base_type.fmt])()
+
+    if is_array:
+        arrow_type = pa.list_(arrow_type)
+
+    units = None
+    if field_def is not None and not pa.types.is_timestamp(arrow_type):
+        units = getattr(field, 'units', None)
+
+    return pa.field(
+        name, arrow_type, metadata={'units': units} if units else None)
+
+
+def _to_arrow(pa, np, data, mask, arrow_type, field_type):
+    # convert the one-dimensional *data* of a column built by
+    # `fitdecode.columns._MesgColumns` to an `pyarrow.Array` of *arrow_type*,
+    # *mask* flagging invalid values if not `None`
+    if pa.types.is_string(arrow_type):
+        return pa.array(data.tolist(), type=arrow_type)
+
+    if pa.types.is_timestamp(arrow_type):
+        # date_time fields are converted even if their values are below
+        # `fitdecode.FIT_DATETIME_MIN` (i.e. relative to device power on)
+        return pa.array(
+            data.astype(np.int64) + FIT_UTC_REFERENCE, mask=mask,
+            type=arrow_type)
+
+    if pa.types.is_dictionary(arrow_type):
+        enum = field_type.enum
+        codes, uniques = _columns._enum_codes(np, data, mask)
+        return pa.DictionaryArray.from_arrays(
+            pa.array(codes, mask=mask, type=arrow_type.index_type),
+            pa.array(
+                [str(enum.get(value, value)) for value in uniques],
+                type=arrow_type.value_type))
+
+    # raises if a value does not fit in *arrow_type*
+    return pa.array(data, mask=mask, type=arrow_type)
+
+
+def _to_list_array(pa, np, values, width):
+    # make a `pyarrow.ListArray` of the flat array *values*, *width* values
+    # per row
+    offsets = np.arange(0, len(values) + 1, width, dtype=np.int32)
+    return pa.ListArray.from_arrays(pa.array(offsets), values)
+
+
+def _invalid_array(pa, np, arrow_type, length):
+    # an array of *length* invalid values, like the ones of the rows of the
+    # messages that do not have a given field (see `fitdecode.read_columns`)
+    if pa.types.is_list(arrow_type):
+        return _to_list_array(
+            pa, np, _invalid_array(pa, np, arrow_type.value_type, length), 1)
+    if pa.types.is_floating(arrow_type):
+        return pa.array(np.full(length, np.nan), type=arrow_type)
+    return pa.nulls(length, type=arrow_type)
+
+
+def _to_batch(pa, np, builder, scaled, fields):
+    # empty *builder* into a `pyarrow.RecordBatch`, with the types of
+    # *fields*, the `pyarrow.Field` objects of the message type, by name,
+    # which are completed with the new columns of *builder*
+    arrays = []
+    batch_fields = []
+
+    for name, column in builder.build(scaled).items():
+        field_def = builder.fields.get(name)
+
+        field = fields.get(name)
+        if field is None:
+            field = _arrow_field(pa, name, field_def, scaled, column.ndim > 1)
+            fields[name] = field
+        elif column.ndim > 1 and not pa.types.is_list(field.type):
+            # a definition made an array of the field
+            field = field.with_type(pa.list_(field.type))
+            fields[name] = field
+
+        data = np.ma.getdata(column)
+        mask = None
+        if np.ma.isMaskedArray(column):
+            mask = np.ma.getmaskarray(column).reshape(-1)
+        width = column.shape[1] if column.ndim > 1 else 1
+
+        arrow_type = field.type
+        if pa.types.is_list(arrow_type):
+            arrow_type = arrow_type.value_type
+
+        array = _to_arrow(
+            pa, np, data.reshape(-1), mask, arrow_type,
+            _columns._field_type(name, field_def))
+        if pa.types.is_list(field.type):
+            array = _to_list_array(pa, np, array, width)
+
+        arrays.append(array)
+        batch_fields.append(field)
+
+    return pa.RecordBatch.from_arrays(
+        arrays,
+        schema=pa.schema(batch_fields, metadata={'message': builder.name}))
+
+
+def _unify_schemas(pa, schemas):
+    # the union of *schemas*, the schemas of the batches of a message type
+    # (see `iter_batches`)
+    fields = {}
+    for schema in schemas:
+        for field in schema:
+            known = fields.get(field.name)
+            if known is None or (
+                    pa.types.is_list(field.type) and
+                    not pa.types.is_list(known.type)):
+                fields[field.name] = field
+
+    return pa.schema(fields.values(), metadata=schemas[0].metadata)
+
+
+def _conform(pa, np, batch, schema):
+    # make *batch* match *schema*, which is a union it is part of (see
+    # `_unify_schemas`)
+    arrays = []
+    for field in schema:
+        idx = batch.schema.get_field_index(field.name)
+        if idx < 0:
+            array = _invalid_array(pa, np, field.type, batch.num_rows)
+        else:
+            array = batch.column(idx)
+            if array.type != field.type:
+                # a scalar field turned into an array
+                assert field.type == pa.list_(array.type)
+                array = _to_list_array(pa, np, array, 1)
+        arrays.append(array)
+
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def _to_table(pa, np, batches):
+    # concatenate *batches* into a `pyarrow.Table`, with a schema that is the
+    # union of the ones of *batches*
+    schema = _unify_schemas(pa, [batch.schema for batch in batches])
+    return pa.Table.from_batches(
+        [_conform(pa, np, batch, schema) for batch in batches], schema=schema)
+
+
+class _ParquetSink:
+    """
+    Writes the record batches of a message type to a Parquet file, one row
+    group per batch.
+
+    The file is rewritten in the rare case a batch does not fit its schema,
+    which is the one of the first batch: when the file redefines the message
+    type with new fields, or turns a scalar field into an array.
+    """
+
+    def __init__(self, pa, np, pq, path, compression):
+        self.pa = pa
+        self.np = np
+        self.pq = pq
+        self.path = path
+        self.compression = compression
+        self.schema = None
+        self._writer = None
+
+    def write(self, batch):
+        if self._writer is None:
+            self._open(batch.schema)
+        else:
+            schema = _unify_schemas(self.pa, [self.schema, batch.schema])
+            if not schema.equals(self.schema):
+                self._rewrite(schema)
+
+        self._writer.write_table(self.pa.Table.from_batches(
+            [_conform(self.pa, self.np, batch, self.schema)]))
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def _open(self, schema):
+        self.schema = schema
+        self._writer = self.pq.ParquetWriter(
+            self.path, schema, compression=self.compression)
+
+    def _rewrite(self, schema):
+        self.close()
+        old_schema = self.schema
+
+        old_path = self.path + '.tmp'
+        os.replace(self.path, old_path)
+        try:
+            self._open(schema)
+            old_file = self.pq.ParquetFile(old_path)
+            for index in range(old_file.num_row_groups):
+                # Parquet has no timestamp[s] type
+                table = old_file.read_row_group(index).cast(old_schema)
+                for batch in table.to_batches():
+                    self._writer.write_table(self.pa.Table.from_batches(
+                        [_conform(self.pa, self.np, batch, schema)]))
+        finally:
+            os.remove(old_path)
+
+
+def iter_batches(fileish, mesgs=None, fields=None, *,
+                 batch_size=DEFAULT_BATCH_SIZE, scaled=True, **kwargs):
+    """
+    Decode the data messages of a FIT file into `pyarrow.RecordBatch` objects
+    of at most *batch_size* rows, without ever holding more than *batch_size*
+    undecoded messages per message type.
+
+    Yield ``(message_name, record_batch)`` pairs.
+
+    Arguments have the same meaning than for `fitdecode.read_columns`, and
+    columns are built the same way, except that:
+
+    * ``date_time`` fields are ``timestamp[s, tz=UTC]`` columns, including
+      the values below `fitdecode.FIT_DATETIME_MIN` (i.e. relative to device
+      power on), and ``local_date_time`` fields are ``timestamp[s]`` columns
+    * Fields of an enumerated type are dictionary-encoded strings
+    * Array fields are ``list`` columns
+    * Integer columns have the base type of the field in the profile, or in
+      the first definition of the field met if it is not in the profile
+
+    The type of a column does not depend on the values of a batch, so that
+    all the batches of a message type get the same types.
+
+    The units of fields are stored in the ``units`` metadata key of their
+    `pyarrow.Field`, and the name of the message type in the ``message``
+    metadata key of the schema.
+
+    The schemas of the batches of a given message type may still differ in
+    case the file redefines this type with other fields, or turns a field into
+    an array, in which case the column becomes a ``list`` column from then on.
+    `read_tables` unifies them.
+    """
+    pa = _import_pyarrow()
+    np = _columns._import_numpy()
+
+    batch_size = max(1, batch_size)
+    builders = {}
+    schemas = {}  # builder: the `pyarrow.Field` objects of its columns
+
+    for builder in _columns._feed_columns(
+            fileish, mesgs, fields, kwargs, builders):
+        if len(builder) >= batch_size:
+            yield builder.name, _to_batch(
+                pa, np, builder, scaled, schemas.setdefault(builder, {}))
+
+    for builder in builders.values():
+        if len(builder):
+            yield builder.name, _to_batch(
+                pa, np, builder, scaled, schemas.setdefault(builder, {}))
+
+
+def read_tables(fileish, mesgs=None, fields=None, *,
+                batch_size=DEFAULT_BATCH_SIZE, scaled=True, **kwargs):
+    """
+    Decode the data messages of a FIT file into one `pyarrow.Table` per
+    message type, keyed by message name, and made of the record batches
+    yielded by `iter_batches`.
+    """
+    pa = _import_pyarrow()
+    np = _columns._import_numpy()
+
+    batches = {}
+    for name, batch in iter_batches(
+            fileish, mesgs, fields,
+            batch_size=batch_size, scaled=scaled, **kwargs):
+        batches.setdefault(name, []).append(batch)
+
+    return {
+        name: _to_table(pa, np, mesg_batches)
+        for name, mesg_batches in batches.items()}
+
+
+def read_table(fileish, mesg='record', fields=None, **kwargs):
+    """
+    Decode the data messages of type *mesg* (name or global number) into a
+    `pyarrow.Table`, which is empty if there is no such message.
+
+    *fields* is an optional iterable of field names and/or definition numbers
+    to limit the decoding to. See `read_tables` for the other arguments.
+    """
+    pa = _import_pyarrow()
+
+    (mesg_num, ) = FitReader._resolve_mesg_nums(mesg)
+    tables = read_tables(
+        fileish, (mesg_num, ),
+        None if fields is None else {mesg_num: fields},
+        **kwargs)
+
+    if not tables:
+        return pa.table({})
+
+    (table, ) = tables.values()
+    return table
+
+
+def write_parquet(fileish, outdir, mesgs=None, fields=None, *,
+                  batch_size=DEFAULT_BATCH_SIZE, compression='snappy',
+                  **kwargs):
+    """
+    Convert the data messages of a FIT file into one Parquet file per message
+    type, named after it (e.g. ``record.parquet``), in directory *outdir*,
+    which is created if needed.
+
+    Record batches are written as they are decoded (see `iter_batches`), one
+    row group each, so that the row groups of the Parquet files are
+    *batch_size* rows long at most. See `read_tables` for the other
+    arguments.
+
+    Return a `dict` that maps message names to the path of their Parquet file.
+    """
+    pa = _import_pyarrow()
+    np = _columns._import_numpy()
+    import pyarrow.parquet as pq
+
+    os.makedirs(outdir, exist_ok=True)
+
+    sinks = {}
+    try:
+        for name, batch in iter_batches(
+                fileish, mesgs, fields, batch_size=batch_size, **kwargs):
+            sink = sinks.get(name)
+            if sink is None:
+                sink = _ParquetSink(
+                    pa, np, pq, os.path.join(outdir, name + '.parquet'),
+                    compression)
+                sinks[name] = sink
+            sink.write(batch)
+    finally:
+        for sink in sinks.values():
+            sink.close()
+
+    return {name: sink.path for name, sink in sinks.items()}
@@ -0,0 +1,263 @@
+# fitdecode
+#
+# Copyright (c) 2018-2019 Jean-Charles Lefebvre
+# All rights reserved.
+#
+# This code is licensed under the MIT License.
+# See the LICENSE.txt file at the root of this project.
+
+"""
+Decoding of many FIT files in parallel, by a pool of worker processes.
+
+Decoding is CPU-bound, so that reading several files concurrently with threads
+does not make it any faster. The functions of this module distribute files
+over worker processes instead, and only the results computed from each file by
+a user-supplied function are sent back to the calling process, not the frames.
+
+The FIT files embedded in a chained FIT file can be decoded in parallel the
+same way (`decode_chained`).
+"""
+
+import collections
+import itertools
+import os
+import struct
+
+from .exceptions import FitHeaderError
+from .reader import FitReader
+
+__all__ = [
+    'FitSegment', 'map_files', 'decode_many', 'scan_chain', 'decode_chained']
+
+
+#: The location of a FIT file embedded in a chained FIT file: *index* is its
+#: index number in the chain, and *offset* and *size* are the ones of the
+#: whole embedded file in the file at *path*, from its header to its CRC
+#: footer
+FitSegment = collections.namedtuple(
+    'FitSegment', ('path', 'index', 'offset', 'size'))
+
+# the fixed part of a FIT header (see `FitReader._read_header`)
+_HEADER_STRUCT = struct.Struct('<2BHI4s')
+
+
+def _iter_chunks(paths, chunksize):
+    # group *paths* into lists of *chunksize* items, lazily
+    paths = iter(paths)
+    while True:
+        chunk = list(itertools.islice(paths, chunksize))
+        if not chunk:
+            break
+        yield chunk
+
+
+def _call_chunk(func, paths, args):
+    # call *func* for each path of *paths*, catching errors so that a failing
+    # file does not prevent the others of the chunk from being processed
+    results = []
+    for path in paths:
+        try:
+            results.append((path, func(path, *args), None))
+        except Exception as exc:
+            results.append((path, None, exc))
+    return results
+
+
+def _pool_results(func, chunks, args, workers, ordered, max_pending):
+    # yield the results of the chunks processed by a pool of *workers*, with
+    # at most *max_pending* chunks being submitted but not yielded yet
+
+    # imported on demand, since it weighs on the import time of fitdecode (it
+    # imports logging), which matters to short-lived processes
+    import concurrent.futures
+
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers) as executor:
+        pending = collections.deque() if ordered else set()
+        add = pending.append if ordered else pending.add
+
+        try:
+            while True:
+                for chunk in itertools.islice(
+                        chunks, max_pending - len(pending)):
+                    add(executor.submit(_call_chunk, func, chunk, args))
+
+                if not pending:
+                    break
+
+                if ordered:
+                    yield pending.popleft().result()
+                else:
+                    done, pending = concurrent.futures.wait(
+                        pending,
+                        return_when=concurrent.futures.FIRST_COMPLETED)
+                    add = pending.add
+                    for future in done:
+                        yield future.result()
+        finally:
+            # in case the caller stopped iterating
+            for future in pending:
+                future.cancel()
+
+
+def map_files(func, paths, args=(), *, workers=None, chunksize=1,
+              ordered=True, max_pending=None, return_exceptions=False):
+    """
+    Call ``func(path, *args)`` for each path of *paths*, in a pool of
+    *workers* processes, and yield ``(path, result)`` pairs.
+
+    *func*, *args* and results must be picklable, which means that *func* must
+    be a module-level function.
+
+    *workers* defaults to the number of CPUs. If it is ``1``, files are
+    processed by the current process, without a pool.
+
+    Paths are sent to workers by lists of *chunksize* items, which reduces the
+    inter-process communication overhead when files are small and numerous.
+
+    If *ordered* is true, results are yielded in the order of *paths*,
+    otherwise as soon as they are available.
+
+    Backpressure: at most *max_pending* chunks (defaults to twice the number
+    of workers) are submitted to the pool and not yielded yet, so that
+    neither the results nor *paths*, which can be a generator, are consumed
+    faster than the caller iterates.
+
+    An exception raised by *func* is raised by this generator, unless
+    *return_exceptions* is true, in which case it is yielded as the result of
+    its file.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if chunksize < 1:
+        raise ValueError('chunksize must be greater than 0')
+    if max_pending is None:
+        max_pending = 2 * workers
+    elif max_pending < 1:
+        raise ValueError('max_pending must be greater than 0')
+
+    chunks = _iter_chunks(paths, chunksize)
+
+    if workers <= 1:
+        results = (_call_chunk(func, chunk, args) for chunk in chunks)
+    else:
+        results = _pool_results(
+            func, chunks, args, workers, ordered, max_pending)
+
+    for chunk_results in results:
+        for path, result, exc in chunk_results:
+            if exc is not None:
+                if not return_exceptions:
+                    raise exc
+                result = exc
+
+            yield path, result
+
+
+def _decode(path, func, reader_kwargs):
+    with FitReader(path, **reader_kwargs) as fit:
+        return func(fit)
+
+
+def decode_many(paths, func, *, workers=None, chunksize=1, ordered=True,
+                max_pending=None, return_exceptions=False, **kwargs):
+    """
+    Decode the FIT files of *paths* in a pool of *workers* processes, and
+    yield ``(path, result)`` pairs.
+
+    For each file, ``func(reader)`` is called by a worker process with a
+    `FitReader` over the file, created with *kwargs*. *func* reduces the file
+    to a compact, picklable result (e.g. the summary of an activity, or a
+    `dict` of columns), which is all that is sent back to the calling process.
+
+    Example::
+
+        def max_heart_rate(fit):
+            return max((
+                frame.get_value('heart_rate', fallback=0)
+                for frame in fit
+                if isinstance(frame, fitdecode.FitDataMessage)),
+                default=None)
+
+        for path, max_hr in fitdecode.batch.decode_many(
+                paths, max_heart_rate, include=['record']):
+            print(path, max_hr)
+
+    See `map_files` for the other arguments. *kwargs* must be picklable too.
+    """
+    return map_files(
+        _decode, paths, (func, kwargs),
+        workers=workers, chunksize=chunksize, ordered=ordered,
+        max_pending=max_pending, return_exceptions=return_exceptions)
+
+
+def scan_chain(path):
+    """
+    Locate the FIT files embedded in the file at *path*, which may be a
+    so-called chained FIT file (i.e. concatenated FIT files).
+
+    Only the headers of the files are read, by seeking from one to the next
+    according to their ``body_size``. Records and CRC are neither read nor
+    checked.
+
+    Return a `list` of `FitSegment` objects. The last one may be truncated,
+    which is only detected by decoding it.
+
+    Raise `FitHeaderError` if a malformed header is met.
+    """
+    path = os.fspath(path)
+    segments = []
+
+    with open(path, mode='rb') as fd:
+        offset = 0
+        while True:
+            fd.seek(offset)
+            chunk = fd.read(_HEADER_STRUCT.size)
+            if not chunk:
+                break
+
+            if len(chunk) < _HEADER_STRUCT.size:
+                raise FitHeaderError(f'file too small (header @ {offset})')
+
+            header_size, _, _, body_size, header_magic = \
+                _HEADER_STRUCT.unpack(chunk)
+            if header_size < len(chunk) or header_magic != b'.FIT':
+                raise FitHeaderError(f'not a FIT file (header @ {offset})')
+
+            size = header_size + body_size + 2  # CRC footer
+            segments.append(FitSegment(path, len(segments), offset, size))
+            offset += size
+
+    return segments
+
+
+def _decode_segment(segment, func, reader_kwargs):
+    with open(segment.path, mode='rb') as fd:
+        fd.seek(segment.offset)
+        data = fd.read(segment.size)
+
+    with FitReader(data, **reader_kwargs) as fit:
+        return func(fit)
+
+
+def decode_chained(path, func, *, workers=None, ordered=True,
+                   max_pending=None, return_exceptions=False, **kwargs):
+    """
+    Decode the FIT files embedded in the chained FIT file at *path*, in a pool
+    of *workers* processes, and yield ``(segment, result)`` pairs, where
+    *segment* is a `FitSegment` object.
+
+    The chain is located first by `scan_chain`, then each embedded file is
+    decoded by a worker like `decode_many` does, with a `FitReader` which
+    state is independent from the one of the previous files, as it would be
+    if the whole file were read sequentially.
+
+    The offsets of the `FitChunk` objects seen by *func* are relative to the
+    beginning of the embedded file (i.e. ``segment.offset``).
+
+    See `map_files` for the other arguments.
+    """
+    return map_files(
+        _decode_segment, scan_chain(path), (func, kwargs),
+        workers=workers, ordered=ordered,
+        max_pending=max_pending, return_exceptions=return_exceptions)
@@ -0,0 +1,177 @@
+# fitdecode
+#
+# Copyright (c) 2018-2019 Jean-Charles Lefebvre
+# All rights reserved.
+#
+# This code is licensed under the MIT License.
+# See the LICENSE.txt file at the root of this project.
+
+"""
+Helpers shared by fitdecode's command line tools, notably to convert several
+FIT files at once
+"""
+
+import argparse
+import glob
+import os
+import os.path
+import sys
+import time
+
+import fitdecode
+import fitdecode.batch
+
+
+def add_input_arguments(parser, output_ext):
+    """
+    Add the ``FITFILE`` positional arguments, and the ``--outdir`` and
+    ``--jobs`` options to *parser*
+    """
+    parser.add_argument(
+        'infiles', metavar='FITFILE', nargs='+',
+        help=(
+            'Input .FIT file(s), glob pattern(s) or directories to scan for ' +
+            '.FIT files (use - for stdin)'))
+
+    parser.add_argument(
+        '-d', '--outdir',
+        help=(
+            f'Directory to output one {output_ext} file per input file ' +
+            'into, mirroring the tree of input files (required if there ' +
+            'are several input files)'))
+
+    parser.add_argument(
+        '-j', '--jobs', type=int, default=1,
+        help=(
+            'Number of input files to convert in parallel ' +
+            '(0 for as many as CPUs; default: %(default)s)'))
+
+
+def mesg_name_or_num(value):
+    """
+    Argument type of the options that accept a message name or a global
+    message number (e.g. ``--filter``)
+    """
+    if value.isdigit():
+        return int(value)
+
+    try:
+        fitdecode.utils.get_mesg_type(value)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(str(exc))
+
+    return value
+
+
+def check_inputs(parser, options):
+    """
+    Validate the input arguments of *options*, and expand them to the list of
+    files to convert in ``options.paths`` if the conversion of several files
+    is requested (i.e. several input files, a directory, a glob pattern, or
+    the ``--outdir`` option). ``options.paths`` is `None` otherwise.
+    """
+    options.paths = None
+
+    if not options.outdir and len(options.infiles) == 1:
+        infile = options.infiles[0]
+        if infile == '-' or os.path.isfile(infile):
+            return
+
+    if '-' in options.infiles:
+        parser.error(
+            'stdin cannot be combined with other input files or --outdir')
+
+    options.paths = expand_paths(options.infiles)
+    if not options.paths:
+        parser.error('no input file found')
+
+
+def expand_paths(patterns):
+    """
+    Expand *patterns*, a list of file paths, directories (scanned recursively
+    for ``.fit`` files) and glob patterns, into a sorted list of unique file
+    paths
+    """
+    paths = set()
+
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for dirpath, _, filenames in os.walk(pattern):
+                paths.update(
+                    os.path.join(dirpath, name) for name in filenames
+                    if name.lower().endswith('.fit'))
+        elif os.path.isfile(pattern):
+            paths.add(pattern)
+        else:
+            paths.update(
+                path for path in glob.glob(pattern, recursive=True)
+                if os.path.isfile(path))
+
+    return sorted(paths)
+
+
+def output_path(path, outdir, basedir, ext):
+    """
+    Get the path of the output file of input file *path*, so that the tree of
+    the input files, relative to *basedir*, is mirrored into *outdir*
+    """
+    relpath = os.path.relpath(os.path.abspath(path), basedir)
+    return os.path.join(outdir, os.path.splitext(relpath)[0] + ext)
+
+
+def common_dir(paths):
+    """The deepest directory that is common to all *paths*"""
+    return os.path.commonpath(
+        [os.path.dirname(os.path.abspath(path)) for path in paths])
+
+
+def run_batch(func, paths, args=(), jobs=1, on_output=None):
+    """
+    Call ``func(path, *args)`` for each path of *paths*, in *jobs* worker
+    processes (see `fitdecode.batch.map_files`).
+
+    *func* must return an ``(output, error)`` pair, where *error* is a `str`
+    (e.g. a formatted traceback) in case of failure, `None` otherwise.
+    *on_output* is called in the current process with *output*, in the order
+    of *paths*, for each file that did not fail.
+
+    Errors and a summary are printed to ``stderr``. Return the exit code of
+    the command: 0 if all files were converted successfully, 1 otherwise.
+    """
+    if jobs <= 0:
+        jobs = os.cpu_count() or 1
+
+    start = time.perf_counter()
+    total_size = 0
+    errors = 0
+
+    for path, result in fitdecode.batch.map_files(
+            func, paths, args,
+            workers=min(jobs, len(paths)),
+            chunksize=max(1, min(16, len(paths) // (jobs * 4))),
+            return_exceptions=True):
+        if isinstance(result, Exception):
+            output, error = None, f'{result.__class__.__name__}: {result}'
+        else:
+            output, error = result
+
+        if error:
+            errors += 1
+            # only the last line of tracebacks is worth a summary
+            error = error.rstrip().splitlines()[-1]
+            print(f'ERROR: {path}: {error}', file=sys.stderr)
+            continue
+
+        total_size += os.path.getsize(path)
+        if on_output is not None:
+            on_output(output)
+
+    secs = time.perf_counter() - start
+    mbytes = total_size / (1024 * 1024)
+    print(
+        f'{len(paths)} file(s), {mbytes:.2f} MB converted in {secs:.2f} s ' +
+        f'({mbytes / secs if secs > 0 else 0:.2f} MB/s), ' +
+        f'{errors} error(s)',
+        file=sys.stderr)
+
+    return 1 if errors else 0
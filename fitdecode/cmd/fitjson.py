@@ -9,103 +9,211 @@
 # See the LICENSE.txt file at the root of this project.
 
 import argparse
-from collections import OrderedDict
 import datetime
+import io
 import json
+import os
+import os.path
 import types
 import sys
 import traceback
 
 import fitdecode
-
-
-class RecordJSONEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, types.GeneratorType):
-            return list(obj)
-
-        if isinstance(obj, datetime.time):
-            return obj.isoformat()
-
-        if isinstance(obj, datetime.datetime):
-            return obj.isoformat()
-
-        if isinstance(obj, fitdecode.FitChunk):
-            return OrderedDict((
-                ('index', obj.index),
-                ('offset', obj.offset),
-                ('size', len(obj.bytes))))
-
-        if isinstance(obj, fitdecode.types.FieldDefinition):
-            return OrderedDict((
-                ('name', obj.name),
-                ('def_num', obj.def_num),
-                ('type_name', obj.type.name),
-                ('base_type_name', obj.base_type.name),
-                ('size', obj.size)))
-
-        if isinstance(obj, fitdecode.types.DevFieldDefinition):
-            return OrderedDict((
-                ('name', obj.name),
-                ('dev_data_index', obj.dev_data_index),
-                ('def_num', obj.def_num),
-                ('type_name', obj.type.name),
-                ('size', obj.size)))
-
-        if isinstance(obj, fitdecode.types.FieldData):
-            return OrderedDict((
-                ('name', obj.name),
-                ('value', obj.value),
-                ('units', obj.units if obj.units else ''),
-                ('def_num', obj.def_num),
-                ('raw_value', obj.raw_value)))
-
-        if isinstance(obj, fitdecode.FitHeader):
-            crc = obj.crc if obj.crc else 0
-            return OrderedDict((
-                ('frame_type', 'header'),
-                ('header_size', obj.header_size),
-                ('proto_ver', obj.proto_ver),
-                ('profile_ver', obj.profile_ver),
-                ('body_size', obj.body_size),
-                ('crc', f'{crc:#06x}'),
-                ('crc_matched', obj.crc_matched),
-                ('chunk', obj.chunk)))
-
-        if isinstance(obj, fitdecode.FitCRC):
-            return OrderedDict((
-                ('frame_type', 'crc'),
-                ('crc', f'{obj.crc:#06x}'),
-                ('matched', obj.matched),
-                ('chunk', obj.chunk)))
-
-        if isinstance(obj, fitdecode.FitDefinitionMessage):
-            return OrderedDict((
-                ('frame_type', 'definition_message'),
-                ('name', obj.name),
-                ('header', OrderedDict((
-                    ('local_mesg_num', obj.local_mesg_num),
-                    ('time_offset', obj.time_offset),
-                    ('is_developer_data', obj.is_developer_data)))),
-                ('global_mesg_num', obj.global_mesg_num),
-                ('endian', obj.endian),
-                ('field_defs', obj.field_defs),
-                ('dev_field_defs', obj.dev_field_defs),
-                ('chunk', obj.chunk)))
-
-        if isinstance(obj, fitdecode.FitDataMessage):
-            return OrderedDict((
-                ('frame_type', 'data_message'),
-                ('name', obj.name),
-                ('header', OrderedDict((
-                    ('local_mesg_num', obj.local_mesg_num),
-                    ('time_offset', obj.time_offset),
-                    ('is_developer_data', obj.is_developer_data)))),
-                ('fields', obj.fields),
-                ('chunk', obj.chunk)))
-
-        # fall back to original to raise a TypeError
-        return super().default(obj)
+from fitdecode.cmd import common
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _json_default(obj):
+    # encode the values that are not natively supported by the JSON backend
+    if isinstance(obj, (datetime.datetime, datetime.time)):
+        return obj.isoformat()
+
+    if isinstance(obj, types.GeneratorType):
+        return list(obj)
+
+    raise TypeError(
+        f'Object of type {obj.__class__.__name__} is not JSON serializable')
+
+
+class FrameJSONEncoder:
+    """
+    Encode frames to JSON.
+
+    Frames are converted by a method selected by their ``frame_type``, and the
+    name and definition number of fields are computed only once per field
+    definition.
+
+    In *compact* mode, raw chunks and raw values are not output, and JSON is
+    written without whitespaces.
+
+    If *use_orjson* is true, `orjson` is used as a backend instead of `json`,
+    which is faster. Its output encodes the same values, but is always written
+    without whitespaces, does not escape non-ASCII characters, and may format
+    numbers differently (e.g. ``0.00002`` instead of ``2e-05``).
+
+    *tags* is an optional `dict` of extra keys, output first in every frame.
+    """
+
+    def __init__(self, compact=False, use_orjson=False, tags=None):
+        self.compact = compact
+        self.tags = tags
+        self._field_keys = {}
+
+        if use_orjson:
+            if orjson is None:
+                raise ImportError('orjson is not installed')
+
+            # dates and times are encoded by _json_default, like by json
+            self._dumps = lambda obj: orjson.dumps(
+                obj, default=_json_default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME).decode('utf-8')
+            self.item_separator = ','
+        else:
+            self._dumps = json.JSONEncoder(
+                check_circular=False,
+                separators=(',', ':') if compact else None,
+                default=_json_default).encode
+            self.item_separator = ',' if compact else ', '
+
+        self._converters = {
+            fitdecode.FIT_FRAME_HEADER: self._convert_header,
+            fitdecode.FIT_FRAME_CRC: self._convert_crc,
+            fitdecode.FIT_FRAME_DEFMESG: self._convert_definition_message,
+            fitdecode.FIT_FRAME_DATAMESG: self._convert_data_message}
+
+    def encode(self, frame):
+        obj = self._converters[frame.frame_type](frame)
+        if self.tags:
+            obj = {**self.tags, **obj}
+        return self._dumps(obj)
+
+    def _convert_chunk(self, obj, chunk):
+        if not self.compact:
+            obj['chunk'] = None if chunk is None else {
+                'index': chunk.index,
+                'offset': chunk.offset,
+                'size': len(chunk.bytes)}
+        return obj
+
+    def _convert_header(self, frame):
+        crc = frame.crc if frame.crc else 0
+        return self._convert_chunk({
+            'frame_type': 'header',
+            'header_size': frame.header_size,
+            'proto_ver': frame.proto_ver,
+            'profile_ver': frame.profile_ver,
+            'body_size': frame.body_size,
+            'crc': f'{crc:#06x}',
+            'crc_matched': frame.crc_matched}, frame.chunk)
+
+    def _convert_crc(self, frame):
+        return self._convert_chunk({
+            'frame_type': 'crc',
+            'crc': f'{frame.crc:#06x}',
+            'matched': frame.matched}, frame.chunk)
+
+    def _convert_definition_message(self, frame):
+        return self._convert_chunk({
+            'frame_type': 'definition_message',
+            'name': frame.name,
+            'header': {
+                'local_mesg_num': frame.local_mesg_num,
+                'time_offset': frame.time_offset,
+                'is_developer_data': frame.is_developer_data},
+            'global_mesg_num': frame.global_mesg_num,
+            'endian': frame.endian,
+            'field_defs': [{
+                'name': field_def.name,
+                'def_num': field_def.def_num,
+                'type_name': field_def.type.name,
+                'base_type_name': field_def.base_type.name,
+                'size': field_def.size}
+                for field_def in frame.field_defs],
+            'dev_field_defs': [{
+                'name': field_def.name,
+                'dev_data_index': field_def.dev_data_index,
+                'def_num': field_def.def_num,
+                'type_name': field_def.type.name,
+                'size': field_def.size}
+                for field_def in frame.dev_field_defs]}, frame.chunk)
+
+    def _convert_data_message(self, frame):
+        field_keys = self._field_keys
+        fields = []
+
+        for field_data in frame.fields:
+            key = field_data.field or field_data.field_def
+            try:
+                name, def_num = field_keys[key]
+            except KeyError:
+                name, def_num = field_data.name, field_data.def_num
+                field_keys[key] = (name, def_num)
+
+            if self.compact:
+                fields.append({
+                    'name': name,
+                    'value': field_data.value,
+                    'units': field_data.units if field_data.units else '',
+                    'def_num': def_num})
+            else:
+                fields.append({
+                    'name': name,
+                    'value': field_data.value,
+                    'units': field_data.units if field_data.units else '',
+                    'def_num': def_num,
+                    'raw_value': field_data.raw_value})
+
+        return self._convert_chunk({
+            'frame_type': 'data_message',
+            'name': frame.name,
+            'header': {
+                'local_mesg_num': frame.local_mesg_num,
+                'time_offset': frame.time_offset,
+                'is_developer_data': frame.is_developer_data},
+            'fields': fields}, frame.chunk)
+
+
+class JSONArrayWriter:
+    """
+    Write JSON-encoded objects, one at a time, as the items of a JSON array
+    """
+
+    def __init__(self, fp, encoder):
+        self.fp = fp
+        self.encoder = encoder
+        self.count = 0
+
+    def write(self, obj):
+        self.fp.write(self.encoder.item_separator if self.count else '[')
+        self.fp.write(self.encoder.encode(obj))
+        self.count += 1
+
+    def close(self):
+        self.fp.write(']' if self.count else '[]')
+
+
+class NDJSONWriter:
+    """
+    Write JSON-encoded objects, one at a time, one per line (Newline Delimited
+    JSON)
+    """
+
+    def __init__(self, fp, encoder):
+        self.fp = fp
+        self.encoder = encoder
+        self.count = 0
+
+    def write(self, obj):
+        self.fp.write(self.encoder.encode(obj))
+        self.fp.write('\n')
+        self.count += 1
+
+    def close(self):
+        pass
 
 
 def parse_args(args=None):
@@ -118,9 +226,7 @@ def parse_args(args=None):
         default='-',
         help='File to output data into (defaults to stdout)')
 
-    parser.add_argument(
-        'infile', metavar='FITFILE', type=argparse.FileType(mode='rb'),
-        help='Input .FIT file (use - for stdin)')
+    common.add_input_arguments(parser, '.json')
 
     parser.add_argument(
         '--nocrc', action='store_const',
@@ -133,50 +239,116 @@ def parse_args(args=None):
         help="Do not output FIT so-called local message definitions.")
 
     parser.add_argument(
-        '-f', '--filter', action='append',
+        '--compact', action='store_const', const=True,
+        help=(
+            'Do not output raw chunks and raw values, and output JSON ' +
+            'without whitespaces.'))
+
+    parser.add_argument(
+        '--orjson', action='store_const', const=True,
+        help=(
+            'Encode JSON with orjson, which is faster. Output is written ' +
+            'without whitespaces, like with --compact.'))
+
+    parser.add_argument(
+        '--ndjson', action='store_const', const=True,
+        help=(
+            'Output one JSON object per line (NDJSON) instead of a JSON ' +
+            'array. If there are several input files and no --outdir, ' +
+            'they are all output as a single stream, and each object is ' +
+            'tagged with the path of its input file.'))
+
+    parser.add_argument(
+        '-f', '--filter', action='append', type=common.mesg_name_or_num,
         help=(
             'Message name(s) (or global numbers) to filter-in ' +
             '(other messages are then ignored).'))
 
     options = parser.parse_args(args)
 
+    common.check_inputs(parser, options)
+    if options.orjson and orjson is None:
+        parser.error('--orjson requires the orjson package')
+    if options.paths is not None and not (options.outdir or options.ndjson):
+        parser.error('--outdir or --ndjson is required for several files')
+
     return options
 
 
-def main(args=None):
-    options = parse_args(args)
+def convert(infile, output, options, tags=None):
+    """
+    Convert FIT file *infile* to JSON, into text file object *output*.
+
+    Return the formatted traceback of the error that occurred while parsing
+    *infile* if any, in which case *output* might be incomplete.
+    """
+    # frames are written as soon as they are read
+    writer_class = NDJSONWriter if options.ndjson else JSONArrayWriter
+    writer = writer_class(
+        output,
+        FrameJSONEncoder(
+            compact=options.compact, use_orjson=options.orjson, tags=tags))
 
-    frames = []
-    exception_msg = None
     try:
         with fitdecode.FitReader(
-                options.infile,
+                infile,
                 processor=fitdecode.StandardUnitsDataProcessor(),
                 check_crc=options.nocrc,
-                keep_raw_chunks=True) as fit:
+                keep_raw_chunks=not options.compact,
+                include=options.filter) as fit:
             for frame in fit:
                 if options.nodef and isinstance(
                         frame, fitdecode.FitDefinitionMessage):
                     continue
 
-                if (options.filter and
-                        isinstance(frame, (
-                            fitdecode.FitDefinitionMessage,
-                            fitdecode.FitDataMessage)) and
-                        (frame.name not in options.filter) and
-                        (frame.global_mesg_num not in options.filter)):
-                    continue
-
-                frames.append(frame)
+                writer.write(frame)
     except Exception:
+        return traceback.format_exc()
+    finally:
+        writer.close()
+
+    return None
+
+
+def _convert_file(path, options, basedir):
+    # batch mode worker
+    if not options.outdir:
+        # the frames of all the files are output as a single NDJSON stream by
+        # the main process
+        output = io.StringIO()
+        error = convert(path, output, options, tags={'file': path})
+        return output.getvalue(), error
+
+    outpath = common.output_path(path, options.outdir, basedir, '.json')
+    os.makedirs(os.path.dirname(outpath), exist_ok=True)
+    with open(outpath, mode='wt', encoding='utf-8') as output:
+        return None, convert(path, output, options)
+
+
+def main(args=None):
+    options = parse_args(args)
+
+    # file objects cannot be passed to worker processes
+    output, options.output = options.output, None
+
+    if options.paths is not None:
+        return common.run_batch(
+            _convert_file, options.paths,
+            args=(options, common.common_dir(options.paths)),
+            jobs=options.jobs,
+            on_output=None if options.outdir else output.write)
+
+    infile = options.infiles[0]
+    error = convert(
+        sys.stdin.buffer if infile == '-' else infile, output, options)
+
+    if error:
         print(
             ('WARNING: the following error occurred while parsing FIT file. ' +
             'Output file might be incomplete or corrupted.'),
             file=sys.stderr)
         print('', file=sys.stderr)
-        traceback.print_exc()
-
-    json.dump(frames, fp=options.output, cls=RecordJSONEncoder)
+        print(error, end='', file=sys.stderr)
 
     return 0
 
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+#
+# fitdecode
+#
+# Copyright (c) 2018-2019 Jean-Charles Lefebvre
+# All rights reserved.
+#
+# This code is licensed under the MIT License.
+# See the LICENSE.txt file at the root of this project.
+
+import argparse
+import os.path
+import sys
+import traceback
+
+import fitdecode
+import fitdecode.arrow
+from fitdecode.cmd import common
+
+
+def parse_args(args=None):
+    parser = argparse.ArgumentParser(
+        description=(
+            'Convert a FIT file to Parquet format, one file per message type'),
+        epilog='fitdecode version ' + fitdecode.__version__)
+
+    parser.add_argument(
+        '-o', '--outdir',
+        help=(
+            'Directory to output Parquet files into (defaults to the path ' +
+            'of FITFILE without its extension)'))
+
+    parser.add_argument(
+        'infile', metavar='FITFILE', type=argparse.FileType(mode='rb'),
+        help='Input .FIT file (use - for stdin, in which case --outdir is ' +
+             'required)')
+
+    parser.add_argument(
+        '--nocrc', action='store_const',
+        default=fitdecode.CrcCheck.ENABLED,
+        const=fitdecode.CrcCheck.DISABLED,
+        help="Some devices seem to write invalid CRC's, ignore these.")
+
+    parser.add_argument(
+        '--raw', action='store_const', const=True,
+        help='Do not apply scale and offset to values.')
+
+    parser.add_argument(
+        '--batch-size', type=int, default=fitdecode.arrow.DEFAULT_BATCH_SIZE,
+        help=(
+            'Maximum number of rows of record batches and Parquet row ' +
+            'groups (default: %(default)s)'))
+
+    parser.add_argument(
+        '--compression', default='snappy',
+        choices=('none', 'snappy', 'gzip', 'brotli', 'lz4', 'zstd'),
+        help='Parquet compression codec (default: %(default)s)')
+
+    parser.add_argument(
+        '-f', '--filter', action='append', type=common.mesg_name_or_num,
+        help=(
+            'Message name(s) (or global numbers) to filter-in ' +
+            '(other messages are then ignored).'))
+
+    options = parser.parse_args(args)
+
+    if not options.outdir:
+        if options.infile is sys.stdin.buffer:
+            parser.error('--outdir is required when reading from stdin')
+        options.outdir = os.path.splitext(options.infile.name)[0]
+
+    return options
+
+
+def main(args=None):
+    options = parse_args(args)
+
+    try:
+        paths = fitdecode.arrow.write_parquet(
+            options.infile, options.outdir,
+            mesgs=options.filter,
+            batch_size=options.batch_size,
+            compression=options.compression,
+            scaled=not options.raw,
+            check_crc=options.nocrc)
+    except Exception:
+        print(
+            'ERROR: the following error occurred while converting FIT file.',
+            file=sys.stderr)
+        print('', file=sys.stderr)
+        traceback.print_exc()
+        return 1
+
+    for name, path in paths.items():
+        print(path)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
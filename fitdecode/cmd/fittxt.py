@@ -12,11 +12,13 @@ import argparse
 from collections import OrderedDict
 import datetime
 import decimal
+import os
 import os.path
 import sys
 import traceback
 
 import fitdecode
+from fitdecode.cmd import common
 
 echo = None
 
@@ -174,15 +176,15 @@ class PrintableObject:
             self._dict[name] = value
 
 
-def global_stats(frames, options):
+def global_stats(frames, name, options):
     if options.filter:
-        filter_str = '[' + ', '.join(options.filter) + ']'
+        filter_str = '[' + ', '.join(map(str, options.filter)) + ']'
     else:
         filter_str = '[]'
 
     stats = PrintableObject(
         _label='TXT',
-        name=os.path.basename(options.infile.name),
+        name=os.path.basename(name),
         filter=filter_str,
         frames=len(frames),
         size=0,
@@ -291,9 +293,7 @@ def parse_args(args=None):
         default='-',
         help='File to output data into (defaults to stdout)')
 
-    parser.add_argument(
-        'infile', metavar='FITFILE', type=argparse.FileType(mode='rb'),
-        help='Input .FIT file (use - for stdin)')
+    common.add_input_arguments(parser, '.txt')
 
     parser.add_argument(
         '--nocrc', action='store_const',
@@ -310,20 +310,29 @@ def parse_args(args=None):
         help="Do not output the extended global stats in header")
 
     parser.add_argument(
-        '-f', '--filter', action='append',
+        '-f', '--filter', action='append', type=common.mesg_name_or_num,
         help=(
             'Message name(s) (or global numbers) to filter-in ' +
             '(other messages are then ignored).'))
 
     options = parser.parse_args(args)
 
+    common.check_inputs(parser, options)
+    if options.paths is not None and not options.outdir:
+        parser.error('--outdir is required for several files')
+
     return options
 
 
-def main(args=None):
-    options = parse_args(args)
+def convert(infile, name, output, options):
+    """
+    Convert FIT file *infile*, named *name*, to TXT, into text file object
+    *output*.
 
-    def _echo(*objects, sep=' ', end='\n', file=options.output, flush=False):
+    Return the formatted traceback of the error that occurred while parsing
+    *infile* if any, in which case it is also written to *output*.
+    """
+    def _echo(*objects, sep=' ', end='\n', file=output, flush=False):
         print(*objects, sep=sep, end=end, file=file, flush=flush)
 
     def _echo_separator():
@@ -340,37 +349,26 @@ def main(args=None):
     exception_msg = None
     try:
         with fitdecode.FitReader(
-                options.infile,
+                infile,
                 processor=fitdecode.StandardUnitsDataProcessor(),
                 check_crc=options.nocrc,
-                keep_raw_chunks=True) as fit:
+                keep_raw_chunks=True,
+                include=options.filter) as fit:
             for frame in fit:
                 if options.nodef and isinstance(
                         frame, fitdecode.FitDefinitionMessage):
                     continue
 
-                if (options.filter and
-                        isinstance(frame, (
-                            fitdecode.FitDefinitionMessage,
-                            fitdecode.FitDataMessage)) and
-                        (frame.name not in options.filter) and
-                        (frame.global_mesg_num not in options.filter)):
-                    continue
-
                 frames.append(frame)
     except Exception:
-        print(
-            ('WARNING: error(s) occurred while parsing FIT file. ' +
-            'See output file for more info.'),
-            file=sys.stderr)
         exception_msg = traceback.format_exc()
 
     # print some statistics as a header
     if not exception_msg:
-        txt_print(global_stats(frames, options))
+        txt_print(global_stats(frames, name, options))
         echo('')
     else:
-        echo('ERROR OCCURRED WHILE PARSING', options.infile.name)
+        echo('ERROR OCCURRED WHILE PARSING', name)
         echo('')
         echo(exception_msg)
         echo('')
@@ -384,6 +382,41 @@ def main(args=None):
         txt_print(frame)
         echo('')
 
+    return exception_msg
+
+
+def _convert_file(path, options, basedir):
+    # batch mode worker
+    outpath = common.output_path(path, options.outdir, basedir, '.txt')
+    os.makedirs(os.path.dirname(outpath), exist_ok=True)
+    with open(outpath, mode='wt', encoding='utf-8') as output:
+        return None, convert(path, path, output, options)
+
+
+def main(args=None):
+    options = parse_args(args)
+
+    # file objects cannot be passed to worker processes
+    output, options.output = options.output, None
+
+    if options.paths is not None:
+        return common.run_batch(
+            _convert_file, options.paths,
+            args=(options, common.common_dir(options.paths)),
+            jobs=options.jobs)
+
+    infile = options.infiles[0]
+    if infile == '-':
+        error = convert(sys.stdin.buffer, '<stdin>', output, options)
+    else:
+        error = convert(infile, infile, output, options)
+
+    if error:
+        print(
+            ('WARNING: error(s) occurred while parsing FIT file. ' +
+            'See output file for more info.'),
+            file=sys.stderr)
+
     return 0
 
 
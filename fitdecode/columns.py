@@ -0,0 +1,498 @@
+# fitdecode
+#
+# Copyright (c) 2018-2019 Jean-Charles Lefebvre
+# All rights reserved.
+#
+# This code is licensed under the MIT License.
+# See the LICENSE.txt file at the root of this project.
+
+"""
+Columnar decoding of FIT data messages into NumPy arrays and pandas
+DataFrames.
+
+NumPy and pandas are optional dependencies of fitdecode. They are imported on
+demand by the functions of this module only.
+"""
+
+from . import profile
+from . import records
+from . import types
+from .processors import FIT_DATETIME_MIN, FIT_UTC_REFERENCE
+from .reader import DataOutput, FitReader
+
+__all__ = ['read_columns', 'to_columns', 'to_dataframes', 'decode_column']
+
+
+# struct format character to NumPy type code
+_NUMPY_TYPES = {
+    'b': 'i1', 'B': 'u1',
+    'h': 'i2', 'H': 'u2',
+    'i': 'i4', 'I': 'u4',
+    'q': 'i8', 'Q': 'u8',
+    'f': 'f4', 'd': 'f8'}
+
+
+def _import_numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError('fitdecode.columns requires NumPy') from None
+    return numpy
+
+
+def _import_pandas():
+    try:
+        import pandas
+    except ImportError:
+        raise ImportError('fitdecode.to_dataframes requires pandas') from None
+    return pandas
+
+
+class _Layout:
+    """
+    The structured NumPy dtype of the payloads of the data messages that refer
+    to a given `FitDefinitionMessage`, limited to the selected fields
+    """
+
+    __slots__ = ('dtype', 'columns', 'has_timestamp')
+
+    def __init__(self, np, def_mesg, selection):
+        names = []
+        formats = []
+        offsets = []
+        offset = 0
+
+        self.columns = []  # (dtype field name, field_def) pairs
+        self.has_timestamp = False
+
+        for field_def in def_mesg.all_field_defs:
+            base_type = field_def.base_type
+            count = field_def.size // base_type.size
+
+            if count and _is_selected(field_def, selection):
+                if base_type.fmt == 's':
+                    fmt = 'S' + str(field_def.size)
+                else:
+                    fmt = def_mesg.endian + _NUMPY_TYPES[base_type.fmt]
+                    if (count > 1 or base_type.identifier ==
+                            types.BASE_TYPE_BYTE.identifier):
+                        fmt = (fmt, (count, ))
+
+                key = 'f' + str(len(names))
+                names.append(key)
+                formats.append(fmt)
+                offsets.append(offset)
+                self.columns.append((key, field_def))
+
+                if (not field_def.is_dev and
+                        field_def.def_num == profile.FIELD_NUM_TIMESTAMP):
+                    self.has_timestamp = True
+
+            offset += field_def.size
+
+        self.dtype = np.dtype({
+            'names': names,
+            'formats': formats,
+            'offsets': offsets,
+            'itemsize': offset})
+
+
+class _Run:
+    """Consecutive data messages that refer to the same definition message"""
+
+    __slots__ = ('def_mesg', 'payloads', 'timestamps')
+
+    def __init__(self, def_mesg):
+        self.def_mesg = def_mesg
+        self.payloads = []
+        self.timestamps = []  # values of compressed timestamp headers
+
+
+class _MesgColumns:
+    """
+    Accumulates the payloads of the data messages of a given type, and then
+    decodes them into columns, one run of messages at a time.
+
+    *selection* is a `frozenset` of the names and/or definition numbers of the
+    fields to decode, or `None` to decode them all.
+    """
+
+    def __init__(self, name, selection=None):
+        self.name = name
+        self.selection = selection
+        self.fields = {}  # field name: the first `FieldDefinition` met
+        self._runs = []
+        self._layouts = {}
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    def add(self, frame):
+        """Append a `fitdecode.FitDataPayload`"""
+        if not self._runs or self._runs[-1].def_mesg is not frame.def_mesg:
+            self._runs.append(_Run(frame.def_mesg))
+
+        run = self._runs[-1]
+        run.payloads.append(frame.payload)
+        run.timestamps.append(frame.timestamp)
+        self._len += 1
+
+    def build(self, scaled=True):
+        """
+        Decode the accumulated messages and return a `dict` of columns, keyed
+        by field name. The object is then emptied.
+
+        Scale and offset are applied to the columns of the fields that have
+        any, if *scaled* is true (see `decode_column`).
+        """
+        np = _import_numpy()
+
+        parts = {}  # field name: list of (start row, values, mask) tuples
+        start = 0
+
+        for run in self._runs:
+            try:
+                layout = self._layouts[run.def_mesg]
+            except KeyError:
+                layout = _Layout(np, run.def_mesg, self.selection)
+                self._layouts[run.def_mesg] = layout
+
+            count = len(run.payloads)
+            data = np.frombuffer(
+                b''.join(run.payloads), dtype=layout.dtype, count=count)
+
+            for key, field_def in layout.columns:
+                self.fields.setdefault(field_def.name, field_def)
+                parts.setdefault(field_def.name, []).append(
+                    (start, ) + _raw_column(np, data[key], field_def.base_type))
+
+            if not layout.has_timestamp and (
+                    self.selection is None or
+                    profile.FIELD_TYPE_TIMESTAMP.name in self.selection or
+                    profile.FIELD_NUM_TIMESTAMP in self.selection):
+                timestamps = run.timestamps
+                if any(ts is not None for ts in timestamps):
+                    mask = np.fromiter(
+                        (ts is None for ts in timestamps), bool, count)
+                    values = np.fromiter(
+                        (0 if ts is None else ts for ts in timestamps),
+                        np.uint32, count)
+                    parts.setdefault(
+                        profile.FIELD_TYPE_TIMESTAMP.name, []).append(
+                            (start, values, mask))
+
+            start += count
+
+        columns = {}
+        for name, column_parts in parts.items():
+            field_def = self.fields.get(name)
+            columns[name] = decode_column(
+                *_join_column(np, column_parts, start),
+                field=field_def.field if field_def and scaled else None)
+
+        self._runs = []
+        self._len = 0
+
+        return columns
+
+
+def _is_selected(field_def, selection):
+    if selection is None:
+        return True
+    if field_def.name in selection:
+        return True
+    return not field_def.is_dev and field_def.def_num in selection
+
+
+def _raw_column(np, values, base_type):
+    # get the (values, mask) pair of a raw column, where *mask* flags invalid
+    # values, or is `None` if *values* is a float or object array, in which
+    # case invalid values are NaN or `None` respectively
+    if base_type.fmt == 's':
+        values = np.array(
+            [types.parse_string(value) for value in values.tolist()],
+            dtype=object)
+        return values, None
+
+    if base_type.identifier == types.BASE_TYPE_BYTE.identifier:
+        mask = np.all(values == 0xff, axis=1)
+        return values, np.repeat(mask[:, np.newaxis], values.shape[1], axis=1)
+
+    if base_type.invalid is None:
+        # floats: invalid values are NaN already
+        return values, None
+
+    return values, values == base_type.invalid
+
+
+def _join_column(np, parts, length):
+    # concatenate the parts of a column into a single array of *length* rows,
+    # rows not covered by any part being invalid. Return a (values, mask)
+    # pair, *mask* being `None` if values do not need one
+    dtype = np.result_type(*(values.dtype for _, values, _ in parts))
+    if dtype.kind != 'O':
+        dtype = dtype.newbyteorder('=')
+    width = max(values.shape[1:] for _, values, _ in parts)
+    masked = any(mask is not None for _, _, mask in parts)
+
+    if width:
+        # the size of an array field may differ between definitions
+        parts = [
+            (start, values.reshape(-1, 1), None if mask is None else
+                mask.reshape(-1, 1))
+            if values.ndim == 1 else (start, values, mask)
+            for start, values, mask in parts]
+
+    if dtype.kind == 'O':
+        column = np.full((length, ) + width, None, dtype=object)
+    elif dtype.kind == 'f':
+        column = np.full((length, ) + width, np.nan, dtype=dtype)
+    else:
+        column = np.zeros((length, ) + width, dtype=dtype)
+
+    if masked:
+        mask = np.ones(column.shape, dtype=bool)
+
+    for start, values, values_mask in parts:
+        rows = slice(start, start + values.shape[0])
+        cols = tuple(slice(0, size) for size in values.shape[1:])
+        column[(rows, ) + cols] = values
+        if masked:
+            mask[(rows, ) + cols] = (
+                False if values_mask is None else values_mask)
+
+    return column, mask if masked else None
+
+
+def decode_column(values, mask=None, field=None):
+    """
+    Vectorized counterpart of the decoding of the raw values of a field, for
+    a whole column at once.
+
+    *values* is a NumPy array of raw values, and *mask* an optional array of
+    the same shape that flags invalid values.
+
+    If *field* is a `fitdecode.types.Field` (or any object with ``scale`` and
+    ``offset`` attributes) that has a scale and/or an offset, they are applied
+    and a ``float64`` array is returned with invalid values set to NaN.
+    Otherwise, numeric *values* are returned as a `numpy.ma.MaskedArray` if a
+    *mask* is given, or as-is.
+    """
+    np = _import_numpy()
+
+    scale = getattr(field, 'scale', None)
+    offset = getattr(field, 'offset', None)
+
+    if (scale or offset) and values.dtype.kind in 'iuf':
+        values = values.astype(np.float64)
+        if scale:
+            values /= scale
+        if offset:
+            values -= offset
+        if mask is not None:
+            values[mask] = np.nan
+        return values
+
+    if mask is not None:
+        return np.ma.MaskedArray(values, mask=mask, shrink=False)
+
+    return values
+
+
+def _feed_columns(fileish, mesgs, fields, reader_kwargs, builders):
+    # feed *builders*, a dict of `_MesgColumns` objects keyed by global message
+    # number, with the data messages of *fileish*, and yield each builder right
+    # after it has been fed
+    selections = FitReader._resolve_projection(fields)
+
+    reader_kwargs.setdefault('processor', None)
+    reader_kwargs['output'] = DataOutput.PAYLOADS
+    reader_kwargs['include'] = mesgs
+
+    with FitReader(fileish, **reader_kwargs) as reader:
+        for frame in reader:
+            if frame.frame_type != records.FIT_FRAME_DATAPAYLOAD:
+                continue
+
+            mesg_num = frame.def_mesg.global_mesg_num
+            try:
+                builder = builders[mesg_num]
+            except KeyError:
+                builder = _MesgColumns(
+                    frame.def_mesg.name, selections.get(mesg_num))
+                builders[mesg_num] = builder
+
+            builder.add(frame)
+            yield builder
+
+
+def _read_columns(fileish, mesgs, fields, reader_kwargs):
+    builders = {}
+    for _ in _feed_columns(fileish, mesgs, fields, reader_kwargs, builders):
+        pass
+    return builders
+
+
+def read_columns(fileish, mesgs=None, fields=None, *, scaled=True, **kwargs):
+    """
+    Decode the data messages of a FIT file into columns of values.
+
+    Return a `dict` that maps message names to `dict` objects of columns, which
+    map field names to NumPy arrays, one row per message.
+
+    *fileish* can be anything accepted by `fitdecode.FitReader`. *mesgs* and
+    *fields* have the same meaning than the *include* and *fields* arguments
+    of `fitdecode.FitReader` respectively. Extra keyword arguments are passed
+    to `fitdecode.FitReader` as well.
+
+    Payloads are not decoded one message at a time, but one run of consecutive
+    messages that refer to the same definition message at a time, with a
+    structured dtype.
+
+    If *scaled* is true, scale and offset are applied to the values of the
+    fields that have any, in which case their columns are ``float64`` arrays
+    with invalid values set to NaN. Otherwise, columns hold raw values, and
+    their dtype depends on the base type of the field:
+
+    * Integer columns are `numpy.ma.MaskedArray` objects in which invalid
+      values are masked
+    * Invalid values of float columns are NaN
+    * String columns are arrays of `str` objects, or `None` if invalid
+    * Array fields are two-dimensional columns
+    * Rows of the messages that do not have a given field are invalid
+
+    Subfields are not resolved and components are not expanded. The value of
+    compressed timestamp headers is output as a ``timestamp`` column.
+    """
+    builders = _read_columns(fileish, mesgs, fields, kwargs)
+    return {
+        builder.name: builder.build(scaled)
+        for builder in builders.values()}
+
+
+def to_columns(fileish, mesg='record', fields=None, *, scaled=True,
+               **kwargs):
+    """
+    Decode the data messages of type *mesg* (name or global number) into a
+    `dict` of columns.
+
+    *fields* is an optional iterable of field names and/or definition numbers
+    to limit the decoding to. *scaled* has the same meaning than for
+    `read_columns`.
+
+    This is a shorthand for `read_columns`, which documents the format of the
+    columns.
+    """
+    (mesg_num, ) = FitReader._resolve_mesg_nums(mesg)
+    builders = _read_columns(
+        fileish, (mesg_num, ),
+        None if fields is None else {mesg_num: fields},
+        kwargs)
+
+    try:
+        return builders[mesg_num].build(scaled)
+    except KeyError:
+        return {}
+
+
+def _field_type(name, field_def):
+    # the `FieldType` (or `BaseType`) of a column
+    if field_def is None:
+        if name == profile.FIELD_TYPE_TIMESTAMP.name:
+            return profile.FIELD_TYPE_TIMESTAMP.type
+        return None
+    return getattr(field_def.field, 'type', None)
+
+
+def _time_kind(np, data, mask, field_type):
+    # ``'date_time'`` or ``'local_date_time'`` if integer *data* are to be
+    # converted to absolute times, `None` otherwise
+    type_name = getattr(field_type, 'name', None)
+    if type_name == 'local_date_time':
+        return type_name
+    if type_name == 'date_time':
+        valid = data if mask is None else data[~mask]
+        if not (valid < FIT_DATETIME_MIN).any():
+            return type_name
+    return None
+
+
+def _enum_codes(np, data, mask):
+    # factorize integer *data* into (codes, uniques), invalid values having
+    # code -1
+    uniques = np.unique(data if mask is None else data[~mask])
+    codes = np.searchsorted(uniques, data).astype(np.int32)
+    if mask is not None:
+        codes[mask] = -1
+    return codes, uniques.tolist()
+
+
+def _to_pandas(pd, np, name, column, field_def):
+    # convert a column built by `_MesgColumns` to the data of a pandas column
+    if column.ndim > 1:
+        # array fields: one tuple per row
+        return [tuple(row) for row in column.tolist()]
+
+    data = np.ma.getdata(column)
+    mask = np.ma.getmaskarray(column) if np.ma.isMaskedArray(column) else None
+    if data.dtype.kind not in 'iu':
+        return data
+
+    field_type = _field_type(name, field_def)
+
+    time_kind = _time_kind(np, data, mask, field_type)
+    if time_kind:
+        values = pd.to_datetime(
+            (data.astype(np.int64) + FIT_UTC_REFERENCE) * 1000000000,
+            unit='ns', utc=time_kind == 'date_time')
+        if mask is not None:
+            values = values.where(~mask)
+        return values
+
+    enum = getattr(field_type, 'enum', None)
+    if enum:
+        codes, uniques = _enum_codes(np, data, mask)
+        return pd.Categorical.from_codes(
+            codes, categories=[enum.get(value, value) for value in uniques])
+
+    if mask is not None:
+        return pd.arrays.IntegerArray(data, mask)
+
+    return data
+
+
+def to_dataframes(fileish, mesgs=None, fields=None, *, scaled=True,
+                  **kwargs):
+    """
+    Decode the data messages of a FIT file into `pandas.DataFrame` objects.
+
+    Return a `dict` that maps message names to a `pandas.DataFrame` each, with
+    one column per field, developer fields included, and one row per message.
+
+    Arguments have the same meaning than for `read_columns`, and columns are
+    built the same way, except that:
+
+    * ``date_time`` fields are ``datetime64[ns, UTC]`` columns, unless some of
+      their values are below `fitdecode.FIT_DATETIME_MIN` (i.e. relative to
+      device power on); ``local_date_time`` fields are ``datetime64[ns]``
+    * Fields of an enumerated type are ``category`` columns (values not known
+      by the profile are kept as `int` categories)
+    * Integer columns with invalid values use pandas nullable integer types
+    * Array fields are columns of `tuple` objects
+    """
+    pd = _import_pandas()
+    np = _import_numpy()
+
+    builders = _read_columns(fileish, mesgs, fields, kwargs)
+
+    frames = {}
+    for builder in builders.values():
+        length = len(builder)
+        columns = builder.build(scaled)
+        frames[builder.name] = pd.DataFrame({
+            name: _to_pandas(pd, np, name, column, builder.fields.get(name))
+            for name, column in columns.items()},
+            index=pd.RangeIndex(length))
+
+    return frames
@@ -24,6 +24,7 @@ class FitEOFError(FitError):
         self.expected = expected  #: number of expected bytes
         self.got = got  #: number of bytes read
         self.offset = offset  #: the file offset from which reading took place
+        self._message = message
 
         desc = f'expected {self.expected} bytes, got {self.got} @ {self.offset}'
         if not message:
@@ -33,13 +34,24 @@ class FitEOFError(FitError):
 
         super().__init__(message)
 
+    def __reduce__(self):
+        # so that the exception can be raised by a worker process
+        return (
+            self.__class__,
+            (self.expected, self.got, self.offset, self._message))
+
 
 class FitParseError(FitError):
     def __init__(self, offset, message=''):
         self.offset = offset  #: the file offset from which reading took place
+        self._message = message
 
         desc = 'FIT parsing error @ ' + str(offset)
         if message:
             desc += ': ' + message
 
         super().__init__(desc)
+
+    def __reduce__(self):
+        # so that the exception can be raised by a worker process
+        return (self.__class__, (self.offset, self._message))
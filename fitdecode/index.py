@@ -0,0 +1,391 @@
+# fitdecode
+#
+# Copyright (c) 2018-2019 Jean-Charles Lefebvre
+# All rights reserved.
+#
+# This code is licensed under the MIT License.
+# See the LICENSE.txt file at the root of this project.
+
+"""
+Index of the records of a FIT file, for random access with
+`FitReader.seek`.
+"""
+
+import array
+import bisect
+import collections
+import itertools
+import json
+import os
+import struct
+import sys
+
+from . import records
+from .reader import (
+    CrcCheck, DataOutput, FitReader, _FULLY_DECODED_MESGS, _to_fit_timestamp)
+
+__all__ = [
+    'DEFAULT_CHECKPOINT_INTERVAL', 'FitIndexEntry', 'FitCheckpoint',
+    'FitIndex']
+
+
+#: Default number of records between two checkpoints of a `FitIndex`
+DEFAULT_CHECKPOINT_INTERVAL = 1000
+
+#: The description of a record of a FIT file, as stored by `FitIndex`.
+#: *chunk_index*, *offset* and *size* are the ones of its `FitChunk`.
+#: *frame_type* is one of the ``FIT_FRAME_*`` constants.
+#: *local_mesg_num*, *global_mesg_num* and *def_index* (the *chunk_index* of
+#: the definition message of a data message) are `None` for headers and CRC
+#: footers, and *timestamp* is `None` except for the data messages that have
+#: a ``timestamp`` field or a compressed timestamp header.
+FitIndexEntry = collections.namedtuple(
+    'FitIndexEntry', (
+        'chunk_index', 'frame_type', 'offset', 'size', 'local_mesg_num',
+        'global_mesg_num', 'def_index', 'timestamp'))
+
+#: A point of a FIT file from which `FitReader` can resume reading: the
+#: offset of the record *chunk_index*, the number of bytes left before the
+#: CRC footer of its FIT file, the offsets of the records to read again to
+#: restore the state of the reader (header of the FIT file, developer data and
+#: definition messages), and the opaque state of the reader that depends on
+#: the data messages that precede the record
+FitCheckpoint = collections.namedtuple(
+    'FitCheckpoint', (
+        'chunk_index', 'offset', 'body_bytes_left', 'replay', 'state'))
+
+_MAGIC = b'FITIDX'
+_VERSION = 1
+_NONE_8 = 0xff
+_NONE_16 = 0xffff
+_NONE_32 = 0xffffffff
+
+# name and typecode of the columns of a `FitIndex`
+_COLUMNS = (
+    ('frame_types', 'B'),
+    ('local_mesg_nums', 'B'),
+    ('global_mesg_nums', 'H'),
+    ('offsets', 'Q'),
+    ('sizes', 'I'),
+    ('def_indexes', 'I'),
+    ('timestamps', 'I'))
+
+
+class FitIndex:
+    """
+    The index of the records of a FIT file, that allows `FitReader` to seek
+    to any of them (`FitReader.seek`) without reading the whole file.
+
+    For every record (i.e. every frame, including the ones that `FitReader`
+    would filter out), it stores a `FitIndexEntry`: offset, size, type of
+    message, active definition and timestamp.
+
+    Every *checkpoint_interval* records, it also stores a `FitCheckpoint`,
+    from which the state of the reader (definitions, developer types,
+    timestamps and accumulated fields) can be restored.
+
+    An index is built in a single pass over the file (`build`), without
+    decoding data messages, and can be saved to a sidecar file next to the
+    FIT file (`save`, `load` and `for_file`).
+
+    Usage::
+
+        index = fitdecode.FitIndex.for_file(src_file)
+
+        with fitdecode.FitReader(src_file, index=index) as fit:
+            for chunk_index in index.find_messages('lap'):
+                fit.seek(chunk_index)
+                lap = next(iter(fit))
+    """
+
+    def __init__(self, checkpoint_interval=DEFAULT_CHECKPOINT_INTERVAL):
+        self.checkpoint_interval = checkpoint_interval
+
+        #: the `FitCheckpoint` objects, in file order
+        self.checkpoints = []
+
+        #: the size of the indexed file, if known
+        self.file_size = None
+
+        for name, typecode in _COLUMNS:
+            setattr(self, name, array.array(typecode))
+
+        # lazily built lookup tables
+        self._checkpoint_indexes = None  # see `get_checkpoint`
+        self._max_timestamps = None      # see `find_time`
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, chunk_index):
+        def _value(value, none):
+            return None if value == none else value
+
+        return FitIndexEntry(
+            chunk_index,
+            self.frame_types[chunk_index],
+            self.offsets[chunk_index],
+            self.sizes[chunk_index],
+            _value(self.local_mesg_nums[chunk_index], _NONE_8),
+            _value(self.global_mesg_nums[chunk_index], _NONE_16),
+            _value(self.def_indexes[chunk_index], _NONE_32),
+            _value(self.timestamps[chunk_index], _NONE_32))
+
+    @classmethod
+    def build(cls, fileish, *, checkpoint_interval=DEFAULT_CHECKPOINT_INTERVAL,
+              check_crc=CrcCheck.ENABLED):
+        """
+        Read *fileish* (see `FitReader`) and build its index, with a
+        checkpoint every *checkpoint_interval* records.
+        """
+        index = cls(checkpoint_interval)
+        append_frame_type = index.frame_types.append
+        append_local_mesg_num = index.local_mesg_nums.append
+        append_global_mesg_num = index.global_mesg_nums.append
+        append_offset = index.offsets.append
+        append_size = index.sizes.append
+        append_def_index = index.def_indexes.append
+        append_timestamp = index.timestamps.append
+
+        with FitReader(
+                fileish, processor=None, check_crc=check_crc,
+                output=DataOutput.PAYLOADS) as fit:
+            def_mesgs = {}  # local mesg num: (chunk index, offset)
+            replay = []
+            since_checkpoint = 0
+
+            # the state of the reader is the one of the last yielded frame
+            # (see `FitReader._end_frame`)
+            for frame in fit:
+                chunk_index = fit._chunk_index
+                offset = fit._chunk_offset
+                frame_type = frame.frame_type
+                local_mesg_num = _NONE_8
+                global_mesg_num = _NONE_16
+                def_index = _NONE_32
+                timestamp = _NONE_32
+
+                if frame_type == records.FIT_FRAME_DATAPAYLOAD:
+                    frame_type = records.FIT_FRAME_DATAMESG
+                    def_mesg = frame.def_mesg
+                    local_mesg_num = def_mesg.local_mesg_num
+                    global_mesg_num = def_mesg.global_mesg_num
+                    def_index, def_offset = def_mesgs[local_mesg_num]
+
+                    decoder = def_mesg.decoder
+                    if frame.timestamp is not None:
+                        timestamp = frame.timestamp
+                    elif decoder.timestamp_unpacker is not None:
+                        (value, ) = decoder.timestamp_unpacker.unpack_from(
+                            frame.payload, decoder.timestamp_offset)
+                        ts_field_def = decoder.field_defs[
+                            decoder.timestamp_index]
+                        if value != ts_field_def.base_type.invalid:
+                            timestamp = value
+
+                    if global_mesg_num in _FULLY_DECODED_MESGS:
+                        replay.extend((def_offset, offset))
+
+                elif frame_type == records.FIT_FRAME_DEFMESG:
+                    local_mesg_num = frame.local_mesg_num
+                    global_mesg_num = frame.global_mesg_num
+                    def_mesgs[local_mesg_num] = (chunk_index, offset)
+
+                elif frame_type == records.FIT_FRAME_HEADER:
+                    def_mesgs = {}
+                    replay = [offset]
+
+                append_frame_type(frame_type)
+                append_local_mesg_num(local_mesg_num)
+                append_global_mesg_num(global_mesg_num)
+                append_offset(offset)
+                append_size(fit._chunk_size)
+                append_def_index(def_index)
+                append_timestamp(timestamp)
+
+                since_checkpoint += 1
+                if (since_checkpoint >= checkpoint_interval and
+                        fit._header and fit._body_bytes_left > 0):
+                    since_checkpoint = 0
+                    index.checkpoints.append(FitCheckpoint(
+                        chunk_index + 1,
+                        offset + fit._chunk_size,
+                        fit._body_bytes_left,
+                        replay + sorted(
+                            def_offset
+                            for _, def_offset in def_mesgs.values()),
+                        fit._get_state()))
+
+            index.file_size = fit._chunk_offset + fit._chunk_size
+
+        return index
+
+    def get_checkpoint(self, chunk_index):
+        """
+        Get the last `FitCheckpoint` at or before record *chunk_index*, or
+        `None`.
+        """
+        if self._checkpoint_indexes is None:
+            self._checkpoint_indexes = [
+                checkpoint.chunk_index for checkpoint in self.checkpoints]
+
+        idx = bisect.bisect_right(self._checkpoint_indexes, chunk_index)
+        return self.checkpoints[idx - 1] if idx else None
+
+    def find_messages(self, mesgs):
+        """
+        Get the `list` of the *chunk_index* of the data messages of the given
+        type(s): a message name or global number, or an iterable of them.
+        """
+        if isinstance(mesgs, (str, int)):
+            mesgs = (mesgs, )
+        mesg_nums = FitReader._resolve_mesg_nums(mesgs)
+
+        return [
+            chunk_index
+            for chunk_index, (frame_type, global_mesg_num) in enumerate(
+                zip(self.frame_types, self.global_mesg_nums))
+            if frame_type == records.FIT_FRAME_DATAMESG and
+            global_mesg_num in mesg_nums]
+
+    def find_time(self, start):
+        """
+        Get the *chunk_index* of the first data message which timestamp is
+        *start* or later, or `None`.
+
+        *start* is either a FIT timestamp (`int`) or a `datetime.datetime`
+        object (assumed UTC if naive).
+        """
+        if self._max_timestamps is None:
+            # timestamps are not necessarily monotonic, their running maximum
+            # is
+            self._max_timestamps = list(itertools.accumulate(
+                (0 if value == _NONE_32 else value
+                    for value in self.timestamps),
+                max))
+
+        idx = bisect.bisect_left(
+            self._max_timestamps, max(1, _to_fit_timestamp(start)))
+        return idx if idx < len(self._max_timestamps) else None
+
+    @staticmethod
+    def sidecar_path(path):
+        """The path of the sidecar index file of the FIT file at *path*"""
+        return os.fspath(path) + '.idx'
+
+    @classmethod
+    def for_file(cls, path, *, save=True, **kwargs):
+        """
+        Load the index of the FIT file at *path* from its sidecar file if it
+        is up to date, or build it (see `build` for *kwargs*) and, if *save*
+        is true, save it to its sidecar file.
+        """
+        sidecar_path = cls.sidecar_path(path)
+
+        try:
+            stat = os.stat(path)
+            sidecar_stat = os.stat(sidecar_path)
+        except FileNotFoundError:
+            sidecar_stat = None
+
+        if sidecar_stat and sidecar_stat.st_mtime >= stat.st_mtime:
+            try:
+                index = cls.load(sidecar_path)
+            except ValueError:
+                pass
+            else:
+                if index.file_size == stat.st_size:
+                    return index
+
+        index = cls.build(path, **kwargs)
+        if save:
+            index.save(sidecar_path)
+
+        return index
+
+    def save(self, path):
+        """Save this index to the file at *path*"""
+        meta = json.dumps({
+            'version': _VERSION,
+            'file_size': self.file_size,
+            'records': len(self),
+            'checkpoint_interval': self.checkpoint_interval,
+            'checkpoints': [
+                (checkpoint.chunk_index, checkpoint.offset,
+                    checkpoint.body_bytes_left, checkpoint.replay,
+                    _dump_state(checkpoint.state))
+                for checkpoint in self.checkpoints]},
+            separators=(',', ':')).encode('utf-8')
+
+        with open(path, mode='wb') as fd:
+            fd.write(_MAGIC)
+            fd.write(struct.pack('<I', len(meta)))
+            fd.write(meta)
+
+            for name, _ in _COLUMNS:
+                column = getattr(self, name)
+                if sys.byteorder != 'little':
+                    column = array.array(column.typecode, column)
+                    column.byteswap()
+                column.tofile(fd)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Load an index from the file at *path*. Raise `ValueError` if it is not
+        a valid index file.
+        """
+        with open(path, mode='rb') as fd:
+            if fd.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError('not a FIT index file')
+
+            try:
+                (meta_size, ) = struct.unpack('<I', fd.read(4))
+                meta = json.loads(fd.read(meta_size).decode('utf-8'))
+            except (struct.error, UnicodeDecodeError, json.JSONDecodeError):
+                raise ValueError('malformed FIT index file') from None
+
+            if meta.get('version') != _VERSION:
+                raise ValueError('unsupported FIT index file version')
+
+            index = cls(meta['checkpoint_interval'])
+            index.file_size = meta['file_size']
+            index.checkpoints = [
+                FitCheckpoint(
+                    chunk_index, offset, body_bytes_left, replay,
+                    _load_state(state))
+                for chunk_index, offset, body_bytes_left, replay, state in
+                meta['checkpoints']]
+
+            for name, typecode in _COLUMNS:
+                column = array.array(typecode)
+                try:
+                    column.fromfile(fd, meta['records'])
+                except EOFError:
+                    raise ValueError('truncated FIT index file') from None
+                if sys.byteorder != 'little':
+                    column.byteswap()
+                setattr(index, name, column)
+
+        return index
+
+
+def _dump_state(state):
+    # JSON-compatible copy of the state of a reader
+    last_timestamp, compressed_ts_accumulator, accumulators, \
+        hr_start_timestamp = state
+    return (
+        last_timestamp, compressed_ts_accumulator,
+        [(mesg_num, list(accumulator.items()))
+            for mesg_num, accumulator in accumulators.items()],
+        hr_start_timestamp)
+
+
+def _load_state(state):
+    last_timestamp, compressed_ts_accumulator, accumulators, \
+        hr_start_timestamp = state
+    return (
+        last_timestamp, compressed_ts_accumulator,
+        {mesg_num: dict(accumulator)
+            for mesg_num, accumulator in accumulators},
+        hr_start_timestamp)
@@ -64,11 +64,38 @@ class DataProcessorBase:
     the content of the passed *field_data* (:class:`fitdecode.FieldData`) and
     *data_message* (:class:`fitdecode.FitDataMessage`) arguments if needed.
 
+    In order to avoid this lookup upon every field of every data message,
+    :class:`fitdecode.FitReader` does not call the ``on_process_*`` methods
+    directly. Instead, it calls `get_field_processors` once per distinct field
+    of a given definition message, and `get_message_processor` once per
+    definition message, and then only calls the callables they returned. By
+    default, these methods return the ``on_process_*`` methods that have been
+    overridden by a derived class, or the ``process_*`` methods that exist.
+    Fields without any matching method are skipped entirely.
+
+    By default, the fields of a data message are processed while the message is
+    being read. A processor which field processing methods only depend on the
+    *field_data* they are passed, not on the state of the reader or on the
+    order of the calls, can set its `defers_fields` class attribute so that
+    :class:`fitdecode.FitReader` builds and processes the fields of a message
+    only when they are accessed for the first time. `defers_fields` is not
+    inherited: derived classes must set it too.
+
     .. seealso:: `DefaultDataProcessor`, `StandardUnitsDataProcessor`
     """
 
+    #: can fields be processed on demand? (see above)
+    defers_fields = False
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if 'defers_fields' not in cls.__dict__:
+            cls.defers_fields = False
+
     def __init__(self):
         self._method_cache = {}
+        self._has_units_processors = any(
+            name.startswith('process_units_') for name in dir(self))
 
     def on_header(self, reader, fit_header):
         pass
@@ -98,6 +125,55 @@ class DataProcessorBase:
             'process_message_' + data_message.def_mesg.name,
             reader, data_message)
 
+    def get_field_processors(self, reader, field_data):
+        """
+        Return a `tuple` of the callables to call, in that order, for
+        *field_data*, and for any other field that will refer to the same
+        field definition (i.e. same type, name and units).
+
+        Each callable has the same signature than the ``on_process_*`` methods.
+        """
+        return tuple(filter(None, (
+            self._get_type_processor(field_data),
+            self._get_field_processor(field_data),
+            self._get_unit_processor(field_data))))
+
+    def get_message_processor(self, reader, def_mesg):
+        """
+        Return the callable to call for every data message that refers to the
+        *def_mesg* definition message, or `None`.
+
+        The callable has the same signature than `on_process_message`.
+        """
+        if self._overrides('on_process_message', DataProcessorBase):
+            return self.on_process_message
+        return self._resolve_method('process_message_' + def_mesg.name)
+
+    def _get_type_processor(self, field_data):
+        if self._overrides('on_process_type', DataProcessorBase):
+            return self.on_process_type
+        return self._resolve_method('process_type_' + field_data.type.name)
+
+    def _get_field_processor(self, field_data):
+        if self._overrides('on_process_field', DataProcessorBase):
+            return self.on_process_field
+        if field_data.name:
+            return self._resolve_method('process_field_' + field_data.name)
+        return None
+
+    def _get_unit_processor(self, field_data):
+        # units may be modified by a previous processor, so the actual
+        # `process_units_*` method can only be resolved at call time
+        if self._overrides('on_process_unit', DataProcessorBase):
+            return self.on_process_unit
+        if self._has_units_processors:
+            return self.on_process_unit
+        return None
+
+    def _overrides(self, method_name, base_class):
+        return getattr(type(self), method_name) is not getattr(
+            base_class, method_name)
+
     def _run_processor(self, method_name, reader, data):
         method = self._resolve_method(method_name)
         if method is not None:
@@ -126,6 +202,8 @@ class DefaultDataProcessor(DataProcessorBase):
     .. seealso:: `StandardUnitsDataProcessor`, `DataProcessorBase`
     """
 
+    defers_fields = True
+
     def __init__(self):
         super().__init__()
 
@@ -183,9 +261,13 @@ class DefaultDataProcessor(DataProcessorBase):
         Convert populated ``event_timestamp`` component values of the ``hr`` to
         `datetime.datetime` objects
         """
-        if not data_message.has_field(profile.FIELD_NUM_HR_EVENT_TIMESTAMP_12):
-            # We want to convert only populated *event_timestamp* fields that
-            # were originally computed from the *event_timestamp_12* value
+        # We want to convert only populated *event_timestamp* fields that
+        # were originally computed from the *event_timestamp_12* value.
+        # The definition is checked instead of the message itself in case
+        # *event_timestamp_12* has been projected out by the reader.
+        if not any(
+                field_def.def_num == profile.FIELD_NUM_HR_EVENT_TIMESTAMP_12
+                for field_def in data_message.def_mesg.field_defs):
             return
 
         for field_data in data_message.get_fields(
@@ -210,6 +292,8 @@ class StandardUnitsDataProcessor(DefaultDataProcessor):
     .. seealso:: `DefaultDataProcessor`, `DataProcessorBase`
     """
 
+    defers_fields = True
+
     def __init__(self):
         super().__init__()
 
@@ -224,6 +308,13 @@ class StandardUnitsDataProcessor(DefaultDataProcessor):
         else:
             super().on_process_field(reader, field_data)
 
+    def _get_field_processor(self, field_data):
+        if self._overrides('on_process_field', StandardUnitsDataProcessor):
+            return self.on_process_field
+        if field_data.name and field_data.name.endswith('_speed'):
+            return self.process_field_speed
+        return self._resolve_method('process_field_' + field_data.name)
+
     def process_field_distance(self, reader, field_data):
         if field_data.value is not None:
             field_data.value /= 1000.0
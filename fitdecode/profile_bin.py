@@ -0,0 +1,474 @@
+# fitdecode
+#
+# Copyright (c) 2018-2019 Jean-Charles Lefebvre
+# All rights reserved.
+#
+# This code is licensed under the MIT License.
+# See the LICENSE.txt file at the root of this project.
+
+"""
+Binary tables of the FIT profile (the ``profile.bin`` file).
+
+The generated ``profile`` module loads the types of the FIT profile from these
+tables rather than from their Python definitions (the ``profile_defs``
+module), which spares the unmarshalling and the execution of a large module at
+import time: the file is read at once, and each `FieldType` and `MessageType`
+is built from its records the first time it is accessed, then cached (see
+`fitdecode.types.LazyMapping`).
+
+The tables are written by ``tools/generate_profile.py`` with `dump`, from the
+objects of the ``profile_defs`` module. Neither `marshal` nor `pickle` is
+involved: every table is an array of fixed-size records, in which strings are
+offsets in a string table, and numbers (*scale* and *offset* attributes) are
+indexes in a table of numbers.
+"""
+
+import functools
+import os.path
+import struct
+import zlib
+
+from .types import (
+    ComponentField,
+    Field,
+    FieldType,
+    LazyMapping,
+    MessageType,
+    ReferenceField,
+    SubField,
+    BASE_TYPES)
+
+__all__ = []
+
+
+#: the default location of the tables, next to the ``profile`` module
+PATH = os.path.join(os.path.dirname(__file__), 'profile.bin')
+
+MAGIC = b'FITPROF\x00'
+VERSION = 1
+
+# magic, format version, CRC-32 and size of the tables
+_HEADER = struct.Struct('<8sBII')
+_COUNT = struct.Struct('<I')
+
+# the records of the tables, in the order of the tables in the file, which
+# follow the string table and the keys (the names of the types, then the ones
+# of the messages, in the order of their tables, separated by _KEY_SEP so that
+# they are all decoded at once)
+_NUMBER = struct.Struct('<Bd')  # kind, value
+_TYPE = struct.Struct('<IBIH')  # name, base type, enum start, enum count
+_ENUM = struct.Struct('<II')  # value, name
+_MESG = struct.Struct('<HIIH')  # mesg_num, name, field start, field count
+
+# name, def_num, type, scale, offset, units, component start, component count,
+# subfield start and subfield count (or ref field start and ref field count,
+# for a subfield)
+_FIELD = struct.Struct('<IBHHHIIHIH')
+
+# name, def_num, scale, offset, units, accumulate, bits, bit_offset
+_COMPONENT = struct.Struct('<IBHHIBBB')
+
+# name, def_num, value, raw_value
+_REF = struct.Struct('<IBII')
+
+_TABLES = (
+    ('numbers', _NUMBER), ('types', _TYPE), ('enums', _ENUM),
+    ('mesgs', _MESG), ('fields', _FIELD), ('subfields', _FIELD),
+    ('components', _COMPONENT), ('refs', _REF))
+
+_KEY_SEP = '\0'
+
+# no string or number
+_NONE_STR = 0xffffffff
+_NONE_NUM = 0xffff
+
+# kinds of number
+_NUM_INT = 0
+_NUM_FLOAT = 1
+
+# the type of a field is either the index of a `FieldType` in the types table,
+# or a `BaseType` identifier flagged with _TYPE_BASE
+_TYPE_BASE = 0x8000
+
+# in a message, a field which type is _TYPE_TIMESTAMP is the shared
+# ``FIELD_TYPE_TIMESTAMP`` field, which is the first record of the fields table
+_TYPE_TIMESTAMP = 0xffff
+
+
+class _Tables:
+    def __init__(self, data):
+        self.data = data
+        self.field_types = None
+        self.type_names = None
+        self.field_type_timestamp = None
+
+        magic, version, crc, size = _HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError('not a FIT profile tables file')
+        if version != VERSION:
+            raise ValueError(f'unsupported tables version {version}')
+        if len(data) != _HEADER.size + size:
+            raise ValueError('truncated or oversized tables')
+        if zlib.crc32(memoryview(data)[_HEADER.size:]) != crc:
+            raise ValueError('corrupted tables')
+
+        self.crc = crc
+
+        # the string table, the keys, then the offset of each table
+        offset = _HEADER.size
+        size, = _COUNT.unpack_from(data, offset)
+        self.strings = offset + _COUNT.size
+        offset = self.strings + size
+
+        size, = _COUNT.unpack_from(data, offset)
+        offset += _COUNT.size
+        self.keys = data[offset:offset + size].decode().split(_KEY_SEP)
+        offset += size
+
+        for name, record in _TABLES:
+            count, = _COUNT.unpack_from(data, offset)
+            offset += _COUNT.size
+            setattr(self, name, offset)
+            setattr(self, name + '_count', count)
+            offset += count * record.size
+
+        if offset != len(data):
+            raise ValueError('malformed tables')
+        if len(self.keys) != self.types_count + self.mesgs_count:
+            raise ValueError('malformed keys')
+
+    def string(self, ref):
+        if ref == _NONE_STR:
+            return None
+        start = self.strings + ref
+        return self.data[start + 1:start + 1 + self.data[start]].decode()
+
+    def number(self, index):
+        if index == _NONE_NUM:
+            return None
+        kind, value = _NUMBER.unpack_from(
+            self.data, self.numbers + index * _NUMBER.size)
+        return int(value) if kind == _NUM_INT else value
+
+    def mesg_nums(self):
+        end = self.mesgs + self.mesgs_count * _MESG.size
+        return [
+            mesg_num for mesg_num, *_ in _MESG.iter_unpack(
+                memoryview(self.data)[self.mesgs:end])]
+
+    def build_type(self, index):
+        name, base_type, enum_start, enum_count = _TYPE.unpack_from(
+            self.data, self.types + index * _TYPE.size)
+
+        enum = None
+        if enum_count:
+            enum = {}
+            offset = self.enums + enum_start * _ENUM.size
+            for value, value_name in _ENUM.iter_unpack(
+                    self.data[offset:offset + enum_count * _ENUM.size]):
+                enum[value] = self.string(value_name)
+
+        return FieldType(
+            name=self.string(name),
+            base_type=BASE_TYPES[base_type],
+            enum=enum)
+
+    def build_mesg(self, index):
+        mesg_num, name, field_start, field_count = _MESG.unpack_from(
+            self.data, self.mesgs + index * _MESG.size)
+
+        fields = {}
+        for field_index in range(field_start, field_start + field_count):
+            field = self.build_field(field_index)
+            fields[field.def_num] = field
+
+        return MessageType(
+            name=self.string(name), mesg_num=mesg_num, fields=fields)
+
+    def build_field(self, index, subfield=False):
+        table = self.subfields if subfield else self.fields
+        (name, def_num, type_, scale, offset, units, comp_start, comp_count,
+         sub_start, sub_count) = _FIELD.unpack_from(
+            self.data, table + index * _FIELD.size)
+
+        if type_ == _TYPE_TIMESTAMP:
+            assert not subfield
+            return self.field_type_timestamp
+
+        if type_ & _TYPE_BASE:
+            type_ = BASE_TYPES[type_ & 0xff]
+        else:
+            type_ = self.field_types[self.type_names[type_]]
+
+        components = None
+        if comp_count:
+            components = tuple(
+                self.build_component(comp_index)
+                for comp_index in range(comp_start, comp_start + comp_count))
+
+        if subfield:
+            return SubField(
+                name=self.string(name),
+                def_num=def_num,
+                type=type_,
+                scale=self.number(scale),
+                offset=self.number(offset),
+                units=self.string(units),
+                components=components,
+                ref_fields=tuple(
+                    self.build_ref(ref_index)
+                    for ref_index in range(sub_start, sub_start + sub_count)))
+
+        subfields = None
+        if sub_count:
+            subfields = tuple(
+                self.build_field(sub_index, subfield=True)
+                for sub_index in range(sub_start, sub_start + sub_count))
+
+        return Field(
+            name=self.string(name),
+            type=type_,
+            def_num=def_num,
+            scale=self.number(scale),
+            offset=self.number(offset),
+            units=self.string(units),
+            components=components,
+            subfields=subfields)
+
+    def build_component(self, index):
+        (name, def_num, scale, offset, units, accumulate, bits,
+         bit_offset) = _COMPONENT.unpack_from(
+            self.data, self.components + index * _COMPONENT.size)
+
+        return ComponentField(
+            name=self.string(name),
+            def_num=def_num,
+            scale=self.number(scale),
+            offset=self.number(offset),
+            units=self.string(units),
+            accumulate=bool(accumulate),
+            bits=bits,
+            bit_offset=bit_offset)
+
+    def build_ref(self, index):
+        name, def_num, value, raw_value = _REF.unpack_from(
+            self.data, self.refs + index * _REF.size)
+
+        return ReferenceField(
+            name=self.string(name),
+            def_num=def_num,
+            value=self.string(value),
+            raw_value=raw_value)
+
+
+def load(crc, path=PATH):
+    """
+    Load the tables of the file at *path*, and return a tuple
+    ``(field_types, message_types, mesg_nums, field_type_timestamp)`` with the
+    same content as the ``FIELD_TYPES``, ``MESSAGE_TYPES``, ``MESG_NUMS`` and
+    ``FIELD_TYPE_TIMESTAMP`` attributes of the ``profile_defs`` module.
+
+    *crc* is the CRC-32 of the expected tables, as generated along with the
+    ``profile`` module, so that stale tables are not loaded.
+
+    Raise `OSError` if the file cannot be read, and `ValueError` if it is
+    malformed, corrupted or stale.
+    """
+    with open(path, mode='rb') as fd:
+        data = fd.read()
+
+    try:
+        tables = _Tables(data)
+    except struct.error as exc:
+        raise ValueError(f'malformed tables: {exc}') from None
+
+    if tables.crc != crc:
+        raise ValueError('stale tables')
+
+    type_names = tables.keys[:tables.types_count]
+    field_types = LazyMapping({
+        name: functools.partial(tables.build_type, index)
+        for index, name in enumerate(type_names)})
+
+    message_types = {}
+    mesg_nums = {}
+    for index, (mesg_num, name) in enumerate(zip(
+            tables.mesg_nums(), tables.keys[tables.types_count:])):
+        message_types[mesg_num] = functools.partial(tables.build_mesg, index)
+        mesg_nums[name] = mesg_num
+
+    tables.field_types = field_types
+    tables.type_names = type_names
+    tables.field_type_timestamp = tables.build_field(0)
+
+    return (
+        field_types, LazyMapping(message_types), mesg_nums,
+        tables.field_type_timestamp)
+
+
+class _Writer:
+    def __init__(self):
+        self.strings = bytearray()
+        self.string_refs = {}
+        self.number_refs = {}
+        self.type_refs = {}
+        self.type_keys = []
+        self.mesg_keys = []
+        self.tables = {name: [] for name, _ in _TABLES}
+
+    def string(self, value):
+        if value is None:
+            return _NONE_STR
+
+        try:
+            return self.string_refs[value]
+        except KeyError:
+            pass
+
+        encoded = value.encode()
+        if len(encoded) > 0xff:
+            raise ValueError(f'string too long: {value!r}')
+
+        ref = len(self.strings)
+        self.strings.append(len(encoded))
+        self.strings += encoded
+        self.string_refs[value] = ref
+        return ref
+
+    def number(self, value):
+        if value is None:
+            return _NONE_NUM
+
+        if isinstance(value, int):
+            key = (_NUM_INT, value)
+        elif isinstance(value, float):
+            key = (_NUM_FLOAT, value)
+        else:
+            raise ValueError(f'unsupported number: {value!r}')
+
+        try:
+            return self.number_refs[key]
+        except KeyError:
+            numbers = self.tables['numbers']
+            if float(value) != value:
+                raise ValueError(f'inexact number: {value!r}')
+            ref = self.number_refs[key] = len(numbers)
+            numbers.append(_NUMBER.pack(key[0], value))
+            return ref
+
+    def type_ref(self, type_):
+        if type_ in BASE_TYPES.values():
+            return _TYPE_BASE | type_.identifier
+        try:
+            return self.type_refs[id(type_)]
+        except KeyError:
+            raise ValueError(f'unknown field type: {type_.name}') from None
+
+    def add_type(self, field_type):
+        types = self.tables['types']
+        enums = self.tables['enums']
+
+        self.type_refs[id(field_type)] = len(types)
+        self.type_keys.append(field_type.name)
+        enum = field_type.enum or {}
+        types.append(_TYPE.pack(
+            self.string(field_type.name), field_type.base_type.identifier,
+            len(enums), len(enum)))
+
+        for value, value_name in enum.items():
+            enums.append(_ENUM.pack(value, self.string(value_name)))
+
+    def add_mesg(self, mesg_type, field_type_timestamp):
+        fields = self.tables['fields']
+        field_start = len(fields)
+
+        for field in mesg_type.fields.values():
+            if field is field_type_timestamp:
+                fields.append(_FIELD.pack(
+                    self.string(field.name), field.def_num, _TYPE_TIMESTAMP,
+                    _NONE_NUM, _NONE_NUM, _NONE_STR, 0, 0, 0, 0))
+            else:
+                self.add_field(field)
+
+        self.mesg_keys.append(mesg_type.name)
+        self.tables['mesgs'].append(_MESG.pack(
+            mesg_type.mesg_num, self.string(mesg_type.name),
+            field_start, len(fields) - field_start))
+
+    def add_field(self, field, subfield=False):
+        components = self.tables['components']
+        comp_start = len(components)
+        for component in field.components or ():
+            components.append(_COMPONENT.pack(
+                self.string(component.name), component.def_num,
+                self.number(component.scale), self.number(component.offset),
+                self.string(component.units), bool(component.accumulate),
+                component.bits, component.bit_offset))
+        comp_count = len(components) - comp_start
+
+        # the records of the subfields (or ref fields) of a field are
+        # contiguous, so they are added before the record of the field
+        if subfield:
+            refs = self.tables['refs']
+            sub_start = len(refs)
+            for ref_field in field.ref_fields:
+                refs.append(_REF.pack(
+                    self.string(ref_field.name), ref_field.def_num,
+                    self.string(ref_field.value), ref_field.raw_value))
+            sub_count = len(refs) - sub_start
+            table = self.tables['subfields']
+        else:
+            sub_start = len(self.tables['subfields'])
+            for sub_field in field.subfields or ():
+                self.add_field(sub_field, subfield=True)
+            sub_count = len(self.tables['subfields']) - sub_start
+            table = self.tables['fields']
+
+        table.append(_FIELD.pack(
+            self.string(field.name), field.def_num, self.type_ref(field.type),
+            self.number(field.scale), self.number(field.offset),
+            self.string(field.units), comp_start, comp_count,
+            sub_start, sub_count))
+
+    def getvalue(self):
+        keys = self.type_keys + self.mesg_keys
+        if any(_KEY_SEP in key for key in keys):
+            raise ValueError('invalid type or message name')
+        keys = _KEY_SEP.join(keys).encode()
+
+        chunks = [
+            _COUNT.pack(len(self.strings)), bytes(self.strings),
+            _COUNT.pack(len(keys)), keys]
+        for name, _ in _TABLES:
+            records = self.tables[name]
+            chunks.append(_COUNT.pack(len(records)))
+            chunks.extend(records)
+
+        payload = b''.join(chunks)
+        return _HEADER.pack(
+            MAGIC, VERSION, zlib.crc32(payload), len(payload)) + payload
+
+
+def dump(field_types, message_types, field_type_timestamp):
+    """
+    Serialize the profile types of *field_types* (a mapping of `FieldType`
+    objects by name), *message_types* (a mapping of `MessageType` objects by
+    global message number) and *field_type_timestamp* (the `Field` shared by
+    the messages that have a ``timestamp`` field) to tables that `load` can
+    read.
+
+    Return a tuple ``(data, crc)``, where *crc* is the one to pass to `load`.
+    """
+    writer = _Writer()
+
+    for field_type in field_types.values():
+        writer.add_type(field_type)
+
+    # the shared timestamp field is the first record of the fields table
+    writer.add_field(field_type_timestamp)
+
+    for mesg_type in message_types.values():
+        writer.add_mesg(mesg_type, field_type_timestamp)
+
+    data = writer.getvalue()
+    return data, _HEADER.unpack_from(data)[2]
@@ -6,8 +6,11 @@
 # This code is licensed under the MIT License.
 # See the LICENSE.txt file at the root of this project.
 
+import datetime
 import enum
+import functools
 import io
+import mmap as _mmap
 import os
 import struct
 
@@ -18,9 +21,26 @@ from . import utils
 from . import processors
 from . import profile
 
-__all__ = ['CrcCheck', 'FitReader']
+__all__ = ['CrcCheck', 'DataOutput', 'FitReader']
 
 _UNSET = object()
+_SKIPPED = object()  # returned instead of a record that is not to be yielded
+
+# data messages that are always fully decoded because FitReader relies on them
+_FULLY_DECODED_MESGS = frozenset((
+    profile.MESG_NUM_FILE_ID,
+    profile.MESG_NUM_DEVELOPER_DATA_ID,
+    profile.MESG_NUM_FIELD_DESCRIPTION))
+
+
+def _to_fit_timestamp(value):
+    # convert *value*, either a FIT timestamp (`int`) or a `datetime.datetime`
+    # (assumed UTC if naive) to a FIT timestamp
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=datetime.timezone.utc)
+        return int(value.timestamp()) - processors.FIT_UTC_REFERENCE
+    return int(value)
 
 
 class CrcCheck(enum.Enum):
@@ -45,6 +65,32 @@ class CrcCheck(enum.Enum):
     ENABLED = 2
 
 
+class DataOutput(enum.Enum):
+    """
+    Defines the values expected by the ``output`` parameter of `FitReader`'s
+    constructor, that is, the type of the objects yielded for data messages.
+    """
+
+    #: :class:`fitdecode.FitDataMessage` objects, with fully decoded and
+    #: processed values (default).
+    MESSAGES = 'messages'
+
+    #: :class:`fitdecode.FitDataTuple` objects, with raw values to which scale
+    #: and offset have been applied. Values are neither rendered nor
+    #: processed, and component fields are not expanded. This avoids creating
+    #: one `fitdecode.types.FieldData` object per field.
+    TUPLES = 'tuples'
+
+    #: Like `TUPLES` but with raw values only (i.e. invalid values are still
+    #: replaced by `None`).
+    RAW_TUPLES = 'raw_tuples'
+
+    #: :class:`fitdecode.FitDataPayload` objects, with the payload of the
+    #: data messages left undecoded. This is the building block of bulk
+    #: decoders like `fitdecode.columns`.
+    PAYLOADS = 'payloads'
+
+
 class RecordHeader:
     __slots__ = (
         'is_definition', 'is_developer_data', 'local_mesg_num', 'time_offset')
@@ -57,6 +103,310 @@ class RecordHeader:
         self.time_offset = time_offset
 
 
+class MessageDecoder:
+    """
+    The compiled layout of the data messages that refer to a given
+    `FitDefinitionMessage`.
+
+    It is built by `FitReader` once per definition message so that the payload
+    of a data message can be read and unpacked in a single call, instead of
+    once per field.
+
+    If a *projection* is given (a set of field names and/or definition
+    numbers), only the requested fields, and the ones they depend on, are
+    unpacked. The bytes of the other fields are skipped.
+    """
+
+    __slots__ = (
+        'size', 'unpacker', 'field_defs', 'invalids', 'plan',
+        'emits', 'expands', 'component_nums', 'emit_timestamp',
+        'field_processors', 'message_processor',
+        'timestamp_index', 'timestamp_unpacker', 'timestamp_offset',
+        'scale_plan', 'timestamp_plan', 'accumulate_plan', 'sets_hr_start',
+        'schemas', 'field_indexes', 'skip')
+
+    # kinds of post-processing steps in *plan*
+    SCALAR = 0  # a single value
+    ARRAY = 1   # a tuple of values
+    BYTES = 2   # a single value from a tuple of bytes
+    EMPTY = 3   # zero-sized field
+
+    def __init__(self, def_mesg, projection=None):
+        fmt = def_mesg.endian
+        all_field_defs = list(def_mesg.all_field_defs)
+        field_defs = []
+        plan = []
+        invalids = []
+        idx = 0
+
+        if projection is None:
+            keeps = emits = expands = [True] * len(all_field_defs)
+            self.component_nums = None
+        else:
+            keeps, emits, expands, self.component_nums = \
+                self._project(def_mesg, projection)
+
+        #: is the timestamp of a compressed timestamp header to be output?
+        self.emit_timestamp = projection is None or (
+            profile.FIELD_TYPE_TIMESTAMP.name in projection or
+            profile.FIELD_NUM_TIMESTAMP in projection)
+
+        # the timestamp field is needed anyway to maintain reader's state
+        self.timestamp_index = None
+        self.timestamp_unpacker = None
+        self.timestamp_offset = 0
+        offset = 0
+        for field_def, keep in zip(all_field_defs, keeps):
+            if not keep:
+                if field_def.size:
+                    fmt += str(field_def.size) + 'x'
+                offset += field_def.size
+                continue
+
+            if (not field_def.is_dev and
+                    field_def.def_num == profile.FIELD_NUM_TIMESTAMP):
+                self.timestamp_index = len(field_defs)
+                if field_def.size == field_def.base_type.size:
+                    # to read the timestamp only, from a skipped message
+                    self.timestamp_unpacker = struct.Struct(
+                        def_mesg.endian + field_def.base_type.fmt)
+                    self.timestamp_offset = offset
+
+            field_defs.append(field_def)
+            offset += field_def.size
+
+            base_type = field_def.base_type
+            count = field_def.size // base_type.size
+
+            if not count:
+                kind = self.EMPTY
+                stop = idx
+            elif base_type.fmt == 's':
+                # a string is always unpacked as a single value
+                kind = self.SCALAR
+                stop = idx + 1
+            elif base_type.identifier == types.BASE_TYPE_BYTE.identifier:
+                kind = self.BYTES
+                stop = idx + count
+            elif count > 1:
+                kind = self.ARRAY
+                stop = idx + count
+            else:
+                kind = self.SCALAR
+                stop = idx + 1
+
+            if invalids is not None:
+                if kind == self.SCALAR and base_type.invalid is not None:
+                    invalids.append(base_type.invalid)
+                else:
+                    invalids = None
+
+            fmt += str(count) + base_type.fmt
+            plan.append((kind, idx, stop, base_type.parse))
+            idx = stop
+
+        self.unpacker = struct.Struct(fmt)
+        self.size = self.unpacker.size
+
+        #: the definitions of the unpacked fields, in payload order
+        self.field_defs = field_defs
+
+        # the most common layout - made only of scalar integers - is scrubbed
+        # from its invalid values in a single pass
+        self.invalids = invalids if invalids else None
+        self.plan = plan
+
+        # per unpacked field: is it to be output, and are its components to be
+        # expanded? *component_nums* is the set of the def nums of the
+        # components to expand, or `None` for all of them
+        self.emits = [emit for emit, keep in zip(emits, keeps) if keep]
+        self.expands = [
+            expand for expand, keep in zip(expands, keeps) if keep]
+
+        #: data processor's callables, per field (see
+        #: `fitdecode.DataProcessorBase.get_field_processors`)
+        self.field_processors = {}
+
+        #: see `fitdecode.DataProcessorBase.get_message_processor`
+        self.message_processor = None
+
+        # scale and offset of the fields that have any
+        self.scale_plan = tuple(
+            (idx, field_def.field)
+            for idx, field_def in enumerate(field_defs)
+            if field_def.field and (
+                field_def.field.scale or field_def.field.offset))
+
+        # the fields that update the last timestamp of the reader, and the
+        # field to render their value with, if any
+        self.timestamp_plan = tuple(
+            (idx, field_def.field if emit or expand else None)
+            for idx, (field_def, emit, expand) in enumerate(
+                zip(field_defs, self.emits, self.expands))
+            if field_def.def_num == profile.FIELD_NUM_TIMESTAMP)
+
+        # the components to accumulate, per unpacked field, so that the state
+        # of the reader can be maintained when data messages are skipped, or
+        # when their fields are not built yet
+        accumulate_plan = []
+        for idx, (field_def, expand) in enumerate(
+                zip(field_defs, self.expands)):
+            if not expand or field_def.is_dev or not field_def.field:
+                continue
+            components = tuple(
+                component for component in field_def.field.components or ()
+                if component.accumulate and (
+                    self.component_nums is None or
+                    component.def_num in self.component_nums))
+            if components:
+                accumulate_plan.append((idx, components))
+        self.accumulate_plan = tuple(accumulate_plan)
+
+        # does this message set the start of hr.event_timestamp_12?
+        self.sets_hr_start = (
+            def_mesg.global_mesg_num == profile.MESG_NUM_HR and any(
+                not field_def.is_dev and
+                field_def.def_num == profile.FIELD_NUM_HR_EVENT_TIMESTAMP
+                for field_def in field_defs))
+
+        # `FitDataSchema` objects, created on demand by `get_schema`
+        self.schemas = {}
+
+        # the field indexes of the data messages, per layout of fields (see
+        # `FitDataMessage._get_field_index`)
+        self.field_indexes = {}
+
+        #: are the data messages of this definition to be skipped?
+        self.skip = False
+
+    @staticmethod
+    def _project(def_mesg, projection):
+        # select the fields to unpack (*keeps*), to output (*emits*) and which
+        # components to expand (*expands*), to honor *projection*
+        mesg_type = def_mesg.mesg_type
+        mesg_fields = mesg_type.fields if mesg_type else {}
+
+        def _is_requested(field, def_num):
+            if def_num in projection:
+                return True
+            if field is None:
+                return False
+            if field.name in projection:
+                return True
+            return any(
+                sub_field.name in projection
+                for sub_field in getattr(field, 'subfields', None) or ())
+
+        keeps, emits, expands = [], [], []
+        component_nums = set()
+        ref_nums = set()
+
+        for field_def in def_mesg.all_field_defs:
+            field = field_def.field
+
+            if field_def.is_dev:
+                emit = field_def.name in projection
+                expand = False
+            else:
+                emit = _is_requested(field, field_def.def_num)
+
+                # components may be held by the field or by its subfields
+                components = []
+                if field is not None:
+                    components.extend(field.components or ())
+                    for sub_field in field.subfields or ():
+                        components.extend(sub_field.components or ())
+
+                expand = False
+                for component in components:
+                    if _is_requested(
+                            mesg_fields.get(component.def_num),
+                            component.def_num):
+                        component_nums.add(component.def_num)
+                        expand = True
+
+                # subfields cannot be resolved without their reference fields
+                if (emit or expand) and field is not None:
+                    for sub_field in field.subfields or ():
+                        ref_nums.update(
+                            ref_field.def_num
+                            for ref_field in sub_field.ref_fields)
+
+            keeps.append(emit or expand)
+            emits.append(emit)
+            expands.append(expand)
+
+        # the fields the reader's state depends on
+        if def_mesg.global_mesg_num == profile.MESG_NUM_HR:
+            ref_nums.add(profile.FIELD_NUM_HR_EVENT_TIMESTAMP)
+        ref_nums.add(profile.FIELD_NUM_TIMESTAMP)
+
+        for idx, field_def in enumerate(def_mesg.all_field_defs):
+            if not field_def.is_dev and field_def.def_num in ref_nums:
+                keeps[idx] = True
+
+        return keeps, emits, expands, frozenset(component_nums)
+
+    def decode(self, payload, offset=0):
+        """
+        Unpack *payload* (from *offset*) and return the list of raw values, one
+        per field definition, with invalid values replaced by `None`.
+        """
+        values = self.unpacker.unpack_from(payload, offset)
+
+        if self.invalids is not None:
+            return [
+                None if value == invalid else value
+                for value, invalid in zip(values, self.invalids)]
+
+        raw_values = []
+        for kind, start, stop, parse in self.plan:
+            if kind == self.SCALAR:
+                raw_values.append(parse(values[start]))
+            elif kind == self.ARRAY:
+                raw_values.append(tuple(parse(v) for v in values[start:stop]))
+            elif kind == self.BYTES:
+                raw_values.append(parse(values[start:stop]))
+            else:
+                raw_values.append(None)
+
+        return raw_values
+
+    def get_schema(self, def_mesg, scaled, compressed_timestamp):
+        """
+        Get the `FitDataSchema` of the data messages decoded by this object.
+
+        *compressed_timestamp* is true if the data messages have a compressed
+        timestamp header, in which case a trailing ``timestamp`` value is
+        appended.
+        """
+        key = (scaled, compressed_timestamp)
+        try:
+            return self.schemas[key]
+        except KeyError:
+            pass
+
+        field_defs = [
+            field_def
+            for field_def, emit in zip(self.field_defs, self.emits) if emit]
+        names = [field_def.name for field_def in field_defs]
+        def_nums = [field_def.def_num for field_def in field_defs]
+        units = [
+            field_def.field.units if field_def.field else None
+            for field_def in field_defs]
+
+        if compressed_timestamp and self.emit_timestamp:
+            names.append(profile.FIELD_TYPE_TIMESTAMP.name)
+            def_nums.append(profile.FIELD_TYPE_TIMESTAMP.def_num)
+            units.append(profile.FIELD_TYPE_TIMESTAMP.units)
+
+        schema = records.FitDataSchema(
+            def_mesg, tuple(names), tuple(def_nums), tuple(units), scaled)
+        self.schemas[key] = schema
+
+        return schema
+
+
 class FitReader:
     """
     Parse the content of a FIT stream or storage.
@@ -103,6 +453,96 @@ class FitReader:
       `FitChunk` object attached to any of the four aforementioned entities, as
       long as the *keep_raw_chunks* option is true.
 
+    Buffering:
+
+    * `FitReader` reads its input by blocks of *buffer_size* bytes at most,
+      and then decodes frames from this read-ahead buffer. This avoids issuing
+      one ``read()`` call per decoded value.
+    * As a consequence, the read position of the *fileish* object may be ahead
+      of the end of the last yielded frame.
+    * A smaller *buffer_size* may be passed in case *fileish* is a slow pipe
+      from which frames are expected to be yielded as soon as possible.
+    * `bytes`-like *fileish* objects are decoded in-place, without being
+      copied to an intermediate buffer.
+
+    Memory mapping:
+
+    * If *mmap* is true and *fileish* is either a path or a file object with a
+      ``fileno()``, the file is memory-mapped instead of being read, so the OS
+      page cache serves the data directly. *buffer_size* is ignored in this
+      case.
+    * In this mode, `FitChunk.bytes` are `memoryview` objects over the mapping
+      instead of `bytes` copies. The mapping is released by `close()` unless
+      some of these chunks are still referenced by caller, in which case it
+      is released once the last of them is garbage collected.
+    * *fileish* silently falls back to regular reads if it cannot be mapped
+      (empty file, pipe, ...).
+
+    Output:
+
+    * By default, data messages are yielded as `FitDataMessage` objects, which
+      hold one `fitdecode.types.FieldData` object per field, with fully
+      decoded and processed values.
+    * For pipelines that only need numeric values, the *output* option can be
+      set to `DataOutput.TUPLES` or `DataOutput.RAW_TUPLES` (or their `str`
+      value), in which case data messages are yielded as lightweight
+      `FitDataTuple` objects instead. Data processor is not called for these
+      messages, except for `fitdecode.DataProcessorBase.on_header` and
+      `fitdecode.DataProcessorBase.on_crc`.
+    * `DataOutput.PAYLOADS` goes one step further: data messages are yielded
+      as `FitDataPayload` objects, which payload is left undecoded.
+
+    Filtering:
+
+    * *include* and *exclude* can be iterables of global message numbers
+      (`int`) and/or message names (`str`), to select the types of messages to
+      yield.
+    * Data messages of the other types are skipped at binary level, without
+      being decoded. Their definition messages are not yielded either.
+    * Skipped messages still count in `FitChunk.index`, and the internal state
+      of `FitReader` (CRC, timestamps) is still maintained.
+    * ``file_id``, ``developer_data_id`` and ``field_description`` messages
+      are always decoded, even if they are not yielded.
+
+    Field projection:
+
+    * *fields* can be a `dict` that maps message names and/or numbers to an
+      iterable of field names and/or definition numbers, like
+      ``{'record': ['timestamp', 'heart_rate', 'power']}``.
+    * Only the requested fields of the data messages of these types are then
+      unpacked and yielded. The other fields are skipped at binary level, so
+      are their subfields, components and data processing.
+    * A requested field may be a component of another field (e.g. ``speed`` is
+      expanded from ``compressed_speed_distance`` when present), or a subfield.
+    * The fields needed to maintain the state of `FitReader` (``timestamp``,
+      reference fields of subfields) are still decoded, even if they are not
+      yielded.
+    * The other types of messages are decoded in full.
+
+    Random access:
+
+    * *index* can be a `FitIndex` object, built from the same input, so that
+      `seek` can jump to any record of the input, backward or forward,
+      without reading the ones that precede it.
+
+    Time range:
+
+    * *time_range* can be a ``(start, end)`` pair of FIT timestamps (`int`)
+      and/or `datetime.datetime` objects (assumed UTC if naive), either of
+      which may be `None`, to read only the data messages of this period.
+    * Iteration starts from the first data message timestamped *start* or
+      later (see `seek_time`). The records that precede it are not yielded,
+      including `FitHeader`, and they are not decoded.
+    * The data messages timestamped after *end* are skipped. The ``record``
+      message that comes first after *end* ends the current FIT file: the
+      records that follow it in this file are skipped, until the next FIT
+      file of a chained input. Other types of messages do not, since they are
+      not necessarily in chronological order (e.g. ``session`` messages may be
+      written first).
+    * Only the data messages that have either a ``timestamp`` field or a
+      compressed timestamp header are considered. The others are yielded if
+      they are in-between.
+
     Data bag:
 
     * A *data_bag* object can be passed to the constructor and then be retrieved
@@ -119,7 +559,10 @@ class FitReader:
 
     def __init__(self, fileish, *,
                  processor=_UNSET, check_crc=CrcCheck.ENABLED,
-                 keep_raw_chunks=False, data_bag=_UNSET):
+                 keep_raw_chunks=False, data_bag=_UNSET,
+                 buffer_size=64 * 1024, mmap=False,
+                 output=DataOutput.MESSAGES, include=None, exclude=None,
+                 fields=None, index=None, time_range=None):
         # backward compatibility
         if check_crc is True:
             check_crc = CrcCheck.ENABLED
@@ -140,20 +583,46 @@ class FitReader:
             self._processor = processors.DefaultDataProcessor()
         else:
             self._processor = processor
+        # can the fields of data messages be built on demand?
+        self._defer_fields = (
+            self._processor is None or
+            getattr(self._processor, 'defers_fields', False))
         self._keep_raw = keep_raw_chunks
+        self._buffer_size = max(1, buffer_size)
+        self._output = DataOutput(output)
+        self._include = self._resolve_mesg_nums(include)
+        self._exclude = self._resolve_mesg_nums(exclude) or frozenset()
+        self._fields = self._resolve_projection(fields)
+        self._index = index
+        self._time_start = None  # to `seek_time` to, upon first iteration
+        self._time_end = None
+        if time_range is not None:
+            start, end = time_range
+            if start is not None:
+                self._time_start = _to_fit_timestamp(start)
+            if end is not None:
+                self._time_end = _to_fit_timestamp(end)
 
         # state (private)
-        self._fd = None        # the file object to read from
-        self._read_offset = 0  # read cursor position in the file
-        self._read_size = 0    # count bytes read from this file so far in total
+        self._fd = None          # the file object to read from
+        self._mmap = None        # the `mmap.mmap` object in case of memory-mapped input
+        self._in_memory = False  # is the whole input already in `_buf`?
+        self._read_offset = 0    # read cursor position in the file
+        self._read_size = 0      # count bytes read from this file so far in total
+        self._buf = b''          # read-ahead buffer, `None` once closed
+        self._buf_pos = 0        # read cursor position in the read-ahead buffer
+        self._start_offset = 0   # the offset of the first byte of the input in the file
 
         # per-chunk state (private)
         self._chunk_index = 0   # the index number of the current chunk that is currently being read
         self._chunk_offset = 0  # the offset of the current chunk (relative to `read_offset`)
         self._chunk_size = 0    # the size of the current chunk
+        self._footer_read = False  # is the current chunk a CRC footer?
 
         # per-FIT-file state (private)
-        self._crc = utils.CRC_START  # current CRC value, updated upon every read, reset on each new "FIT file"
+        self._crc = utils.CRC_START  # current CRC value, reset on each new "FIT file"
+        self._crc_pos = 0            # position in `_buf` up to which `_crc` has been computed
+        self._crc_incomplete = False  # has the beginning of the current "FIT file" been skipped by `seek`?
         self._header = None          # `FitHeader` of the **current** "FIT file"
         self._file_id = None         # last read file_id `FitDataMessage` object
         self._body_bytes_left = 0    # the number of bytes that are still to read before reaching the CRC footer of the current "FIT file"
@@ -163,6 +632,7 @@ class FitReader:
         self._accumulators = {}
         self._last_timestamp = 0
         self._hr_start_timestamp = 0  # special case for the ``hr`` message
+        self._time_ended = False     # are the records left in the current "FIT file" after the end of *time_range*?
 
         if hasattr(fileish, '__fspath__'):
             fileish = os.fspath(fileish)
@@ -172,14 +642,21 @@ class FitReader:
         elif isinstance(fileish, str):
             self._fd = open(fileish, mode='rb')
         else:
-            self._fd = io.BytesIO(fileish)
+            # bytes-like object: decode it in-place
+            self._buf = fileish if isinstance(fileish, bytes) else bytes(fileish)
+            self._in_memory = True
+            return
 
         try:
             self._read_offset = self._fd.tell()
             self._chunk_offset = self._read_offset
+            self._start_offset = self._read_offset
         except (AttributeError, OSError):
             pass
 
+        if mmap:
+            self._map_file()
+
     def __del__(self):
         self.close()
 
@@ -197,6 +674,11 @@ class FitReader:
         """Read-only access to the data processor object."""
         return self._processor
 
+    @property
+    def index(self):
+        """The `FitIndex` object passed to the constructor. May be `None`."""
+        return self._index
+
     @property
     def last_header(self):
         """The last read `FitHeader` object. May be `None`."""
@@ -250,16 +732,34 @@ class FitReader:
         Close the file handle (constructor's *fileish*) and clear the internal
         state.
         """
+        if self._mmap is not None:
+            if isinstance(self._buf, memoryview):
+                self._buf.release()
+            try:
+                self._mmap.close()
+            except BufferError:
+                # some chunks still refer to the mapping, which will be
+                # released along with them
+                pass
+
         if self._fd and hasattr(self._fd, 'close'):
             self._fd.close()
 
         self._fd = None
+        self._mmap = None
+        self._in_memory = False
         self._read_offset = 0
         self._read_size = 0
+        self._buf = None
+        self._buf_pos = 0
+        self._start_offset = 0
         self._chunk_index = 0
         self._chunk_offset = 0
         self._chunk_size = 0
+        self._footer_read = False
         self._crc = utils.CRC_START
+        self._crc_pos = 0
+        self._crc_incomplete = False
         self._header = None
         self._file_id = None
         self._body_bytes_left = 0
@@ -270,17 +770,107 @@ class FitReader:
         self._last_timestamp = 0
         self._hr_start_timestamp = 0
 
-    # ONLY PRIVATE METHODS BELOW ***********************************************
+    def iter_dicts(self, mesg=None):
+        """
+        Iterate over the data messages of this reader like iterating this
+        object does, but yield the values of their fields as `dict` objects
+        instead (see `FitDataMessage.to_dict`).
 
-    def _read_next(self):
+        *mesg* can be a message name or global number, or an iterable of them,
+        to get only these types of messages. Unlike the *include* option, the
+        other ones are still read.
+
+        The *output* option must be `DataOutput.MESSAGES`.
+        """
+        if self._output is not DataOutput.MESSAGES:
+            raise ValueError('iter_dicts requires DataOutput.MESSAGES output')
+
+        mesg_nums = self._resolve_mesg_nums(mesg)
+
+        for frame in self._read_next():
+            if frame.frame_type == records.FIT_FRAME_DATAMESG and (
+                    mesg_nums is None or
+                    frame.def_mesg.global_mesg_num in mesg_nums):
+                yield frame.to_dict()
+
+    def seek(self, chunk_index):
+        """
+        Move to the record of the input which `FitChunk.index` is
+        *chunk_index*, so that it is the next one to be read by the iteration
+        of this reader, which may be either continued or restarted.
+
+        Without *index*, the reader can only move forward, by reading the
+        records in-between without decoding them, except to maintain its
+        state.
+
+        With an *index* (`FitIndex`), the reader jumps to the checkpoint of
+        the index that is the closest before the record, restores its state
+        from it, and only reads the records in-between, so it can move
+        backward too. *fileish* must be seekable in this case.
+
+        The CRC of a FIT file which beginning has been skipped that way cannot
+        be checked: its `FitCRC.matched` is then `None`, and `FitCRCError` is
+        not raised.
+
+        Return false if the end of the input was reached before the record.
+        """
+        self._end_frame()
+
+        if self._index is not None:
+            checkpoint = self._index.get_checkpoint(chunk_index)
+            if chunk_index < self._chunk_index or (
+                    checkpoint is not None and
+                    checkpoint.chunk_index > self._chunk_index):
+                self._restore(checkpoint)
+        elif chunk_index < self._chunk_index:
+            raise ValueError('cannot seek backward without an index')
+
+        return self._skip_records(chunk_index)
+
+    def seek_time(self, start):
+        """
+        Move to the first data message which timestamp is *start* or later, so
+        that it is the next one to be read by the iteration of this reader.
+
+        *start* is either a FIT timestamp (`int`) or a `datetime.datetime`
+        object (assumed UTC if naive). Only the data messages that have either
+        a ``timestamp`` field or a compressed timestamp header are
+        considered.
 
-        def _update_state():
-            if self._fd:
-                self._chunk_index += 1
-                self._chunk_offset += self._chunk_size
-                self._chunk_size = 0
+        With an *index*, the message is looked up in the whole input (see
+        `FitIndex.find_time`) and the reader moves to it with `seek`.
 
-        while self._fd:
+        Otherwise, the reader moves forward only, from its current position,
+        by reading the records in-between without decoding them, except to
+        maintain its state.
+
+        Return false if there is no such message, in which case the end of the
+        input has been reached.
+        """
+        start = _to_fit_timestamp(start)
+        self._end_frame()
+
+        if self._index is None:
+            return self._skip_records(timestamp=start)
+
+        chunk_index = self._index.find_time(start)
+        if chunk_index is None:
+            self.seek(len(self._index))
+            return False
+
+        return self.seek(chunk_index)
+
+    # ONLY PRIVATE METHODS BELOW ***********************************************
+
+    def _read_next(self):
+        if self._time_start is not None:
+            # *time_range* is honored lazily so that constructor does not read
+            # anything
+            start, self._time_start = self._time_start, None
+            self.seek_time(start)
+
+        while self._buf is not None:
+            self._end_frame()
             assert self._chunk_size == 0
 
             if not self._header:
@@ -292,20 +882,22 @@ class FitReader:
                     break
 
                 yield self._header
-                _update_state()
 
             elif self._body_bytes_left > 0:
                 assert self._header
 
-                record = self._read_record()
-                if not record:
+                skip = (
+                    self._time_end is not None and self._is_after_time_end())
+
+                record = self._read_record(skip=skip)
+                if record is None:
                     break
 
                 assert self._chunk_size <= self._body_bytes_left
                 self._body_bytes_left -= self._chunk_size
 
-                yield record
-                _update_state()
+                if not skip and record is not _SKIPPED:
+                    yield record
 
             else:
                 assert self._header
@@ -322,17 +914,188 @@ class FitReader:
                     raise
 
                 yield crc_obj
-                _update_state()
 
-                # We've reached the end of this FIT file... To avoid incorrect
-                # behavior due to malformed FIT stream (i.e. next FIT header
-                # missing), reset the internal state now as well, instead of
-                # resetting it only when a FIT header is read.
+    def _end_frame(self):
+        # Update the state once the last read frame has been yielded, so that
+        # the next one can be read. This is done lazily, right before reading
+        # the next frame, so that the state of the reader reflects the last
+        # yielded frame while caller processes it.
+        if self._buf is None:
+            return
+
+        if self._chunk_size:
+            self._chunk_index += 1
+            self._chunk_offset += self._chunk_size
+            self._chunk_size = 0
+
+        if self._footer_read:
+            self._footer_read = False
+
+            # We've reached the end of this FIT file... To avoid incorrect
+            # behavior due to malformed FIT stream (i.e. next FIT header
+            # missing), reset the internal state now as well, instead of
+            # resetting it only when a FIT header is read.
+            self._on_new_file()
+
+    def _skip_records(self, chunk_index=None, timestamp=None):
+        # Read the records that precede either record number *chunk_index*, or
+        # the first data message timestamped *timestamp* or later, without
+        # yielding them, and without decoding data messages (except the ones
+        # of `_FULLY_DECODED_MESGS`), but still maintaining the state of the
+        # reader. Return false if EOF is reached first.
+        while self._buf is not None:
+            self._end_frame()
+            assert self._chunk_size == 0
+
+            if chunk_index is not None and self._chunk_index >= chunk_index:
+                return True
+
+            if not self._header:
                 self._on_new_file()
+                self._read_header()
+                if not self._header:
+                    break
+            elif self._body_bytes_left > 0:
+                if timestamp is not None:
+                    _, next_timestamp = self._peek_timestamp()
+                    if (next_timestamp is not None and
+                            next_timestamp >= timestamp):
+                        return True
+
+                self._read_record(skip=True)
+                self._body_bytes_left -= self._chunk_size
+            else:
+                self._read_crc()
+
+        return False
+
+    def _is_after_time_end(self):
+        # Tell whether the next record is to be skipped because it comes after
+        # the end of *time_range*: either a data message timestamped after it,
+        # or any record that follows a ``record`` message timestamped after it
+        # in the current FIT file.
+        # Only ``record`` messages end the current FIT file since the others
+        # are not necessarily in chronological order (e.g. a ``session``
+        # message may be written first)
+        if self._time_ended:
+            return True
+
+        global_mesg_num, timestamp = self._peek_timestamp()
+        if timestamp is None or timestamp <= self._time_end:
+            return False
+
+        if global_mesg_num == profile.MESG_NUM_RECORD:
+            self._time_ended = True
+
+        return True
+
+    def _peek_timestamp(self):
+        # Get the global message number and the timestamp of the next record,
+        # without consuming it, if it is a data message that has either a
+        # timestamp field or a compressed timestamp header. The timestamp is
+        # `None` otherwise.
+        if not self._peek_bytes(1):
+            return None, None
+
+        record_header = self._buf[self._buf_pos]
+        if record_header & 0x80:  # compressed timestamp
+            local_mesg_num = (record_header >> 5) & 0x3
+            time_offset = record_header & 0x1f
+        elif record_header & 0x40:  # definition message
+            return None, None
+        else:
+            local_mesg_num = record_header & 0xf
+            time_offset = None
+
+        def_mesg = self._local_mesg_defs.get(local_mesg_num)
+        if def_mesg is None:
+            return None, None
+
+        decoder = def_mesg.decoder
+        timestamp = None
+        if decoder.timestamp_unpacker is not None:
+            if not self._peek_bytes(1 + decoder.size):
+                return def_mesg.global_mesg_num, None
+
+            (value, ) = decoder.timestamp_unpacker.unpack_from(
+                self._buf, self._buf_pos + 1 + decoder.timestamp_offset)
+            ts_field_def = decoder.field_defs[decoder.timestamp_index]
+            if value != ts_field_def.base_type.invalid:
+                timestamp = value
+
+        if time_offset is not None:
+            timestamp = self._apply_compressed_accumulation(
+                time_offset,
+                self._compressed_ts_accumulator if timestamp is None
+                else timestamp,
+                5)
+
+        return def_mesg.global_mesg_num, timestamp
+
+    def _restore(self, checkpoint):
+        # Move to *checkpoint* (see `FitIndex`), or to the beginning of the
+        # input if it is `None`, and restore the state of the reader from it
+        self._on_new_file()
+
+        if checkpoint is None:
+            self._goto(self._start_offset)
+            self._chunk_index = 0
+            return
+
+        # read the header, the developer data and the definitions the records
+        # that follow the checkpoint depend on
+        header_offset, *replay = checkpoint.replay
+        self._goto(header_offset)
+        self._read_header()
+        for offset in replay:
+            self._goto(offset)
+            self._read_record()
+
+        self._goto(checkpoint.offset)
+        self._chunk_index = checkpoint.chunk_index
+        self._body_bytes_left = checkpoint.body_bytes_left
+        self._set_state(checkpoint.state)
+        self._crc_incomplete = True
+
+    def _goto(self, offset):
+        # move the read cursor to *offset* in the file
+        if self._in_memory:
+            self._buf_pos = offset
+        else:
+            self._fd.seek(offset)
+            self._buf = b''
+            self._buf_pos = 0
+
+        self._read_offset = offset
+        self._chunk_offset = offset
+        self._chunk_size = 0
+        self._footer_read = False
+        self._crc_pos = self._buf_pos
+
+    def _get_state(self):
+        # the part of the state of the reader that depends on the data
+        # messages read so far in the current "FIT file" (see `FitIndex`)
+        return (
+            self._last_timestamp,
+            self._compressed_ts_accumulator,
+            {mesg_num: dict(accumulator)
+                for mesg_num, accumulator in self._accumulators.items()},
+            self._hr_start_timestamp)
+
+    def _set_state(self, state):
+        (self._last_timestamp,
+            self._compressed_ts_accumulator,
+            accumulators,
+            self._hr_start_timestamp) = state
+        self._accumulators = {
+            mesg_num: dict(accumulator)
+            for mesg_num, accumulator in accumulators.items()}
 
     def _on_new_file(self):
         # reset state
         self._crc = utils.CRC_START
+        self._crc_pos = self._buf_pos
+        self._crc_incomplete = False
         self._header = None
         self._body_bytes_left = 0
         self._local_mesg_defs = {}
@@ -341,6 +1104,7 @@ class FitReader:
         self._accumulators = {}
         self._last_timestamp = 0
         self._hr_start_timestamp = 0
+        self._time_ended = False
 
     def _read_header(self):
         try:
@@ -367,10 +1131,8 @@ class FitReader:
                 raise FitHeaderError('unsupported FIT header')
 
             extra_chunk = self._read_bytes(extra_header_size)
-            if len(extra_chunk) != extra_header_size:
-                raise FitHeaderError('truncated FIT header')
 
-            (read_crc, ) = struct.unpack('<H', extra_chunk)
+            (read_crc, ) = struct.unpack('<H', extra_chunk[:2])
             if not read_crc:  # can be null according to SDK
                 read_crc = None
                 crc_matched = None
@@ -380,8 +1142,6 @@ class FitReader:
                 if self.check_crc == CrcCheck.ENABLED and not crc_matched:
                     raise FitCRCError('invalid FIT header CRC')
 
-            chunk += extra_chunk
-
         proto_ver = (proto_ver >> 4, proto_ver & ((1 << 4) - 1))
         profile_ver = (int(profile_ver / 100), int(profile_ver % 100))
 
@@ -393,30 +1153,38 @@ class FitReader:
             body_size=body_size,
             crc=read_crc,
             crc_matched=crc_matched,
-            chunk=self._keep_chunk(chunk))
+            chunk=self._keep_chunk())
         self._body_bytes_left = body_size
 
         if self._processor:
             self._processor.on_header(self, self._header)
 
     def _read_crc(self):
+        self._update_crc()
         computed_crc = self._crc
         chunk, read_crc = self._read_struct('<H')
+        self._footer_read = True
 
-        if self.check_crc == CrcCheck.ENABLED and computed_crc != read_crc:
-            raise FitCRCError()
+        if self._crc_incomplete:
+            # the beginning of this FIT file has been skipped by `seek`
+            crc_matched = None
+        else:
+            crc_matched = computed_crc == read_crc
+            if self.check_crc == CrcCheck.ENABLED and not crc_matched:
+                raise FitCRCError()
 
-        crc_obj = records.FitCRC(
-            read_crc,
-            computed_crc == read_crc,
-            self._keep_chunk(chunk))
+        crc_obj = records.FitCRC(read_crc, crc_matched, self._keep_chunk())
 
         if self._processor:
             self._processor.on_crc(self, crc_obj)
 
         return crc_obj
 
-    def _read_record(self):
+    def _read_record(self, skip=False):
+        # Read the next record. If *skip* is true, it is a data message which
+        # is not to be yielded, and is only read to maintain reader's state
+        # (see `_skip_records`).
+
         # read header
         chunk = self._read_bytes(1)
         if chunk[0] & 0x80:  # bit 7: compressed timestamp?
@@ -436,22 +1204,13 @@ class FitReader:
         if record_header.is_definition:
             message = self._read_definition_message(chunk, record_header)
         else:
-            message = self._read_data_message(chunk, record_header)
-
-            if message.mesg_type is not None:
-                if message.mesg_type.mesg_num == profile.MESG_NUM_DEVELOPER_DATA_ID:
-                    self._add_dev_data_id(message)
-                elif message.mesg_type.mesg_num == profile.MESG_NUM_FIELD_DESCRIPTION:
-                    self._add_dev_field_description(message)
+            message = self._read_data_message(chunk, record_header, skip)
 
         return message
 
     def _read_definition_message(self, header_chunk, record_header):
-        record_chunks = [header_chunk]
-
         # read the "fixed content" part
         extra_chunk = self._read_bytes(5)
-        record_chunks.append(extra_chunk)
         endian = '<' if not extra_chunk[1] else '>'
         global_mesg_num, num_fields = struct.unpack(endian + '2xHB',
                                                     extra_chunk)
@@ -466,7 +1225,6 @@ class FitReader:
         # read field definitions
         for idx in range(num_fields):
             extra_chunk = self._read_bytes(field_unpacker.size)
-            record_chunks.append(extra_chunk)
 
             field_def_num, field_size, base_type_num = \
                 field_unpacker.unpack(extra_chunk)
@@ -499,13 +1257,11 @@ class FitReader:
         if record_header.is_developer_data:
             # read the number of developer fields definitions that follow
             extra_chunk = self._read_bytes(1)
-            record_chunks.append(extra_chunk)
             num_dev_fields = extra_chunk[0]
 
             # read field definitions
             for idx in range(num_dev_fields):
                 extra_chunk = self._read_bytes(field_unpacker.size)
-                record_chunks.append(extra_chunk)
 
                 field_def_num, field_size, dev_data_index = \
                     field_unpacker.unpack(extra_chunk)
@@ -526,17 +1282,29 @@ class FitReader:
             endian,
             field_defs,
             dev_field_defs,
-            self._keep_chunk(record_chunks))
+            self._keep_chunk())
+        if global_mesg_num in _FULLY_DECODED_MESGS:
+            projection = None
+        else:
+            projection = self._fields.get(global_mesg_num)
+        def_mesg.decoder = MessageDecoder(def_mesg, projection)
+        if self._processor:
+            def_mesg.decoder.message_processor = \
+                self._processor.get_message_processor(self, def_mesg)
 
         # According to FIT protocol's specification (section 4.8.3), it is ok to
         # redefine message types
         self._local_mesg_defs[record_header.local_mesg_num] = def_mesg
 
-        return def_mesg
+        if (self._include is not None and
+                global_mesg_num not in self._include) or (
+                    global_mesg_num in self._exclude):
+            def_mesg.decoder.skip = True
+            return _SKIPPED
 
-    def _read_data_message(self, header_chunk, record_header):
-        record_chunks = [header_chunk]
+        return def_mesg
 
+    def _read_data_message(self, header_chunk, record_header, skip=False):
         try:
             def_mesg = self._local_mesg_defs[record_header.local_mesg_num]
         except KeyError:
@@ -544,11 +1312,122 @@ class FitReader:
                 self._chunk_offset,
                 f'local message {record_header.local_mesg_num} not defined')
 
-        extra_chunks, raw_values = self._read_data_message_raw_values(def_mesg)
-        record_chunks.extend(extra_chunks)
+        if skip or def_mesg.decoder.skip:
+            if def_mesg.global_mesg_num not in _FULLY_DECODED_MESGS:
+                # the accumulators of the types of messages that are filtered
+                # out are of no use
+                self._skip_data_message(
+                    record_header, def_mesg, accumulate=skip)
+            else:
+                self._decode_data_message(
+                    record_header, def_mesg,
+                    self._read_data_message_raw_values(def_mesg))
+            return _SKIPPED
+
+        if self._output is DataOutput.PAYLOADS:
+            return self._read_data_payload(record_header, def_mesg)
+
+        raw_values = self._read_data_message_raw_values(def_mesg)
+
+        if self._output is not DataOutput.MESSAGES:
+            if def_mesg.global_mesg_num not in _FULLY_DECODED_MESGS:
+                return self._read_data_tuple(
+                    record_header, def_mesg, raw_values)
+
+            self._decode_data_message(record_header, def_mesg, raw_values)
+
+            ts_value = None
+            if record_header.time_offset is not None:
+                ts_value = self._compressed_ts_accumulator
+
+            # *raw_values* may also be held by the fields of the message, which
+            # are built on demand, and must not be scaled twice
+            return self._make_data_tuple(def_mesg, list(raw_values), ts_value)
+
+        return self._decode_data_message(record_header, def_mesg, raw_values)
+
+    def _decode_data_message(self, record_header, def_mesg, raw_values):
+        decoder = def_mesg.decoder
+
+        # the state of the reader is maintained now, even though the fields of
+        # the message may be built later, on demand
+        accumulated = None
+        if decoder.accumulate_plan:
+            accumulated = self._accumulate(def_mesg, raw_values)
+
+        for idx, field in decoder.timestamp_plan:
+            raw_value = raw_values[idx]
+            if raw_value is not None:
+                if field:
+                    self._last_timestamp = self._apply_scale_offset(
+                        field, field.render(raw_value))
+                else:
+                    self._last_timestamp = raw_value
+                self._compressed_ts_accumulator = raw_value
+
+        if decoder.sets_hr_start:
+            # hr.event_timestamp_12 fields are accumulated from an initial
+            # hr.event_timestamp value
+            self._hr_start_timestamp = self._last_timestamp
+
+        ts_value = None
+        if record_header.time_offset is not None:
+            ts_value = self._apply_compressed_accumulation(
+                record_header.time_offset, self._compressed_ts_accumulator, 5)
+            self._compressed_ts_accumulator = ts_value
+
+        if self._defer_fields:
+            fields = functools.partial(
+                self._build_fields, def_mesg, raw_values, accumulated,
+                self._hr_start_timestamp, ts_value, self._processor)
+        else:
+            fields = self._build_fields(
+                def_mesg, raw_values, accumulated, self._hr_start_timestamp,
+                ts_value, self._processor)
+
+        data_message = records.FitDataMessage(
+            record_header.is_developer_data,
+            record_header.local_mesg_num,
+            record_header.time_offset,
+            def_mesg,
+            fields,
+            self._keep_chunk())
+
+        if decoder.message_processor:
+            decoder.message_processor(self, data_message)
+
+        # keep track of the last file_id message, and register developer types
+        if def_mesg.global_mesg_num == profile.MESG_NUM_FILE_ID:
+            self._file_id = data_message
+        elif def_mesg.mesg_type is not None:
+            if def_mesg.global_mesg_num == profile.MESG_NUM_DEVELOPER_DATA_ID:
+                self._add_dev_data_id(data_message)
+            elif def_mesg.global_mesg_num == profile.MESG_NUM_FIELD_DESCRIPTION:
+                self._add_dev_field_description(data_message)
+
+        return data_message
+
+    def _build_fields(self, def_mesg, raw_values, accumulated,
+                      hr_start_timestamp, ts_value, processor, items=False):
+        # build the `FieldData` objects of a data message, which values depend
+        # on the state of the reader at the time the message was read: the
+        # values of its *accumulated* components (see `_accumulate`), the
+        # start of hr.event_timestamp_12, and its compressed timestamp
+        # *ts_value*
+        #
+        # if *items* is true, return ``(name, value)`` pairs instead, in which
+        # case `FieldData` objects are built only for the fields that have
+        # processors (see `FitDataMessage.to_dict`)
+        decoder = def_mesg.decoder
+        component_nums = decoder.component_nums
         message_fields = []
 
-        for field_def, raw_value in zip(def_mesg.all_field_defs, raw_values):
+        for idx, (field_def, raw_value, emit, expand) in enumerate(zip(
+                decoder.field_defs, raw_values, decoder.emits,
+                decoder.expands)):
+            if not emit and not expand:
+                # projected out: only needed to maintain reader's state
+                continue
 
             field, parent_field = field_def.field, None
             if field:
@@ -556,7 +1435,7 @@ class FitReader:
                     field, def_mesg, raw_values)
 
                 # resolve component fields
-                if field.components:
+                if expand and field.components:
                     # special case for hr.event_timestamp_12
                     is_hr_event_timestamp_12 = (
                         def_mesg.global_mesg_num == profile.MESG_NUM_HR and
@@ -564,6 +1443,10 @@ class FitReader:
                         field_def.def_num == profile.FIELD_NUM_HR_EVENT_TIMESTAMP_12)
 
                     for component in field.components:
+                        if (component_nums is not None and
+                                component.def_num not in component_nums):
+                            continue
+
                         # render its raw value
                         try:
                             cmp_raw_value = component.render(raw_value)
@@ -572,15 +1455,7 @@ class FitReader:
 
                         # apply accumulated value
                         if component.accumulate and cmp_raw_value is not None:
-                            accumulator = self._accumulators[
-                                def_mesg.global_mesg_num]
-
-                            cmp_raw_value = self._apply_compressed_accumulation(
-                                cmp_raw_value,
-                                accumulator[component.def_num],
-                                component.bits)
-
-                            accumulator[component.def_num] = cmp_raw_value
+                            cmp_raw_value = accumulated[idx, component]
 
                         # apply scale and offset from component, not from the
                         # dynamic field as they may differ
@@ -597,10 +1472,10 @@ class FitReader:
 
                         # special case: hr.event_timestamp_12
                         if is_hr_event_timestamp_12:
-                            assert self._hr_start_timestamp > 0
-                            cmp_value += self._hr_start_timestamp
+                            assert hr_start_timestamp > 0
+                            cmp_value += hr_start_timestamp
 
-                        message_fields.append(types.FieldData(
+                        message_fields.append((
                             None,              # field_def
                             cmp_field,         # field
                             cmp_parent_field,  # parent_field
@@ -612,99 +1487,206 @@ class FitReader:
             else:
                 decoded_value = raw_value
 
-            # specifics
-            if (field_def.def_num == profile.FIELD_NUM_TIMESTAMP and
-                    raw_value is not None):
-                self._last_timestamp = decoded_value
-                # update compressed timestamp field
-                self._compressed_ts_accumulator = raw_value
-            elif (def_mesg.global_mesg_num == profile.MESG_NUM_HR and
-                    not field_def.is_dev and
-                    field_def.def_num == profile.FIELD_NUM_HR_EVENT_TIMESTAMP):
-                # hr.event_timestamp_12 fields are accumulated from an initial
-                # hr.event_timestamp value
-                # assert self._last_timestamp > 0
-                self._hr_start_timestamp = self._last_timestamp
-
-            message_fields.append(types.FieldData(
-                field_def,      # field_def
-                field,          # field
-                parent_field,   # parent_field
-                decoded_value,  # value
-                raw_value))     # raw_value
+            if emit:
+                message_fields.append((
+                    field_def,      # field_def
+                    field,          # field
+                    parent_field,   # parent_field
+                    decoded_value,  # value
+                    raw_value))     # raw_value
 
         # apply timestamp field if we got a header
-        if record_header.time_offset is not None:
-            ts_value = self._apply_compressed_accumulation(
-                record_header.time_offset, self._compressed_ts_accumulator, 5)
-
-            self._compressed_ts_accumulator = ts_value
-
-            message_fields.append(types.FieldData(
+        if ts_value is not None and decoder.emit_timestamp:
+            message_fields.append((
                 None,                                           # field_def
                 profile.FIELD_TYPE_TIMESTAMP,                   # field
                 None,                                           # parent_field
                 profile.FIELD_TYPE_TIMESTAMP.render(ts_value),  # value
                 ts_value))                                      # raw_value
 
+        if items:
+            return self._field_items(decoder, message_fields, processor)
+
+        message_fields = [
+            types.FieldData(*field_args) for field_args in message_fields]
+
         # apply data processors
-        if self._processor:
+        if processor:
+            field_processors = decoder.field_processors
             for field_data in message_fields:
-                self._processor.on_process_type(self, field_data)
-                self._processor.on_process_field(self, field_data)
-                self._processor.on_process_unit(self, field_data)
+                key = field_data.field or field_data.field_def
+                try:
+                    handlers = field_processors[key]
+                except KeyError:
+                    handlers = processor.get_field_processors(
+                        self, field_data)
+                    field_processors[key] = handlers
+
+                for handler in handlers:
+                    handler(self, field_data)
+
+        return message_fields
+
+    def _field_items(self, decoder, message_fields, processor):
+        # the ``(name, value)`` pairs of the fields built by `_build_fields`
+        field_processors = decoder.field_processors if processor else {}
+        items = []
+
+        for field_args in message_fields:
+            field_def, field, _, value, _ = field_args
+            key = field or field_def
+
+            handlers = field_processors.get(key, ())
+            if key not in field_processors and processor:
+                field_data = types.FieldData(*field_args)
+                handlers = processor.get_field_processors(self, field_data)
+                field_processors[key] = handlers
+            elif handlers:
+                field_data = types.FieldData(*field_args)
+
+            if handlers:
+                for handler in handlers:
+                    handler(self, field_data)
+                items.append((field_data.name, field_data.value))
+            elif field:
+                items.append((field.name, value))
+            else:
+                items.append(('unknown_%d' % field_def.def_num, value))
 
-        data_message = records.FitDataMessage(
-            record_header.is_developer_data,
-            record_header.local_mesg_num,
-            record_header.time_offset,
-            def_mesg,
-            message_fields,
-            self._keep_chunk(record_chunks))
+        return items
 
-        if self._processor:
-            self._processor.on_process_message(self, data_message)
+    def _read_data_tuple(self, record_header, def_mesg, raw_values):
+        decoder = def_mesg.decoder
 
-        # keep track of the last file_id message
-        if def_mesg.global_mesg_num == profile.MESG_NUM_FILE_ID:
-            self._file_id = data_message
+        # update timestamp state
+        ts_index = decoder.timestamp_index
+        if ts_index is not None:
+            ts_value = raw_values[ts_index]
+            if ts_value is not None:
+                self._last_timestamp = ts_value
+                self._compressed_ts_accumulator = ts_value
 
-        return data_message
+        ts_value = None
+        if record_header.time_offset is not None:
+            ts_value = self._apply_compressed_accumulation(
+                record_header.time_offset, self._compressed_ts_accumulator, 5)
+            self._compressed_ts_accumulator = ts_value
 
-    def _read_data_message_raw_values(self, def_mesg):
-        raw_values = []
-        record_chunks = []
+        return self._make_data_tuple(def_mesg, raw_values, ts_value)
+
+    def _make_data_tuple(self, def_mesg, raw_values, ts_value):
+        # make a `FitDataTuple` of the list *raw_values*, which is modified
+        # in-place
+        decoder = def_mesg.decoder
+        scaled = self._output is DataOutput.TUPLES
+
+        if scaled:
+            for idx, field in decoder.scale_plan:
+                raw_value = raw_values[idx]
+                if raw_value is not None:
+                    raw_values[idx] = self._apply_scale_offset(field, raw_value)
+
+        if decoder.component_nums is not None:
+            # projected: drop the values that were only needed by the reader
+            raw_values = [
+                raw_value
+                for raw_value, emit in zip(raw_values, decoder.emits) if emit]
+
+        if ts_value is not None and decoder.emit_timestamp:
+            raw_values.append(ts_value)
+
+        return records.FitDataTuple(
+            decoder.get_schema(def_mesg, scaled, ts_value is not None),
+            tuple(raw_values),
+            self._keep_chunk())
+
+    def _read_data_payload(self, record_header, def_mesg):
+        decoder = def_mesg.decoder
+
+        if def_mesg.global_mesg_num in _FULLY_DECODED_MESGS:
+            start = self._consume_bytes(decoder.size)
+            payload = bytes(self._buf[start:start + decoder.size])
+            self._decode_data_message(
+                record_header, def_mesg, decoder.decode(self._buf, start))
+
+            ts_value = None
+            if record_header.time_offset is not None:
+                ts_value = self._compressed_ts_accumulator
+        else:
+            start, ts_value = self._skip_data_message(
+                record_header, def_mesg, accumulate=True)
+            payload = b''
+            if start is not None:
+                payload = bytes(self._buf[start:start + decoder.size])
+
+        return records.FitDataPayload(
+            def_mesg, payload, ts_value, self._keep_chunk())
+
+    def _skip_data_message(self, record_header, def_mesg, accumulate=False):
+        # consume the payload of a data message without decoding it, except
+        # for its timestamp, and for its accumulated components if
+        # *accumulate* is true. Return the position of the payload in `_buf`
+        # (or `None` if it is empty) and the value of the compressed timestamp
+        # header if any.
+        decoder = def_mesg.decoder
+        start = None
+        if decoder.size:
+            start = self._consume_bytes(decoder.size)
+
+            if accumulate and decoder.accumulate_plan:
+                self._accumulate(
+                    def_mesg, decoder.decode(self._buf, start))
+
+            if decoder.timestamp_unpacker is not None:
+                (ts_value, ) = decoder.timestamp_unpacker.unpack_from(
+                    self._buf, start + decoder.timestamp_offset)
+                ts_field_def = decoder.field_defs[decoder.timestamp_index]
+                if ts_value != ts_field_def.base_type.invalid:
+                    self._last_timestamp = ts_value
+                    self._compressed_ts_accumulator = ts_value
+
+        ts_value = None
+        if record_header.time_offset is not None:
+            ts_value = self._apply_compressed_accumulation(
+                record_header.time_offset, self._compressed_ts_accumulator, 5)
+            self._compressed_ts_accumulator = ts_value
 
-        for field_def in def_mesg.all_field_defs:
-            base_type = field_def.base_type
+        if accumulate and decoder.sets_hr_start:
+            self._hr_start_timestamp = self._last_timestamp
 
-            # struct format to read "[N]" base types
-            unpacker = struct.Struct(
-                def_mesg.endian +
-                str(int(field_def.size / base_type.size)) +
-                base_type.fmt)
-
-            # read the chunk
-            chunk = self._read_bytes(unpacker.size)
-            record_chunks.append(chunk)
-
-            # extract the raw value
-            raw_value = unpacker.unpack(chunk)
-
-            if base_type.identifier == types.BASE_TYPE_BYTE.identifier:
-                raw_value = base_type.parse(raw_value)
-            elif len(raw_value) > 1:
-                # If the field returns with a tuple of values it's definitely an
-                # oddball, but we'll parse it on a per-value basis. If it's a
-                # byte type, treat the tuple as a single value
-                raw_value = tuple(base_type.parse(v) for v in raw_value)
-            else:
-                # Otherwise, just scrub the singular value
-                raw_value = base_type.parse(raw_value[0])
+        return start, ts_value
+
+    def _accumulate(self, def_mesg, raw_values):
+        # update the accumulated components of a data message, and return
+        # their values by (field index, component), for `_build_fields`
+        accumulator = self._accumulators[def_mesg.global_mesg_num]
+        accumulated = {}
 
-            raw_values.append(raw_value)
+        for idx, components in def_mesg.decoder.accumulate_plan:
+            raw_value = raw_values[idx]
+            for component in components:
+                try:
+                    cmp_raw_value = component.render(raw_value)
+                except ValueError:
+                    continue
 
-        return record_chunks, raw_values
+                if cmp_raw_value is not None:
+                    cmp_raw_value = self._apply_compressed_accumulation(
+                        cmp_raw_value,
+                        accumulator[component.def_num],
+                        component.bits)
+                    accumulator[component.def_num] = cmp_raw_value
+                    accumulated[idx, component] = cmp_raw_value
+
+        return accumulated
+
+    def _read_data_message_raw_values(self, def_mesg):
+        decoder = def_mesg.decoder
+        if not decoder.size:
+            return [None] * len(decoder.field_defs)
+
+        start = self._consume_bytes(decoder.size)
+        return decoder.decode(self._buf, start)
 
     def _read_struct(self, fmt, *, endian=None):
         assert fmt
@@ -719,41 +1701,107 @@ class FitReader:
 
         return (chunk, ) + unpacker.unpack(chunk)
 
+    def _peek_bytes(self, size):
+        # Make *size* bytes available from the read cursor of `_buf`, without
+        # consuming them. Return false if EOF is reached first.
+        if len(self._buf) - self._buf_pos < size:
+            self._fill_buffer(size)
+        return len(self._buf) - self._buf_pos >= size
+
     def _read_bytes(self, size):
+        start = self._consume_bytes(size)
+        return self._buf[start:start + size]
+
+    def _consume_bytes(self, size):
+        # Consume *size* bytes from the read-ahead buffer and return the
+        # position of the first one in `_buf`
         if size <= 0:
             raise ValueError('size')
 
-        chunk = utils.blocking_read(self._fd, size)
-        chunk_size = 0 if not chunk else len(chunk)
-        if chunk_size != size:
-            raise FitEOFError(size, chunk_size, self._read_offset)
+        start = self._buf_pos
+        end = start + size
+        if end > len(self._buf):
+            self._fill_buffer(size)
+            start = self._buf_pos
+            end = start + size
+            if end > len(self._buf):
+                raise FitEOFError(size, len(self._buf) - start,
+                                  self._read_offset)
 
-        if chunk:
-            if self.check_crc != CrcCheck.DISABLED:
-                self._crc = utils.compute_crc(chunk, crc=self._crc)
-            self._chunk_size += chunk_size
-            self._read_offset += chunk_size
-            self._read_size += chunk_size
+        self._buf_pos = end
+
+        self._chunk_size += size
+        self._read_offset += size
+        self._read_size += size
+
+        return start
+
+    def _fill_buffer(self, size):
+        # Make at least *size* bytes available from the read-ahead buffer,
+        # unless EOF is reached. Consumed bytes are dropped, except the ones of
+        # the chunk being read so that it can be sliced by `_keep_chunk`.
+        if self._in_memory:
+            return
+
+        self._update_crc()
+
+        tail = self._buf[self._buf_pos - self._chunk_size:]
+        missing = size - (len(self._buf) - self._buf_pos)
+        assert missing > 0
 
-        return chunk
+        # read as much as possible from a single call, without waiting for
+        # more data than needed in case *fd* is a pipe
+        read_func = getattr(self._fd, 'read1', self._fd.read)
+        try:
+            data = read_func(max(missing, self._buffer_size))
+        except BlockingIOError:
+            data = None
+
+        if not data:
+            data = utils.blocking_read(self._fd, missing)
+        elif len(data) < missing:
+            more = utils.blocking_read(self._fd, missing - len(data))
+            if more:
+                data += more
+
+        self._buf = tail + data if data else tail
+        self._buf_pos = self._chunk_size
+        self._crc_pos = self._buf_pos
+
+    def _update_crc(self):
+        # The CRC is computed in bulk, over the bytes consumed from the
+        # read-ahead buffer since last call, instead of upon every read
+        if self._buf_pos > self._crc_pos:
+            if self.check_crc != CrcCheck.DISABLED:
+                self._crc = utils.compute_crc(
+                    self._buf, crc=self._crc,
+                    start=self._crc_pos, end=self._buf_pos)
+            self._crc_pos = self._buf_pos
 
-    def _keep_chunk(self, chunk):
+    def _map_file(self):
+        try:
+            fileno = self._fd.fileno()
+            mm = _mmap.mmap(fileno, 0, access=_mmap.ACCESS_READ)
+        except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+            # not a regular file, or empty
+            return
+
+        self._mmap = mm
+        self._buf = memoryview(mm)
+        self._buf_pos = self._read_offset
+        self._in_memory = True
+
+    def _keep_chunk(self):
         if not self._keep_raw:
             return None
 
-        assert chunk
-        assert isinstance(chunk, (list, tuple, bytes))
+        assert self._chunk_size > 0
 
-        if isinstance(chunk, (list, tuple)):
-            # *chunk* is a list of chunks
-            assert sum(map(lambda x: len(x), chunk)) == self._chunk_size
-            return records.FitChunk(
-                self._chunk_index, self._chunk_offset, b''.join(chunk))
+        end = self._buf_pos
+        chunk = self._buf[end - self._chunk_size:end]
+        assert len(chunk) == self._chunk_size
 
-        else:
-            assert len(chunk) == self._chunk_size
-            return records.FitChunk(
-                self._chunk_index, self._chunk_offset, chunk)
+        return records.FitChunk(self._chunk_index, self._chunk_offset, chunk)
 
     def _add_dev_data_id(self, message):
         dev_data_index = message.get_field('developer_data_index').raw_value
@@ -813,6 +1861,38 @@ class FitReader:
                 f'{dev_data_index} (local_mesg_num: {local_mesg_num}; ' +
                 f'global_mesg_num: {global_mesg_num})')
 
+    @staticmethod
+    def _resolve_mesg_nums(mesgs):
+        # convert an iterable of message names and/or numbers to a set of
+        # global message numbers
+        if mesgs is None:
+            return None
+        if isinstance(mesgs, (str, int)):
+            mesgs = (mesgs, )
+
+        mesg_nums = set()
+        for mesg in mesgs:
+            if isinstance(mesg, int):
+                mesg_nums.add(mesg)
+            else:
+                mesg_nums.add(utils.get_mesg_type(mesg).mesg_num)
+
+        return frozenset(mesg_nums)
+
+    @classmethod
+    def _resolve_projection(cls, fields):
+        # convert a mapping of message names and/or numbers to iterables of
+        # field names and/or numbers, to a dict of projections per global
+        # message number
+        projections = {}
+        for mesg, mesg_fields in (fields or {}).items():
+            if isinstance(mesg_fields, (str, int)):
+                mesg_fields = (mesg_fields, )
+            for mesg_num in cls._resolve_mesg_nums(mesg):
+                projections[mesg_num] = frozenset(mesg_fields)
+
+        return projections
+
     @staticmethod
     def _resolve_subfield(field, def_mesg, raw_values):
         # resolve into (field, parent) ie (subfield, field) or (field, none)
@@ -822,11 +1902,12 @@ class FitReader:
                 for ref_field in sub_field.ref_fields:
                     # go through field defs AND their raw values
                     for field_def, raw_value in zip(
-                            def_mesg.field_defs, raw_values):
+                            def_mesg.decoder.field_defs, raw_values):
                         # if there's a definition number AND raw value match on
                         # the reference field, then we return this subfield
                         if (field_def.def_num == ref_field.def_num and
-                                ref_field.raw_value == raw_value):
+                                ref_field.raw_value == raw_value and
+                                not field_def.is_dev):
                             return sub_field, field
 
         return field, None
@@ -10,8 +10,10 @@ import itertools
 
 __all__ = [
     'FitChunk', 'FitHeader', 'FitCRC', 'FitDefinitionMessage', 'FitDataMessage',
+    'FitDataSchema', 'FitDataTuple', 'FitDataPayload',
     'FIT_FRAME_HEADER', 'FIT_FRAME_CRC',
-    'FIT_FRAME_DEFMESG', 'FIT_FRAME_DATAMESG']
+    'FIT_FRAME_DEFMESG', 'FIT_FRAME_DATAMESG', 'FIT_FRAME_DATATUPLE',
+    'FIT_FRAME_DATAPAYLOAD']
 
 
 _UNSET = object()
@@ -20,6 +22,8 @@ FIT_FRAME_HEADER = 1
 FIT_FRAME_CRC = 2
 FIT_FRAME_DEFMESG = 3
 FIT_FRAME_DATAMESG = 4
+FIT_FRAME_DATATUPLE = 5
+FIT_FRAME_DATAPAYLOAD = 6
 
 
 class FitChunk:
@@ -76,7 +80,8 @@ class FitDefinitionMessage:
         'field_defs',
         'dev_field_defs',
 
-        'chunk')
+        'chunk',
+        'decoder')
 
     def __init__(self, is_developer_data, local_mesg_num, time_offset,
                  mesg_type, global_mesg_num, endian, field_defs, dev_field_defs,
@@ -90,6 +95,7 @@ class FitDefinitionMessage:
         self.field_defs = field_defs  #: list of `FieldDefinition`
         self.dev_field_defs = dev_field_defs  #: list of `DevFieldDefinition`
         self.chunk = chunk  #: `FitChunk` or `None` (depends on ``keep_raw_chunks`` option)
+        self.decoder = None  #: `fitdecode.reader.MessageDecoder` (set by `FitReader`)
 
     @property
     def name(self):
@@ -115,8 +121,9 @@ class FitDataMessage:
         'time_offset',
 
         'def_mesg',
-        'fields',
-        'chunk')
+        '_fields',
+        'chunk',
+        '_field_index')
 
     def __init__(self, is_developer_data, local_mesg_num, time_offset, def_mesg,
                  fields, chunk):
@@ -124,13 +131,34 @@ class FitDataMessage:
         self.local_mesg_num = local_mesg_num  #: The **local** definition number of this message
         self.time_offset = time_offset  #: Time offset in case header was compressed. `None` otherwise.
         self.def_mesg = def_mesg  #: `FitDefinitionMessage`
-        self.fields = fields  #: list of `FieldData`
+        self._fields = fields  # see `fields`
         self.chunk = chunk  #: `FitChunk` or `None` (depends on ``keep_raw_chunks`` option)
+        self._field_index = None  # see `_get_field_index`
 
     def __iter__(self):
         """Iterate over the `FieldData` object in this mesage"""
         return iter(self.fields)
 
+    @property
+    def fields(self):
+        """
+        `list` of `FieldData`
+
+        It may be built on demand, the first time it is accessed, in which case
+        *fields* was passed to the constructor as a callable that returns it
+        (see `fitdecode.DataProcessorBase.defers_fields`), or that returns
+        ``(name, value)`` pairs if its *items* argument is true (see
+        `to_dict`).
+        """
+        fields = self._fields
+        if callable(fields):
+            fields = self._fields = fields()
+        return fields
+
+    @fields.setter
+    def fields(self, fields):
+        self._fields = fields
+
     @property
     def name(self):
         """Message name"""
@@ -155,11 +183,7 @@ class FitDataMessage:
 
         .. seealso:: `get_field`, `get_fields`, `get_value`, `get_values`
         """
-        for field in self.fields:
-            if field.is_named(field_name_or_num):
-                return True
-
-        return False
+        return field_name_or_num in self._get_field_index()
 
     def get_field(self, field_name_or_num, idx=0):
         """
@@ -178,12 +202,9 @@ class FitDataMessage:
 
         .. seealso:: `get_fields`, `get_value`, `get_values`, `has_field`
         """
-        current_idx = -1
-        for field in self.fields:
-            if field.is_named(field_name_or_num):
-                current_idx += 1
-                if current_idx == idx:
-                    return field
+        positions = self._get_field_index().get(field_name_or_num, ())
+        if 0 <= idx < len(positions):
+            return self.fields[positions[idx]]
 
         raise KeyError(
             f'field "{field_name_or_num}" (idx #{idx}) not found in ' +
@@ -196,9 +217,9 @@ class FitDataMessage:
 
         .. seealso:: `get_field`, `get_value`, `get_values`, `has_field`
         """
-        for field in self.fields:
-            if field.is_named(field_name_or_num):
-                yield field
+        fields = self.fields
+        for pos in self._get_field_index().get(field_name_or_num, ()):
+            yield fields[pos]
 
     def get_value(self, field_name_or_num, *,
                   idx=0, fallback=_UNSET, raw_value=False,
@@ -248,13 +269,9 @@ class FitDataMessage:
                 # argument can be honored
                 pass
         else:
-            current_idx = -1
-            for field in self.fields:
-                if field.is_named(field_name_or_num):
-                    current_idx += 1
-                    if current_idx == idx:
-                        field_data = field
-                        break
+            positions = self._get_field_index().get(field_name_or_num, ())
+            if 0 <= idx < len(positions):
+                field_data = self.fields[positions[idx]]
 
         if not field_data:
             if fallback is _UNSET:
@@ -300,9 +317,223 @@ class FitDataMessage:
 
         .. seealso:: `get_value`, `get_field`, `get_fields`, `has_field`
         """
-        for idx, field_data in enumerate(self.fields):
-            if field_data.is_named(field_name_or_num):
-                value = self.get_value(
-                    None, idx=idx, raw_value=raw_value,
-                    fit_type=fit_type, py_type=py_type)
-                yield value
+        for idx in self._get_field_index().get(field_name_or_num, ()):
+            value = self.get_value(
+                None, idx=idx, raw_value=raw_value,
+                fit_type=fit_type, py_type=py_type)
+            yield value
+
+    def to_dict(self):
+        """
+        Get the values of the fields of this message as a `dict`, by field name
+        (`FieldData.name`). If several fields have the same name, the first one
+        is kept, like `get_value` does.
+
+        This is faster than building it from `fields`, especially if they have
+        not been built yet, in which case only the fields that have processors
+        are built.
+
+        .. seealso:: `to_tuple`, :meth:`fitdecode.FitReader.iter_dicts`
+        """
+        fields = self._fields
+        if callable(fields):
+            items = fields(items=True)
+        else:
+            items = [
+                (field_data.name, field_data.value) for field_data in fields]
+
+        values = {}
+        for name, value in items:
+            if name not in values:
+                values[name] = value
+
+        return values
+
+    def to_tuple(self, field_names, fallback=None):
+        """
+        Get the values of the *field_names* fields of this message as a
+        `tuple`, in this order, with *fallback* in place of the missing ones.
+
+        .. seealso:: `to_dict`
+        """
+        values = self.to_dict()
+        return tuple(values.get(name, fallback) for name in field_names)
+
+    def _get_field_index(self):
+        # Get the positions in `fields` of the fields matching every name and
+        # definition number they can be looked up by (see
+        # `FieldData.is_named`), as a `dict`.
+        #
+        # The data messages of a definition usually share the same layout of
+        # fields, which is why their index is built once and shared through
+        # the decoder of the definition. A layout may differ from one message
+        # to another though, because of subfields and component fields, so it
+        # is identified by the `Field` object of each field (or its
+        # definition if it is unknown), which determines all of its names.
+        fields = self.fields
+        index = self._field_index
+        if index is not None and index[0] is fields and \
+                index[1] == len(fields):
+            return index[2]
+
+        layout = tuple(
+            field_data.field or field_data.field_def for field_data in fields)
+
+        decoder = self.def_mesg.decoder
+        positions = decoder.field_indexes.get(layout) if decoder else None
+        if positions is None:
+            positions = _build_field_index(fields)
+            if decoder is not None:
+                decoder.field_indexes[layout] = positions
+
+        # *fields* may be replaced or altered after the message has been
+        # decoded (e.g. by a data processor)
+        self._field_index = (fields, len(fields), positions)
+
+        return positions
+
+
+def _build_field_index(fields):
+    # see `FitDataMessage._get_field_index`
+    positions = {}
+
+    for pos, field_data in enumerate(fields):
+        names = set()
+        for field in (field_data.field, field_data.parent_field):
+            if field:
+                names.add(field.def_num)
+                names.add(field.name)
+        if field_data.field_def:
+            names.add(field_data.field_def.def_num)
+
+        for name in names:
+            positions.setdefault(name, []).append(pos)
+
+    return {name: tuple(value) for name, value in positions.items()}
+
+
+class FitDataSchema:
+    """
+    Describes the values of the `FitDataTuple` objects that refer to the same
+    `FitDefinitionMessage`. It is shared by all of them.
+    """
+
+    __slots__ = ('def_mesg', 'names', 'def_nums', 'units', 'scaled', '_index')
+
+    def __init__(self, def_mesg, names, def_nums, units, scaled):
+        self.def_mesg = def_mesg  #: `FitDefinitionMessage`
+        self.names = names  #: `tuple` of field names
+        self.def_nums = def_nums  #: `tuple` of field definition numbers
+        self.units = units  #: `tuple` of field units (`str` or `None`)
+        self.scaled = scaled  #: have scale and offset been applied to values?
+
+        self._index = {}
+        for idx, (name, def_num) in enumerate(zip(names, def_nums)):
+            self._index.setdefault(name, idx)
+            self._index.setdefault(def_num, idx)
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def name(self):
+        """Message name"""
+        return self.def_mesg.name
+
+    @property
+    def global_mesg_num(self):
+        """The **global** definition number of the described messages"""
+        return self.def_mesg.global_mesg_num
+
+    def index(self, field_name_or_num):
+        """
+        Get the index of the first value of field *field_name_or_num* (`str`
+        name, or `int` definition number) in `FitDataTuple.values`.
+
+        Raise `KeyError` if field was not found.
+        """
+        return self._index[field_name_or_num]
+
+
+class FitDataTuple:
+    """
+    A lightweight alternative to `FitDataMessage`, yielded by
+    :class:`fitdecode.FitReader` instead of it, when its *output* option is
+    either `fitdecode.DataOutput.TUPLES` or `fitdecode.DataOutput.RAW_TUPLES`.
+
+    Values are neither rendered nor processed, subfields are not resolved, and
+    component fields are not expanded.
+    """
+
+    frame_type = FIT_FRAME_DATATUPLE
+
+    __slots__ = ('schema', 'values', 'chunk')
+
+    def __init__(self, schema, values, chunk):
+        self.schema = schema  #: `FitDataSchema`
+        self.values = values  #: `tuple` of values, in `FitDataSchema.names` order
+        self.chunk = chunk  #: `FitChunk` or `None` (depends on ``keep_raw_chunks`` option)
+
+    def __iter__(self):
+        return iter(self.values)
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def name(self):
+        """Message name"""
+        return self.schema.def_mesg.name
+
+    @property
+    def global_mesg_num(self):
+        """The **global** definition number of this message"""
+        return self.schema.def_mesg.global_mesg_num
+
+    def get_value(self, field_name_or_num, fallback=_UNSET):
+        """
+        Get the value of a field specified by its name or its definition
+        number (*field_name_or_num*).
+
+        *fallback* can be specified to avoid `KeyError` being raised in case no
+        field matched *field_name_or_num*.
+        """
+        try:
+            return self.values[self.schema.index(field_name_or_num)]
+        except KeyError:
+            if fallback is _UNSET:
+                raise KeyError(
+                    f'field "{field_name_or_num}" not found in ' +
+                    f'message "{self.name}"')
+            return fallback
+
+
+class FitDataPayload:
+    """
+    The undecoded payload of a data message, yielded by
+    :class:`fitdecode.FitReader` instead of `FitDataMessage` when its *output*
+    option is `fitdecode.DataOutput.PAYLOADS`.
+
+    The layout of *payload* is described by `FitDefinitionMessage.field_defs`
+    and `FitDefinitionMessage.dev_field_defs`, in this order.
+    """
+
+    frame_type = FIT_FRAME_DATAPAYLOAD
+
+    __slots__ = ('def_mesg', 'payload', 'timestamp', 'chunk')
+
+    def __init__(self, def_mesg, payload, timestamp, chunk):
+        self.def_mesg = def_mesg  #: `FitDefinitionMessage`
+        self.payload = payload  #: `bytes`
+        self.timestamp = timestamp  #: the value of the compressed timestamp header, or `None`
+        self.chunk = chunk  #: `FitChunk` or `None` (depends on ``keep_raw_chunks`` option)
+
+    @property
+    def name(self):
+        """Message name"""
+        return self.def_mesg.name
+
+    @property
+    def global_mesg_num(self):
+        """The **global** definition number of this message"""
+        return self.def_mesg.global_mesg_num
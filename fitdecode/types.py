@@ -6,6 +6,7 @@
 # This code is licensed under the MIT License.
 # See the LICENSE.txt file at the root of this project.
 
+import collections.abc
 import math
 import struct
 
@@ -13,16 +14,17 @@ __all__ = []
 
 
 class BaseType:
-    __slots__ = ('name', 'identifier', 'fmt', 'size', 'parse')
+    __slots__ = ('name', 'identifier', 'fmt', 'size', 'parse', 'invalid')
 
     enum = None  # in case we're treated as a FieldType
 
-    def __init__(self, name, identifier, fmt, parse):
+    def __init__(self, name, identifier, fmt, parse, invalid=None):
         self.name = name
         self.identifier = identifier
         self.fmt = fmt
         self.size = struct.calcsize(fmt)
         self.parse = parse
+        self.invalid = invalid  #: the "invalid" value of integer types, `None` otherwise
 
     @property
     def type_num(self):
@@ -190,6 +192,45 @@ class MessageType:
         self.fields = fields
 
 
+class LazyMapping(collections.abc.Mapping):
+    """
+    A read-only mapping which values are built on demand, the first time they
+    are accessed, by the factory functions of *factories* (a `dict` of
+    argument-less callables with the same keys), and then cached.
+
+    It holds the types of the generated ``profile`` module so that only the
+    ones that are actually used are built.
+    """
+
+    __slots__ = ('_factories', '_values')
+
+    def __init__(self, factories):
+        self._factories = factories
+        self._values = {}
+
+    def __getitem__(self, key):
+        try:
+            return self._values[key]
+        except KeyError:
+            pass
+
+        # may raise KeyError
+        value = self._factories[key]()
+
+        # in case another thread got there first, so that a key always maps to
+        # the same object
+        return self._values.setdefault(key, value)
+
+    def __contains__(self, key):
+        return key in self._factories
+
+    def __iter__(self):
+        return iter(self._factories)
+
+    def __len__(self):
+        return len(self._factories)
+
+
 class FieldDefinition:
     __slots__ = ('field', 'def_num', 'base_type', 'size')
 
@@ -369,20 +410,20 @@ BASE_TYPE_BYTE = BaseType(
 
 
 BASE_TYPES = {
-    0x00: BaseType(name='enum', identifier=0x00, fmt='B', parse=lambda x: None if x == 0xff else x),
-    0x01: BaseType(name='sint8', identifier=0x01, fmt='b', parse=lambda x: None if x == 0x7f else x),
-    0x02: BaseType(name='uint8', identifier=0x02, fmt='B', parse=lambda x: None if x == 0xff else x),
-    0x83: BaseType(name='sint16', identifier=0x83, fmt='h', parse=lambda x: None if x == 0x7fff else x),
-    0x84: BaseType(name='uint16', identifier=0x84, fmt='H', parse=lambda x: None if x == 0xffff else x),
-    0x85: BaseType(name='sint32', identifier=0x85, fmt='i', parse=lambda x: None if x == 0x7fffffff else x),
-    0x86: BaseType(name='uint32', identifier=0x86, fmt='I', parse=lambda x: None if x == 0xffffffff else x),
+    0x00: BaseType(name='enum', identifier=0x00, fmt='B', parse=lambda x: None if x == 0xff else x, invalid=0xff),
+    0x01: BaseType(name='sint8', identifier=0x01, fmt='b', parse=lambda x: None if x == 0x7f else x, invalid=0x7f),
+    0x02: BaseType(name='uint8', identifier=0x02, fmt='B', parse=lambda x: None if x == 0xff else x, invalid=0xff),
+    0x83: BaseType(name='sint16', identifier=0x83, fmt='h', parse=lambda x: None if x == 0x7fff else x, invalid=0x7fff),
+    0x84: BaseType(name='uint16', identifier=0x84, fmt='H', parse=lambda x: None if x == 0xffff else x, invalid=0xffff),
+    0x85: BaseType(name='sint32', identifier=0x85, fmt='i', parse=lambda x: None if x == 0x7fffffff else x, invalid=0x7fffffff),
+    0x86: BaseType(name='uint32', identifier=0x86, fmt='I', parse=lambda x: None if x == 0xffffffff else x, invalid=0xffffffff),
     0x07: BaseType(name='string', identifier=0x07, fmt='s', parse=parse_string),
     0x88: BaseType(name='float32', identifier=0x88, fmt='f', parse=lambda x: None if math.isnan(x) else x),
     0x89: BaseType(name='float64', identifier=0x89, fmt='d', parse=lambda x: None if math.isnan(x) else x),
-    0x0a: BaseType(name='uint8z', identifier=0x0a, fmt='B', parse=lambda x: None if x == 0 else x),
-    0x8b: BaseType(name='uint16z', identifier=0x8b, fmt='H', parse=lambda x: None if x == 0 else x),
-    0x8c: BaseType(name='uint32z', identifier=0x8c, fmt='I', parse=lambda x: None if x == 0 else x),
+    0x0a: BaseType(name='uint8z', identifier=0x0a, fmt='B', parse=lambda x: None if x == 0 else x, invalid=0),
+    0x8b: BaseType(name='uint16z', identifier=0x8b, fmt='H', parse=lambda x: None if x == 0 else x, invalid=0),
+    0x8c: BaseType(name='uint32z', identifier=0x8c, fmt='I', parse=lambda x: None if x == 0 else x, invalid=0),
     0x0d: BASE_TYPE_BYTE,
-    0x8e: BaseType(name='sint64', identifier=0x8e, fmt='q', parse=lambda x: None if x == 0x7fffffffffffffff else x),
-    0x8f: BaseType(name='uint64', identifier=0x8f, fmt='Q', parse=lambda x: None if x == 0xffffffffffffffff else x),
-    0x90: BaseType(name='uint64z', identifier=0x90, fmt='Q', parse=lambda x: None if x == 0 else x)}
+    0x8e: BaseType(name='sint64', identifier=0x8e, fmt='q', parse=lambda x: None if x == 0x7fffffffffffffff else x, invalid=0x7fffffffffffffff),
+    0x8f: BaseType(name='uint64', identifier=0x8f, fmt='Q', parse=lambda x: None if x == 0xffffffffffffffff else x, invalid=0xffffffffffffffff),
+    0x90: BaseType(name='uint64z', identifier=0x90, fmt='Q', parse=lambda x: None if x == 0 else x, invalid=0)}
@@ -11,6 +11,11 @@ import time
 
 from . import profile
 
+try:
+    import crcmod as _crcmod
+except ImportError:
+    _crcmod = None
+
 __all__ = []
 
 
@@ -21,11 +26,33 @@ UNIT_NAME_TO_FUNC_REPLACEMENTS = (
     ('*', ' times '))
 
 CRC_START = 0
+CRC_POLY = 0xa001  # reversed polynomial of CRC-16/ARC (x^16 + x^15 + x^2 + 1)
 CRC_TABLE = (
     0x0000, 0xcc01, 0xd801, 0x1400, 0xf001, 0x3c00, 0x2800, 0xe401,
     0xa001, 0x6c00, 0x7800, 0xb401, 0x5000, 0x9c01, 0x8801, 0x4400)
 
 
+def _make_crc_table256():
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ CRC_POLY if crc & 1 else crc >> 1
+        table.append(crc)
+    return tuple(table)
+
+
+#: Byte-wise lookup table used by `compute_crc`
+CRC_TABLE256 = _make_crc_table256()
+
+# C implementation of the CRC, if available
+if _crcmod is not None:
+    _compute_crc_accel = _crcmod.mkCrcFun(
+        0x10000 | 0x8005, initCrc=CRC_START, rev=True, xorOut=0)
+else:
+    _compute_crc_accel = None
+
+
 def scrub_method_name(method_name, convert_units=False):
     """Create a valid Python name out of *method_name*"""
     if convert_units:
@@ -42,11 +69,12 @@ def get_mesg_type(mesg_name_or_num):
 
     Raise `ValueError` if type was not found.
     """
-    for mesg_num, mesg_type in profile.MESSAGE_TYPES.items():
-        if mesg_name_or_num in (mesg_num, mesg_type.name):
-            return mesg_type
-
-    raise ValueError(f'message type "{mesg_name_or_num}" not found')
+    # only the requested type is built (see `fitdecode.types.LazyMapping`)
+    mesg_num = profile.MESG_NUMS.get(mesg_name_or_num, mesg_name_or_num)
+    try:
+        return profile.MESSAGE_TYPES[mesg_num]
+    except KeyError:
+        raise ValueError(f'message type "{mesg_name_or_num}" not found')
 
 
 def get_mesg_num(mesg_name):
@@ -55,11 +83,10 @@ def get_mesg_num(mesg_name):
 
     Raise `ValueError` if type was not found.
     """
-    for mesg_type in profile.MESSAGE_TYPES.values():
-        if mesg_name == mesg_type.name:
-            return mesg_type
-
-    raise ValueError(f'message type "{mesg_name}" not found')
+    try:
+        return profile.MESG_NUMS[mesg_name]
+    except KeyError:
+        raise ValueError(f'message type "{mesg_name}" not found')
 
 
 def get_mesg_field(mesg_name_or_num, field_name_or_num):
@@ -101,7 +128,7 @@ def get_field_type(field_name):
     Raise `ValueError` if type was not found.
     """
     try:
-        return profile.FIELD_TYPE[field_name]
+        return profile.FIELD_TYPES[field_name]
     except KeyError:
         raise ValueError(f'field type "{field_name}" not found')
 
@@ -110,6 +137,12 @@ def compute_crc(byteslike, *, crc=CRC_START, start=0, end=None):
     """
     Compute the CRC as per FIT definition, of *byteslike* object, from offset
     *start* (included) to *end* (excluded)
+
+    The CRC can be computed either in bulk or incrementally by passing the
+    value returned by a previous call as *crc*.
+
+    The optional `crcmod <https://pypi.org/project/crcmod/>`_ package is used
+    if it is installed, which is much faster than the pure Python fallback.
     """
     if not end:
         end = len(byteslike)
@@ -118,25 +151,15 @@ def compute_crc(byteslike, *, crc=CRC_START, start=0, end=None):
         assert 0
         return crc
 
-    # According to some performance tests, A is always (at least slightly)
-    # faster than B, either with a high number of calls to this fonction, and/or
-    # with a high number of "for" iterations (CPython 3.6.5 x64 on Windows).
-    #
-    # A. for byte in memoryview(byteslike)[start:end]:
-    #        # ...
-    #
-    # B. for idx in range(start, end):
-    #        byte = byteslike[idx]
-    #        # ...
-
-    for byte in memoryview(byteslike)[start:end]:
-        tmp = CRC_TABLE[crc & 0xf]
-        crc = (crc >> 4) & 0x0fff
-        crc = crc ^ tmp ^ CRC_TABLE[byte & 0xf]
-
-        tmp = CRC_TABLE[crc & 0xf]
-        crc = (crc >> 4) & 0x0fff
-        crc = crc ^ tmp ^ CRC_TABLE[(byte >> 4) & 0xf]
+    if start or end != len(byteslike):
+        byteslike = memoryview(byteslike)[start:end]
+
+    if _compute_crc_accel is not None:
+        return _compute_crc_accel(byteslike, crc)
+
+    table = CRC_TABLE256
+    for byte in byteslike:
+        crc = (crc >> 8) ^ table[(crc ^ byte) & 0xff]
 
     return crc
 
@@ -56,10 +56,16 @@ setuptools.setup(
     entry_points={
         'console_scripts': [
             'fitjson=fitdecode.cmd.fitjson:main',
+            'fitparquet=fitdecode.cmd.fitparquet:main',
             'fittxt=fitdecode.cmd.fittxt:main']},
 
     install_requires=[],
-    extras_require={'docs': ['sphinx', 'sphinx_rtd_theme']},
+    extras_require={
+        'docs': ['sphinx', 'sphinx_rtd_theme'],
+        'arrow': ['numpy', 'pyarrow'],
+        'numpy': ['numpy'],
+        'pandas': ['numpy', 'pandas'],
+        'speedups': ['crcmod', 'orjson']},
 
     test_suite="tests",
     tests_require=[])
@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+#
+# fitdecode
+#
+# Copyright (c) 2018-2019 Jean-Charles Lefebvre
+# All rights reserved.
+#
+# This code is licensed under the MIT License.
+# See the LICENSE.txt file at the root of this project.
+
+import math
+import os.path
+import tempfile
+import unittest
+
+import fitdecode
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+    import fitdecode.arrow
+except ImportError:
+    pyarrow = None
+
+TEST_FILES_DIR = os.path.join(os.path.dirname(__file__), 'files')
+
+
+def _test_file(name):
+    return os.path.join(TEST_FILES_DIR, name)
+
+
+def _values(table):
+    # the values of a table, where NaN values are equal to each other
+    def _value(value):
+        if isinstance(value, list):
+            return [_value(item) for item in value]
+        if isinstance(value, float) and math.isnan(value):
+            return 'nan'
+        return value
+
+    return {
+        name: [_value(value) for value in values]
+        for name, values in table.to_pydict().items()}
+
+
+@unittest.skipIf(
+    numpy is None or pyarrow is None, 'NumPy or pyarrow is not installed')
+class ArrowTestCase(unittest.TestCase):
+    def test_read_table(self):
+        path = _test_file('garmin-fenix-5-run.fit')
+        table = fitdecode.arrow.read_table(path)
+        columns = fitdecode.to_columns(path)
+
+        self.assertEqual(table.schema.metadata[b'message'], b'record')
+        self.assertEqual(table.column_names, list(columns.keys()))
+        self.assertEqual(table.schema.field('speed').metadata[b'units'], b'm/s')
+        self.assertEqual(
+            str(table.schema.field('timestamp').type), 'timestamp[s, tz=UTC]')
+
+        self.assertEqual(
+            table.column('heart_rate').to_pylist(),
+            columns['heart_rate'].tolist())
+        self.assertEqual(
+            table.column('activity_type').to_pylist(),
+            ['running'] * table.num_rows)
+
+    def test_batches(self):
+        path = _test_file('garmin-fenix-5-run.fit')
+        num_rows = len(fitdecode.to_columns(path, fields=['timestamp'])[
+            'timestamp'])
+
+        batches = [
+            batch for name, batch in fitdecode.arrow.iter_batches(
+                path, mesgs=['record'], batch_size=100)]
+        self.assertTrue(all(batch.num_rows <= 100 for batch in batches))
+        self.assertEqual(sum(batch.num_rows for batch in batches), num_rows)
+
+        table = fitdecode.arrow.read_table(path, batch_size=100)
+        self.assertEqual(table.num_rows, num_rows)
+
+    def test_small_batches(self):
+        for name in (
+                'Activity.fit',
+                'garmin-fenix-5-run.fit',
+                'garmin-fenix-5-walk.fit',
+                'garmin-fr935-cr.fit',
+                'sample-activity-indoor-trainer.fit'):
+            path = _test_file(name)
+            expected = fitdecode.arrow.read_tables(path)
+            tables = fitdecode.arrow.read_tables(path, batch_size=3)
+            with self.subTest(name=name):
+                self.assertEqual(
+                    sorted(tables.keys()), sorted(expected.keys()))
+                for mesg_name, table in tables.items():
+                    self.assertEqual(table.schema, expected[mesg_name].schema)
+                    self.assertEqual(
+                        table.num_rows, expected[mesg_name].num_rows)
+
+        # the type of a column does not depend on the values of a batch
+        tables = fitdecode.arrow.read_tables(
+            _test_file('Activity.fit'), mesgs=['event'], batch_size=1)
+        self.assertEqual(
+            str(tables['event'].schema.field('data').type), 'uint32')
+
+        # nor on the fields present in a batch
+        expected = fitdecode.arrow.read_table(
+            _test_file('event_timestamp.fit'))
+        table = fitdecode.arrow.read_table(
+            _test_file('event_timestamp.fit'), batch_size=3)
+        self.assertEqual(table.schema, expected.schema)
+        self.assertEqual(_values(table), _values(expected))
+
+    def test_write_parquet_small_batches(self):
+        path = _test_file('garmin-fr935-cr.fit')
+        expected = fitdecode.arrow.read_tables(path)
+        with tempfile.TemporaryDirectory() as outdir:
+            paths = fitdecode.arrow.write_parquet(path, outdir, batch_size=3)
+            self.assertEqual(sorted(paths.keys()), sorted(expected.keys()))
+            for name, path in paths.items():
+                # Parquet has no timestamp[s] type
+                table = pyarrow.parquet.read_table(path).cast(
+                    expected[name].schema)
+                self.assertEqual(
+                    _values(table), _values(expected[name]), msg=name)
+
+    def test_write_parquet(self):
+        with tempfile.TemporaryDirectory() as outdir:
+            paths = fitdecode.arrow.write_parquet(
+                _test_file('DeveloperData.fit'), outdir, batch_size=2)
+            self.assertEqual(
+                sorted(paths.keys()),
+                ['developer_data_id', 'field_description', 'file_id',
+                 'record'])
+
+            parquet_file = pyarrow.parquet.ParquetFile(paths['record'])
+            self.assertEqual(parquet_file.metadata.num_row_groups, 2)
+
+            table = parquet_file.read()
+            self.assertEqual(
+                table.column('doughnuts_earned').to_pylist(), [1, 2, 3])
+            self.assertEqual(
+                table.schema.field('doughnuts_earned').metadata[b'units'],
+                b'doughnuts')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+#
+# fitdecode
+#
+# Copyright (c) 2018-2019 Jean-Charles Lefebvre
+# All rights reserved.
+#
+# This code is licensed under the MIT License.
+# See the LICENSE.txt file at the root of this project.
+
+import glob
+import os.path
+import pickle
+import unittest
+
+import fitdecode
+import fitdecode.batch
+
+TEST_FILES_DIR = os.path.join(os.path.dirname(__file__), 'files')
+
+
+def _test_file(name):
+    return os.path.join(TEST_FILES_DIR, name)
+
+
+def _invalid_test_file(name):
+    return os.path.join(TEST_FILES_DIR, 'invalid', name)
+
+
+def _count_data_messages(fit):
+    return sum(
+        1 for frame in fit if frame.frame_type == fitdecode.FIT_FRAME_DATAMESG)
+
+
+class BatchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.paths = sorted(glob.glob(_test_file('*.fit')))[:8]
+        self.expected = [
+            (path, _count_data_messages(fitdecode.FitReader(path)))
+            for path in self.paths]
+
+    def test_decode_many(self):
+        for workers in (1, 2):
+            results = list(fitdecode.batch.decode_many(
+                self.paths, _count_data_messages,
+                workers=workers, chunksize=3, max_pending=1))
+            self.assertEqual(results, self.expected)
+
+    def test_unordered(self):
+        results = fitdecode.batch.decode_many(
+            iter(self.paths), _count_data_messages, workers=2, ordered=False)
+        self.assertEqual(sorted(results), self.expected)
+
+    def test_errors(self):
+        paths = [
+            _test_file('Activity.fit'),
+            _invalid_test_file('activity-unexpected-eof.fit')]
+
+        results = list(fitdecode.batch.decode_many(
+            paths, _count_data_messages, workers=2, return_exceptions=True))
+        self.assertIsInstance(results[0][1], int)
+        self.assertIsInstance(results[1][1], fitdecode.FitEOFError)
+        self.assertEqual(results[1][1].offset, 752)
+
+        with self.assertRaises(fitdecode.FitEOFError):
+            list(fitdecode.batch.decode_many(
+                paths, _count_data_messages, workers=2))
+
+    def test_decode_chained(self):
+        path = _test_file('garmin-fr935-cr.fit')
+
+        # data messages per embedded file, when the file is read sequentially
+        expected = []
+        for frame in fitdecode.FitReader(path):
+            if frame.frame_type == fitdecode.FIT_FRAME_HEADER:
+                expected.append(0)
+            elif frame.frame_type == fitdecode.FIT_FRAME_DATAMESG:
+                expected[-1] += 1
+
+        segments = fitdecode.batch.scan_chain(path)
+        self.assertEqual(len(segments), 7)
+        self.assertEqual(segments[0].offset, 0)
+        self.assertEqual(
+            segments[-1].offset + segments[-1].size, os.path.getsize(path))
+
+        results = list(fitdecode.batch.decode_chained(
+            path, _count_data_messages, workers=2))
+        self.assertEqual([segment for segment, _ in results], segments)
+        self.assertEqual([count for _, count in results], expected)
+
+        with self.assertRaises(fitdecode.FitHeaderError):
+            fitdecode.batch.scan_chain(
+                _invalid_test_file('activity-settings-corruptheader.fit'))
+
+    def test_pickle_exceptions(self):
+        for exc in (
+                fitdecode.FitEOFError(5, 2, 784, 'truncated'),
+                fitdecode.FitParseError(12, 'oops')):
+            copy = pickle.loads(pickle.dumps(exc))
+            self.assertEqual(str(copy), str(exc))
+            self.assertEqual(copy.offset, exc.offset)
+
+
+if __name__ == '__main__':
+    unittest.main()
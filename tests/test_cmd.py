@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+#
+# fitdecode
+#
+# Copyright (c) 2018-2019 Jean-Charles Lefebvre
+# All rights reserved.
+#
+# This code is licensed under the MIT License.
+# See the LICENSE.txt file at the root of this project.
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import os.path
+import tempfile
+import unittest
+
+import fitdecode
+from fitdecode.cmd import common
+from fitdecode.cmd import fitjson
+from fitdecode.cmd import fittxt
+
+TEST_FILES_DIR = os.path.join(os.path.dirname(__file__), 'files')
+
+
+def _test_file(name):
+    return os.path.join(TEST_FILES_DIR, name)
+
+
+def _run(main, args):
+    # run the *main* function of a command with *args*, and return its exit
+    # code, and what it printed to stdout and stderr
+    stdout = io.StringIO()
+    stderr = io.StringIO()
+    with contextlib.redirect_stdout(stdout), \
+            contextlib.redirect_stderr(stderr):
+        exit_code = main(args)
+    return exit_code, stdout.getvalue(), stderr.getvalue()
+
+
+def _relpaths(dirpath):
+    # the sorted paths of the files in the tree of *dirpath*, relative to it
+    return sorted(
+        os.path.relpath(os.path.join(parent, name), dirpath)
+        for parent, _, filenames in os.walk(dirpath) for name in filenames)
+
+
+def _read_frames(name):
+    return list(fitdecode.FitReader(
+        _test_file(name),
+        processor=fitdecode.StandardUnitsDataProcessor(),
+        keep_raw_chunks=True))
+
+
+class CommonTestCase(unittest.TestCase):
+    def test_mesg_name_or_num(self):
+        self.assertEqual(common.mesg_name_or_num('record'), 'record')
+        self.assertEqual(common.mesg_name_or_num('20'), 20)
+        with self.assertRaises(argparse.ArgumentTypeError):
+            common.mesg_name_or_num('foo')
+
+    def test_output_path(self):
+        paths = [
+            _test_file('Activity.fit'),
+            _test_file(os.path.join('invalid', 'activity-filecrc.fit'))]
+        basedir = common.common_dir(paths)
+        self.assertEqual(basedir, os.path.abspath(TEST_FILES_DIR))
+        self.assertEqual(
+            common.output_path(paths[1], 'out', basedir, '.json'),
+            os.path.join('out', 'invalid', 'activity-filecrc.json'))
+
+
+class FitJSONTestCase(unittest.TestCase):
+    def test_encoder(self):
+        frames = _read_frames('Activity.fit')
+
+        encoder = fitjson.FrameJSONEncoder()
+        obj = json.loads(encoder.encode(frames[0]))
+        self.assertEqual(obj['frame_type'], 'header')
+        self.assertEqual(obj['chunk']['offset'], 0)
+
+        encoded = encoder.encode(frames[-2])
+        self.assertIn('", "', encoded)
+        obj = json.loads(encoded)
+        self.assertEqual(obj['frame_type'], 'data_message')
+        self.assertIn('raw_value', obj['fields'][0])
+
+        encoder = fitjson.FrameJSONEncoder(compact=True, tags={'file': 'a'})
+        encoded = encoder.encode(frames[-2])
+        self.assertNotIn('", "', encoded)
+        obj = json.loads(encoded)
+        self.assertEqual(next(iter(obj)), 'file')
+        self.assertNotIn('chunk', obj)
+        self.assertNotIn('raw_value', obj['fields'][0])
+
+    @unittest.skipIf(fitjson.orjson is None, 'orjson is not installed')
+    def test_orjson(self):
+        for name in (
+                'Activity.fit',
+                '2019-02-17-062644-ELEMNT-297E-195-0.fit'):
+            frames = _read_frames(name)
+            for compact in (False, True):
+                encoder = fitjson.FrameJSONEncoder(compact=compact)
+                orjson_encoder = fitjson.FrameJSONEncoder(
+                    compact=compact, use_orjson=True)
+                with self.subTest(name=name, compact=compact):
+                    for frame in frames:
+                        self.assertEqual(
+                            json.loads(orjson_encoder.encode(frame)),
+                            json.loads(encoder.encode(frame)))
+
+    def test_main(self):
+        exit_code, stdout, stderr = _run(
+            fitjson.main, ['--filter', 'record', _test_file('Activity.fit')])
+        self.assertEqual(exit_code, 0)
+        self.assertEqual(stderr, '')
+
+        frames = json.loads(stdout)
+        self.assertEqual(frames[0]['frame_type'], 'header')
+        self.assertEqual(frames[-1]['frame_type'], 'crc')
+        self.assertEqual(
+            {frame['name'] for frame in frames[1:-1]}, {'record'})
+
+    def test_outdir(self):
+        infiles = [
+            _test_file('Workout*.fit'),
+            _test_file('invalid')]
+        with tempfile.TemporaryDirectory() as outdir:
+            exit_code, stdout, stderr = _run(
+                fitjson.main, ['-d', outdir, '-j', '2', *infiles])
+
+            # the tree of input files is mirrored into outdir
+            self.assertEqual(
+                _relpaths(outdir),
+                sorted(
+                    os.path.splitext(os.path.relpath(path, TEST_FILES_DIR))[0]
+                    + '.json'
+                    for path in common.expand_paths(infiles)))
+
+            with open(os.path.join(
+                    outdir, 'WorkoutRepeatSteps.json'),
+                    encoding='utf-8') as file:
+                frames = json.load(file)
+            self.assertEqual(
+                len(frames), len(_read_frames('WorkoutRepeatSteps.fit')))
+
+        # all the files of tests/files/invalid but one are errors
+        self.assertEqual(exit_code, 1)
+        self.assertEqual(stdout, '')
+        self.assertEqual(stderr.count('ERROR: '), 5)
+        self.assertIn('10 file(s)', stderr)
+        self.assertIn(', 5 error(s)', stderr)
+
+    def test_ndjson(self):
+        paths = common.expand_paths([_test_file('Workout*.fit')])
+        exit_code, stdout, stderr = _run(
+            fitjson.main, ['--ndjson', '--compact', '-j', '2', *paths])
+        self.assertEqual(exit_code, 0)
+        self.assertIn(', 0 error(s)', stderr)
+
+        # frames are tagged with their file, in the order of the files
+        objs = [json.loads(line) for line in stdout.splitlines()]
+        self.assertEqual(
+            [obj['file'] for obj in objs],
+            [path for path in paths for frame in _read_frames(path)])
+        self.assertEqual(objs[0]['frame_type'], 'header')
+        self.assertEqual(objs[-1]['frame_type'], 'crc')
+        self.assertNotIn('chunk', objs[0])
+
+
+class FitTXTTestCase(unittest.TestCase):
+    def test_outdir(self):
+        with tempfile.TemporaryDirectory() as outdir:
+            exit_code, stdout, stderr = _run(
+                fittxt.main, ['-d', outdir, _test_file('invalid')])
+
+            self.assertEqual(
+                _relpaths(outdir),
+                sorted(
+                    os.path.splitext(name)[0] + '.txt'
+                    for name in os.listdir(_test_file('invalid'))))
+
+        self.assertEqual(exit_code, 1)
+        self.assertIn('6 file(s)', stderr)
+        self.assertIn(', 5 error(s)', stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
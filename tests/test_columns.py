@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+#
+# fitdecode
+#
+# Copyright (c) 2018-2019 Jean-Charles Lefebvre
+# All rights reserved.
+#
+# This code is licensed under the MIT License.
+# See the LICENSE.txt file at the root of this project.
+
+import os.path
+import unittest
+
+import fitdecode
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    import pandas
+except ImportError:
+    pandas = None
+
+TEST_FILES_DIR = os.path.join(os.path.dirname(__file__), 'files')
+
+
+def _test_file(name):
+    return os.path.join(TEST_FILES_DIR, name)
+
+
+def _read_tuples(path, mesg, output=fitdecode.DataOutput.RAW_TUPLES):
+    return [
+        frame for frame in fitdecode.FitReader(
+            path, output=output, include=[mesg])
+        if isinstance(frame, fitdecode.FitDataTuple)]
+
+
+def _column_value(column, row):
+    value = column[row]
+    if value is numpy.ma.masked:
+        return None
+    if isinstance(value, numpy.generic):
+        value = value.item()
+    if isinstance(value, float) and value != value:  # NaN
+        return None
+    return value
+
+
+@unittest.skipIf(numpy is None, 'NumPy is not installed')
+class ColumnsTestCase(unittest.TestCase):
+    def test_to_columns(self):
+        for name in (
+                'Activity.fit',
+                'compressed-speed-distance.fit',
+                'garmin-fenix-5-run.fit',
+                'DeveloperData.fit'):
+            path = _test_file(name)
+            tuples = _read_tuples(path, 'record')
+            columns = fitdecode.to_columns(path, 'record', scaled=False)
+
+            for column in columns.values():
+                self.assertEqual(len(column), len(tuples))
+
+            for row, frame in enumerate(tuples):
+                for field_name, value in zip(frame.schema.names, frame.values):
+                    if isinstance(value, (tuple, bytes)):
+                        continue
+                    self.assertEqual(
+                        _column_value(columns[field_name], row), value)
+
+    def test_scaled_columns(self):
+        path = _test_file('garmin-fenix-5-run.fit')
+        tuples = _read_tuples(path, 'record', fitdecode.DataOutput.TUPLES)
+        columns = fitdecode.to_columns(path, 'record')
+
+        # scaled fields are float64 columns, with NaN for invalid values
+        for name in ('distance', 'altitude', 'speed', 'stance_time'):
+            self.assertEqual(columns[name].dtype, numpy.float64)
+            self.assertNotIsInstance(columns[name], numpy.ma.MaskedArray)
+
+        for row, frame in enumerate(tuples):
+            for field_name, value in zip(frame.schema.names, frame.values):
+                if value is None or isinstance(value, float):
+                    self.assertAlmostEqual(
+                        _column_value(columns[field_name], row), value)
+                else:
+                    self.assertEqual(
+                        _column_value(columns[field_name], row), value)
+
+    def test_decode_column(self):
+        field = fitdecode.utils.get_mesg_type('record').fields[6]  # speed
+        values = numpy.array([1000, 2500, 0xffff], dtype=numpy.uint16)
+
+        column = fitdecode.decode_column(values, values == 0xffff, field)
+        self.assertEqual(column[:2].tolist(), [1.0, 2.5])
+        self.assertTrue(numpy.isnan(column[2]))
+
+        column = fitdecode.decode_column(values, values == 0xffff)
+        self.assertEqual(column.tolist(), [1000, 2500, None])
+
+    def test_to_columns_fields(self):
+        path = _test_file('garmin-fenix-5-run.fit')
+        columns = fitdecode.to_columns(
+            path, 'record', fields=['timestamp', 'heart_rate', 2])
+
+        self.assertEqual(
+            set(columns.keys()), {'timestamp', 'heart_rate', 'altitude'})
+        self.assertEqual(columns['timestamp'].dtype, numpy.uint32)
+        self.assertEqual(columns['heart_rate'].dtype, numpy.uint8)
+        self.assertIsInstance(columns['heart_rate'], numpy.ma.MaskedArray)
+
+    def test_compressed_timestamp(self):
+        path = _test_file('compressed-speed-distance.fit')
+        timestamps = [
+            frame.get_value('timestamp')
+            for frame in _read_tuples(path, 'record')]
+        columns = fitdecode.to_columns(path, 'record', fields=['timestamp'])
+        self.assertEqual(columns['timestamp'].tolist(), timestamps)
+
+    def test_read_columns(self):
+        path = _test_file('activity-settings.fit')
+        columns = fitdecode.read_columns(path)
+        self.assertIn('file_id', columns)
+        self.assertNotIn('record', fitdecode.read_columns(path, mesgs=[0]))
+
+
+@unittest.skipIf(numpy is None or pandas is None, 'pandas is not installed')
+class DataFramesTestCase(unittest.TestCase):
+    def test_to_dataframes(self):
+        path = _test_file('garmin-fenix-5-run.fit')
+        frames = fitdecode.to_dataframes(path)
+        messages = [
+            frame for frame in fitdecode.FitReader(path)
+            if isinstance(frame, fitdecode.FitDataMessage)]
+
+        records = frames['record']
+        record_messages = [
+            message for message in messages if message.name == 'record']
+        self.assertEqual(len(records), len(record_messages))
+
+        self.assertEqual(str(records['timestamp'].dtype), 'datetime64[ns, UTC]')
+        self.assertEqual(
+            records['timestamp'].iloc[0].to_pydatetime(),
+            record_messages[0].get_value('timestamp'))
+
+        self.assertEqual(records['activity_type'].dtype, 'category')
+        self.assertEqual(
+            records['activity_type'].iloc[0],
+            record_messages[0].get_value('activity_type'))
+
+        self.assertEqual(records['heart_rate'].dtype, 'UInt8')
+        self.assertEqual(
+            records['heart_rate'].tolist()[:10],
+            [message.get_value('heart_rate', fallback=None)
+                for message in record_messages[:10]])
+
+        # enum values unknown to the profile are kept as they are
+        events = frames['event']
+        self.assertEqual(
+            events['event'].tolist(),
+            [message.get_value('event')
+                for message in messages if message.name == 'event'])
+
+    def test_developer_fields(self):
+        frames = fitdecode.to_dataframes(
+            _test_file('DeveloperData.fit'), mesgs=['record'])
+        self.assertEqual(list(frames.keys()), ['record'])
+        self.assertEqual(
+            frames['record']['doughnuts_earned'].tolist(), [1, 2, 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
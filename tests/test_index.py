@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+#
+# fitdecode
+#
+# Copyright (c) 2018-2019 Jean-Charles Lefebvre
+# All rights reserved.
+#
+# This code is licensed under the MIT License.
+# See the LICENSE.txt file at the root of this project.
+
+import datetime
+import os.path
+import shutil
+import tempfile
+import unittest
+
+import fitdecode
+
+TEST_FILES_DIR = os.path.join(os.path.dirname(__file__), 'files')
+
+
+def _test_file(name):
+    return os.path.join(TEST_FILES_DIR, name)
+
+
+def _frame_values(frame):
+    if isinstance(frame, fitdecode.FitDataMessage):
+        return [(field.name, field.value) for field in frame.fields]
+    return type(frame)
+
+
+class IndexTestCase(unittest.TestCase):
+    def test_build(self):
+        path = _test_file('garmin-fr935-cr.fit')
+        frames = list(fitdecode.FitReader(path, keep_raw_chunks=True))
+        index = fitdecode.FitIndex.build(path, checkpoint_interval=10)
+
+        self.assertEqual(len(index), len(frames))
+        self.assertEqual(index.file_size, os.path.getsize(path))
+        self.assertTrue(index.checkpoints)
+
+        for frame in frames:
+            entry = index[frame.chunk.index]
+            self.assertEqual(entry.offset, frame.chunk.offset)
+            self.assertEqual(entry.size, len(frame.chunk.bytes))
+            self.assertEqual(entry.frame_type, frame.frame_type)
+            if isinstance(frame, fitdecode.FitDataMessage):
+                self.assertEqual(entry.global_mesg_num, frame.global_mesg_num)
+                self.assertEqual(
+                    index[entry.def_index].offset, frame.def_mesg.chunk.offset)
+
+        self.assertEqual(
+            index.find_messages('device_info'),
+            [frame.chunk.index for frame in frames
+                if isinstance(frame, fitdecode.FitDataMessage) and
+                frame.name == 'device_info'])
+
+    def test_seek(self):
+        # accumulated fields and developer fields must survive seeking
+        for name in (
+                'compressed-speed-distance.fit',
+                'event_timestamp.fit',
+                'DeveloperData.fit'):
+            path = _test_file(name)
+            frames = [
+                _frame_values(frame) for frame in fitdecode.FitReader(path)]
+            index = fitdecode.FitIndex.build(path, checkpoint_interval=5)
+
+            with fitdecode.FitReader(path, index=index) as fit:
+                for chunk_index in range(len(frames) - 1, -1, -7):
+                    self.assertTrue(fit.seek(chunk_index))
+                    self.assertEqual(
+                        _frame_values(next(iter(fit))), frames[chunk_index])
+
+                # iteration goes on up to the end
+                middle = len(frames) // 2
+                fit.seek(middle)
+                self.assertEqual(
+                    [_frame_values(frame) for frame in fit], frames[middle:])
+
+    def test_seek_crc(self):
+        # the CRC of a file which beginning has been skipped cannot be checked
+        path = _test_file('compressed-speed-distance.fit')
+        index = fitdecode.FitIndex.build(path, checkpoint_interval=100)
+
+        with fitdecode.FitReader(path, index=index) as fit:
+            fit.seek(len(index) - 1)
+            self.assertIsNone(next(iter(fit)).matched)
+
+            fit.seek(0)
+            self.assertTrue(list(fit)[-1].matched)
+
+    def test_seek_forward(self):
+        path = _test_file('Activity.fit')
+        frames = list(fitdecode.FitReader(path, keep_raw_chunks=True))
+
+        with fitdecode.FitReader(path, keep_raw_chunks=True) as fit:
+            self.assertTrue(fit.seek(10))
+            self.assertEqual(next(iter(fit)).chunk.index, 10)
+            with self.assertRaises(ValueError):
+                fit.seek(5)
+            self.assertFalse(fit.seek(len(frames) + 1))
+
+    def test_time_range(self):
+        for name in (
+                'garmin-fenix-5-run.fit', 'null_compressed_speed_dist.fit'):
+            path = _test_file(name)
+            messages = [
+                frame for frame in fitdecode.FitReader(path)
+                if isinstance(frame, fitdecode.FitDataMessage)]
+            timestamps = [
+                message.get_field('timestamp').raw_value
+                if message.has_field('timestamp') else None
+                for message in messages]
+
+            valid_timestamps = sorted(
+                ts for ts in timestamps if ts is not None)
+            start = valid_timestamps[len(valid_timestamps) // 2]
+            end = start + 60
+            first = next(
+                idx for idx, ts in enumerate(timestamps)
+                if ts is not None and ts >= start)
+            last = next((
+                idx for idx, ts in enumerate(timestamps)
+                if idx > first and ts is not None and ts > end),
+                len(messages))
+            expected = [
+                _frame_values(frame) for frame in messages[first:last]]
+
+            index = fitdecode.FitIndex.build(path, checkpoint_interval=50)
+            for index in (None, index):
+                with fitdecode.FitReader(
+                        path, index=index, time_range=(start, end)) as fit:
+                    self.assertEqual(
+                        [_frame_values(frame) for frame in fit
+                         if isinstance(frame, fitdecode.FitDataMessage)],
+                        expected)
+
+                with fitdecode.FitReader(path, index=index) as fit:
+                    self.assertTrue(fit.seek_time(
+                        datetime.datetime.fromtimestamp(
+                            start + fitdecode.FIT_UTC_REFERENCE,
+                            datetime.timezone.utc)))
+                    frame = next(iter(fit))
+                    self.assertEqual(_frame_values(frame), expected[0])
+                    self.assertFalse(fit.seek_time(valid_timestamps[-1] + 1))
+
+    def test_time_range_end(self):
+        # the session messages of activity-large-fenxi2-multisport.fit come
+        # first, and are timestamped after the records
+        for name in (
+                'activity-large-fenxi2-multisport.fit',
+                'compressed-speed-distance.fit'):
+            path = _test_file(name)
+            timestamps = [
+                frame.get_field('timestamp').raw_value
+                for frame in fitdecode.FitReader(path)
+                if isinstance(frame, fitdecode.FitDataMessage) and
+                frame.name == 'record']
+            end = timestamps[len(timestamps) // 2]
+            expected = [ts for ts in timestamps if ts <= end]
+
+            with open(path, 'rb') as file:
+                data = file.read()
+
+            # the end of the first file does not end a chained input
+            for fileish, count in ((path, 1), (data + data, 2)):
+                with fitdecode.FitReader(
+                        fileish, time_range=(None, end)) as fit:
+                    messages = [
+                        frame for frame in fit
+                        if isinstance(frame, fitdecode.FitDataMessage)]
+
+                self.assertEqual(
+                    [message.get_field('timestamp').raw_value
+                     for message in messages if message.name == 'record'],
+                    expected * count)
+                self.assertTrue(all(
+                    message.get_field('timestamp').raw_value <= end
+                    for message in messages
+                    if message.has_field('timestamp')))
+
+    def test_sidecar(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'activity.fit')
+            shutil.copyfile(_test_file('garmin-fenix-5-run.fit'), path)
+
+            index = fitdecode.FitIndex.for_file(path, checkpoint_interval=50)
+            sidecar_path = fitdecode.FitIndex.sidecar_path(path)
+            self.assertTrue(os.path.exists(sidecar_path))
+
+            loaded = fitdecode.FitIndex.load(sidecar_path)
+            self.assertEqual(loaded.offsets, index.offsets)
+            self.assertEqual(loaded.timestamps, index.timestamps)
+            self.assertEqual(loaded.checkpoints, index.checkpoints)
+
+            laps = loaded.find_messages('lap')
+            with fitdecode.FitReader(path, index=loaded) as fit:
+                for chunk_index in laps:
+                    fit.seek(chunk_index)
+                    self.assertEqual(next(iter(fit)).name, 'lap')
@@ -8,12 +8,15 @@
 # This code is licensed under the MIT License.
 # See the LICENSE.txt file at the root of this project.
 
+import collections.abc
 import csv
 import datetime
 import glob
 import hashlib
+import io
 import os.path
 import struct
+import tempfile
 import unittest
 
 import fitdecode
@@ -142,6 +145,270 @@ class FitReaderTestCase(unittest.TestCase):
             # compare checksums
             self.assertEqual(h1.digest(), h2.digest())
 
+    def test_buffer_size(self):
+        """
+        Test that the size of the read-ahead buffer of FitReader does not
+        influence its output, including with stream objects that have neither
+        ``read1()`` nor ``tell()``
+        """
+        class _Stream:
+            def __init__(self, data):
+                self._fd = io.BytesIO(data)
+
+            def read(self, size=-1):
+                return self._fd.read(min(size, 5))
+
+        def _frames(fileish, **kwargs):
+            with fitdecode.FitReader(
+                    fileish,
+                    check_crc=fitdecode.CrcCheck.ENABLED,
+                    keep_raw_chunks=True,
+                    **kwargs) as fit:
+                return [(f.chunk.index, f.chunk.offset, f.chunk.bytes)
+                        for f in fit]
+
+        for name in ('activity-settings.fit', 'DeveloperData.fit'):
+            with open(_test_file(name), mode='rb') as fin:
+                data = fin.read()
+
+            expected = _frames(data)
+            self.assertEqual(b''.join(x[2] for x in expected), data)
+
+            for buffer_size in (1, 3, 64, 4096):
+                self.assertEqual(
+                    _frames(data, buffer_size=buffer_size), expected)
+
+            self.assertEqual(_frames(_Stream(data), buffer_size=7), expected)
+
+    def test_mmap(self):
+        """
+        Test that memory-mapped and in-memory inputs are decoded like regular
+        files
+        """
+        def _frames(fileish, **kwargs):
+            with fitdecode.FitReader(
+                    fileish,
+                    check_crc=fitdecode.CrcCheck.ENABLED,
+                    keep_raw_chunks=True,
+                    **kwargs) as fit:
+                return [bytes(f.chunk.bytes) for f in fit]
+
+        for name in ('activity-settings.fit', 'DeveloperData.fit'):
+            src_file = _test_file(name)
+            with open(src_file, mode='rb') as fin:
+                data = fin.read()
+
+            expected = _frames(src_file)
+            self.assertEqual(b''.join(expected), data)
+            self.assertEqual(_frames(src_file, mmap=True), expected)
+            self.assertEqual(_frames(bytearray(data)), expected)
+
+            with open(src_file, mode='rb') as fin:
+                self.assertEqual(_frames(fin, mmap=True), expected)
+
+        # chunks may outlive the reader
+        with fitdecode.FitReader(
+                _test_file('Activity.fit'),
+                keep_raw_chunks=True, mmap=True) as fit:
+            chunks = [frame.chunk for frame in fit]
+        self.assertIsInstance(chunks[0].bytes, memoryview)
+        self.assertEqual(bytes(chunks[0].bytes[8:12]), b'.FIT')
+
+    def test_message_decoder(self):
+        """Test the unpacking of every kind of field by MessageDecoder"""
+        base_types = {bt.name: bt for bt in fitdecode.types.BASE_TYPES.values()}
+
+        def _field_def(def_num, base_type, count=1):
+            base_type = base_types[base_type]
+            return fitdecode.types.FieldDefinition(
+                None, def_num, base_type, base_type.size * count)
+
+        field_defs = [
+            _field_def(0, 'uint16'), _field_def(1, 'uint8z'),
+            _field_def(2, 'string', 6), _field_def(3, 'byte', 3),
+            _field_def(4, 'sint8', 3), _field_def(5, 'float32'),
+            _field_def(6, 'uint32', 0)]
+
+        for endian in ('<', '>'):
+            def_mesg = fitdecode.FitDefinitionMessage(
+                False, 0, None, None, 0xffff, endian, field_defs, [], None)
+            decoder = fitdecode.reader.MessageDecoder(def_mesg)
+            payload = struct.pack(
+                endian + 'HB6s3B3bf',
+                0xffff, 7, b'abc\0\0\0', 0xff, 0xff, 0xff, 1, 0x7f, -3, 0.5)
+
+            self.assertEqual(decoder.size, len(payload))
+            self.assertEqual(
+                decoder.decode(payload),
+                [None, 7, 'abc', None, (1, None, -3), 0.5, None])
+
+            # integers-only layout
+            def_mesg = fitdecode.FitDefinitionMessage(
+                False, 0, None, None, 0xffff, endian, field_defs[:2], [], None)
+            decoder = fitdecode.reader.MessageDecoder(def_mesg)
+            self.assertEqual(
+                decoder.decode(struct.pack(endian + 'HB', 12, 0)), [12, None])
+
+    def test_compute_crc(self):
+        """
+        Test both implementations of compute_crc (i.e. with and without crcmod),
+        in bulk and incrementally
+        """
+        def _crc_nibble(data):
+            crc = 0
+            table = fitdecode.utils.CRC_TABLE
+            for byte in data:
+                tmp = table[crc & 0xf]
+                crc = (crc >> 4) & 0x0fff
+                crc = crc ^ tmp ^ table[byte & 0xf]
+                tmp = table[crc & 0xf]
+                crc = (crc >> 4) & 0x0fff
+                crc = crc ^ tmp ^ table[(byte >> 4) & 0xf]
+            return crc
+
+        with open(_test_file('Activity.fit'), mode='rb') as fin:
+            data = fin.read()
+
+        accel = fitdecode.utils._compute_crc_accel
+        try:
+            for impl in set((accel, None)):
+                fitdecode.utils._compute_crc_accel = impl
+                compute_crc = fitdecode.utils.compute_crc
+
+                self.assertEqual(compute_crc(data), 0)  # includes CRC footer
+                self.assertEqual(
+                    compute_crc(data, start=1, end=100), _crc_nibble(data[1:100]))
+
+                crc = compute_crc(data, end=10)
+                crc = compute_crc(data, crc=crc, start=10, end=500)
+                crc = compute_crc(bytearray(data), crc=crc, start=500)
+                self.assertEqual(crc, 0)
+        finally:
+            fitdecode.utils._compute_crc_accel = accel
+
+    def test_output_tuples(self):
+        """Test that tuples hold the same values than data messages"""
+        for name in ('compressed-speed-distance.fit', 'DeveloperData.fit',
+                     'garmin-edge-820-bike.fit'):
+            messages = [
+                frame for frame in fitdecode.FitReader(
+                    _test_file(name), processor=None)
+                if isinstance(frame, fitdecode.FitDataMessage)]
+
+            raw_tuples = [
+                frame for frame in fitdecode.FitReader(
+                    _test_file(name), output=fitdecode.DataOutput.RAW_TUPLES)
+                if isinstance(frame, fitdecode.FitDataTuple)]
+
+            tuples = [
+                frame for frame in fitdecode.FitReader(
+                    _test_file(name), output='tuples')
+                if frame.frame_type == fitdecode.FIT_FRAME_DATATUPLE]
+
+            self.assertEqual(len(messages), len(raw_tuples))
+            self.assertEqual(len(messages), len(tuples))
+
+            for message, raw_tuple, tuple_ in zip(messages, raw_tuples, tuples):
+                self.assertEqual(message.name, tuple_.name)
+                self.assertIs(raw_tuple.schema.scaled, False)
+                self.assertIs(tuple_.schema.scaled, True)
+
+                fields = [
+                    field_data for field_data in message.fields
+                    if not field_data.is_expanded or (
+                        message.time_offset is not None and
+                        field_data is message.fields[-1])]
+                self.assertEqual(
+                    [field_data.raw_value for field_data in fields],
+                    list(raw_tuple.values))
+                self.assertEqual(
+                    [field_data.def_num for field_data in fields],
+                    list(tuple_.schema.def_nums))
+
+                for field_data in fields:
+                    if field_data.parent_field or field_data.type.enum:
+                        continue  # subfield or rendered value
+                    self.assertEqual(
+                        tuple_.get_value(field_data.def_num),
+                        message.get_value(field_data.def_num))
+
+    def test_include_exclude(self):
+        """Test message filtering, including its effects on timestamps"""
+        def _dump(frames):
+            return [
+                (frame.name, [(f.name, f.value) for f in frame.fields])
+                for frame in frames
+                if isinstance(frame, fitdecode.FitDataMessage)]
+
+        for name, mesgs in (
+                ('compressed-speed-distance.fit', ('record', )),
+                ('garmin-fenix-5-run.fit', ('record', 'lap', 132)),
+                ('DeveloperData.fit', ('session', ))):
+            frames = tuple(fitdecode.FitReader(_test_file(name)))
+            mesg_nums = [
+                fitdecode.utils.get_mesg_type(mesg).mesg_num for mesg in mesgs]
+
+            def _is_included(frame):
+                return (
+                    frame.frame_type in (
+                        fitdecode.FIT_FRAME_HEADER, fitdecode.FIT_FRAME_CRC) or
+                    frame.global_mesg_num in mesg_nums)
+
+            included = tuple(fitdecode.FitReader(
+                _test_file(name), include=mesgs,
+                check_crc=fitdecode.CrcCheck.ENABLED))
+            self.assertEqual(
+                _dump(included), _dump(filter(_is_included, frames)))
+            self.assertTrue(all(map(_is_included, included)))
+
+            excluded = tuple(fitdecode.FitReader(
+                _test_file(name), exclude=mesgs))
+            self.assertEqual(
+                _dump(excluded),
+                _dump(f for f in frames if not _is_included(f)))
+
+    def test_field_projection(self):
+        """Test field projection, including components and subfields"""
+        def _dump(frames, fields):
+            dump = []
+            for frame in frames:
+                if not isinstance(frame, fitdecode.FitDataMessage):
+                    continue
+                names = fields.get(frame.name)
+                dump.append((frame.name, [
+                    (f.name, f.value) for f in frame.fields
+                    if names is None or
+                    f.name in names or
+                    (f.parent_field and f.parent_field.name in names)]))
+            return dump
+
+        for name, fields in (
+                ('compressed-speed-distance.fit', {
+                    'record': ('timestamp', 'speed', 'distance')}),
+                ('garmin-fenix-5-run.fit', {
+                    'record': ('timestamp', 'heart_rate', 'enhanced_speed'),
+                    'event': ('timer_trigger', 'data'),
+                    'lap': ('total_distance', )}),
+                ('event_timestamp.fit', {
+                    'hr': ('event_timestamp', )}),
+                ('DeveloperData.fit', {
+                    'record': ('heart_rate', 'doughnuts_earned')})):
+            frames = tuple(fitdecode.FitReader(_test_file(name)))
+            projected = tuple(fitdecode.FitReader(
+                _test_file(name), fields=fields))
+            self.assertEqual(
+                _dump(projected, {}), _dump(frames, fields))
+
+            tuples = tuple(
+                frame for frame in fitdecode.FitReader(
+                    _test_file(name), fields=fields,
+                    output=fitdecode.DataOutput.TUPLES)
+                if isinstance(frame, fitdecode.FitDataTuple))
+            for frame in tuples:
+                if frame.name in fields:
+                    self.assertTrue(
+                        set(frame.schema.names) <= set(fields[frame.name]))
+
     def test_fitparse_invalid_crc(self):
         try:
             tuple(fitdecode.FitReader(
@@ -376,6 +643,34 @@ class FitReaderTestCase(unittest.TestCase):
         for field in ('rear_gear', 12):
             self.assertEqual(gear_change.get_field(field).value, 20)
 
+        # both messages share their definition, not their layout of fields
+        self.assertFalse(gear_change.has_field('score'))
+        self.assertFalse(sport_point.has_field('rear_gear'))
+        self.assertEqual(len(sport_point.def_mesg.decoder.field_indexes), 2)
+
+    def test_field_index(self):
+        for frame in fitdecode.FitReader(
+                _test_file('garmin-fenix-5-run.fit')):
+            if not isinstance(frame, fitdecode.FitDataMessage):
+                continue
+
+            names = set()
+            for field_data in frame.fields:
+                names.update((field_data.name, field_data.def_num))
+            names.update(('unknown_name', 12345))
+
+            for name in names:
+                expected = [
+                    field_data for field_data in frame.fields
+                    if field_data.is_named(name)]
+                self.assertEqual(list(frame.get_fields(name)), expected)
+                self.assertEqual(frame.has_field(name), bool(expected))
+                if expected:
+                    self.assertIs(frame.get_field(name, len(expected) - 1),
+                                  expected[-1])
+                with self.assertRaises(KeyError):
+                    frame.get_field(name, len(expected))
+
     def test_fitparse_parsing_edge_500_fit_file(self):
         self._fitparse_csv_test_helper(
             'garmin-edge-500-activity.fit',
@@ -507,6 +802,203 @@ class FitReaderTestCase(unittest.TestCase):
                 _test_file(x),
                 processor=fitdecode.StandardUnitsDataProcessor()))
 
+    def test_processor_dispatch(self):
+        """
+        Test that processors' methods are called only for the fields they apply
+        to, and that overridden ``on_process_*`` methods are still honored
+        """
+        class _FieldProcessor(fitdecode.DataProcessorBase):
+            def __init__(self):
+                super().__init__()
+                self.fields = set()
+                self.messages = 0
+
+            def process_field_heart_rate(self, reader, field_data):
+                self.fields.add(field_data.name)
+                field_data.value = -1
+
+            def process_units_bpm(self, reader, field_data):
+                field_data.units = 'beats/min'
+
+            def process_message_record(self, reader, data_message):
+                self.messages += 1
+
+        class _TypeProcessor(fitdecode.DataProcessorBase):
+            def __init__(self):
+                super().__init__()
+                self.types = set()
+
+            def on_process_type(self, reader, field_data):
+                self.types.add(field_data.type.name)
+
+        processor = _FieldProcessor()
+        records = [
+            frame for frame in fitdecode.FitReader(
+                _test_file('garmin-fenix-5-run.fit'), processor=processor)
+            if isinstance(frame, fitdecode.FitDataMessage) and
+            frame.name == 'record']
+
+        self.assertEqual(processor.fields, {'heart_rate'})
+        self.assertEqual(processor.messages, len(records))
+        self.assertEqual(records[0].get_value('heart_rate'), -1)
+        self.assertEqual(records[0].get_field('heart_rate').units, 'beats/min')
+        self.assertIsInstance(records[0].get_value('timestamp'), int)
+
+        processor = _TypeProcessor()
+        tuple(fitdecode.FitReader(
+            _test_file('garmin-fenix-5-run.fit'), processor=processor))
+        self.assertIn('date_time', processor.types)
+        self.assertIn('uint8', processor.types)
+
+    def test_deferred_fields(self):
+        class _EagerProcessor(fitdecode.StandardUnitsDataProcessor):
+            pass
+
+        self.assertTrue(fitdecode.StandardUnitsDataProcessor.defers_fields)
+        self.assertFalse(_EagerProcessor.defers_fields)
+
+        def _values(frames):
+            return [
+                [(field_data.name, field_data.value, field_data.units)
+                 for field_data in frame.fields]
+                for frame in frames
+                if isinstance(frame, fitdecode.FitDataMessage)]
+
+        for name in ('event_timestamp.fit', 'compressed-speed-distance.fit'):
+            # fields are built once the whole file has been read, i.e. after
+            # the state of the reader (timestamps, accumulators) has moved on
+            deferred = list(fitdecode.FitReader(
+                _test_file(name),
+                processor=fitdecode.StandardUnitsDataProcessor()))
+            eager = list(fitdecode.FitReader(
+                _test_file(name), processor=_EagerProcessor()))
+
+            self.assertTrue(any(
+                callable(frame._fields) for frame in deferred
+                if isinstance(frame, fitdecode.FitDataMessage)))
+            self.assertFalse(any(
+                callable(frame._fields) for frame in eager
+                if isinstance(frame, fitdecode.FitDataMessage)))
+            self.assertEqual(_values(deferred), _values(eager))
+
+    def test_to_dict(self):
+        path = _test_file('event_timestamp.fit')
+
+        expected = []
+        for frame in fitdecode.FitReader(path):
+            if isinstance(frame, fitdecode.FitDataMessage):
+                values = {}
+                for field_data in frame.fields:
+                    values.setdefault(field_data.name, field_data.value)
+                expected.append((frame.name, values))
+
+        frames = [
+            frame for frame in fitdecode.FitReader(path)
+            if isinstance(frame, fitdecode.FitDataMessage)]
+        self.assertEqual(
+            [(frame.name, frame.to_dict()) for frame in frames], expected)
+
+        record = next(frame for frame in frames if frame.name == 'record')
+        self.assertEqual(
+            record.to_tuple(('heart_rate', 'timestamp', 'unknown_name')),
+            (record.get_value('heart_rate', fallback=None),
+             record.get_value('timestamp'), None))
+
+        with fitdecode.FitReader(path) as fit:
+            self.assertEqual(
+                list(fit.iter_dicts(mesg=('record', 'hr'))),
+                [values for name, values in expected
+                 if name in ('record', 'hr')])
+
+        with fitdecode.FitReader(
+                path, output=fitdecode.DataOutput.TUPLES) as fit:
+            with self.assertRaises(ValueError):
+                next(fit.iter_dicts())
+
+    def test_lazy_profile(self):
+        mesg_types = fitdecode.profile.MESSAGE_TYPES
+        self.assertIsInstance(mesg_types, fitdecode.types.LazyMapping)
+        self.assertIn(20, mesg_types)
+        self.assertNotIn(0xfff0, mesg_types)
+
+        record = fitdecode.utils.get_mesg_type('record')
+        self.assertIs(record, mesg_types[20])
+        self.assertIs(record, fitdecode.utils.get_mesg_type(20))
+        self.assertEqual(fitdecode.utils.get_mesg_num('record'), 20)
+        self.assertIs(
+            record.fields[253].type,
+            fitdecode.utils.get_field_type('date_time'))
+        with self.assertRaises(ValueError):
+            fitdecode.utils.get_mesg_type('unknown_message')
+
+        self.assertEqual(
+            sorted(mesg_types), sorted(fitdecode.profile.MESG_NUMS.values()))
+        self.assertEqual(
+            {mesg_type.name for mesg_type in mesg_types.values()},
+            set(fitdecode.profile.MESG_NUMS))
+
+    def test_profile_tables(self):
+        from fitdecode import profile_bin, profile_defs
+
+        def _flatten(obj):
+            # the attributes of a profile object, recursively and with their
+            # type (e.g. a scale of 100 is not a scale of 100.0)
+            if isinstance(obj, fitdecode.types.BaseType):
+                return obj.identifier
+            if isinstance(obj, collections.abc.Mapping):
+                return [(key, _flatten(value)) for key, value in obj.items()]
+            if isinstance(obj, tuple):
+                return tuple(map(_flatten, obj))
+            if hasattr(obj, '__slots__'):
+                return (type(obj), [
+                    (name, _flatten(getattr(obj, name)))
+                    for name in obj.__slots__])
+            return (type(obj), obj)
+
+        # the shipped tables match the Python definitions
+        data, crc = profile_bin.dump(
+            profile_defs.FIELD_TYPES, profile_defs.MESSAGE_TYPES,
+            profile_defs.FIELD_TYPE_TIMESTAMP)
+        self.assertEqual(crc, fitdecode.profile.PROFILE_TABLES_CRC)
+        with open(profile_bin.PATH, mode='rb') as fd:
+            self.assertEqual(fd.read(), data)
+
+        field_types, mesg_types, mesg_nums, field_type_timestamp = \
+            profile_bin.load(crc)
+        self.assertEqual(
+            _flatten(field_types), _flatten(profile_defs.FIELD_TYPES))
+        self.assertEqual(
+            _flatten(mesg_types), _flatten(profile_defs.MESSAGE_TYPES))
+        self.assertEqual(mesg_nums, profile_defs.MESG_NUMS)
+        self.assertEqual(
+            _flatten(field_type_timestamp),
+            _flatten(profile_defs.FIELD_TYPE_TIMESTAMP))
+
+        # shared objects remain so
+        self.assertIs(field_type_timestamp.type, field_types['date_time'])
+        for mesg_type in mesg_types.values():
+            field = mesg_type.fields.get(
+                fitdecode.profile.FIELD_NUM_TIMESTAMP)
+            if field is not None:
+                self.assertIs(field, field_type_timestamp)
+            for field in mesg_type.fields.values():
+                if not field.is_base_type:
+                    self.assertIs(field.type, field_types[field.type.name])
+
+        # stale, corrupted or missing tables
+        with self.assertRaises(ValueError):
+            profile_bin.load(crc ^ 1)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'profile.bin')
+            for corrupted in (
+                    data[:-1], data[:-1] + bytes([data[-1] ^ 1]), b''):
+                with open(path, mode='wb') as fd:
+                    fd.write(corrupted)
+                with self.assertRaises(ValueError):
+                    profile_bin.load(crc, path)
+            with self.assertRaises(OSError):
+                profile_bin.load(crc, path + '.missing')
+
     def test_fitparse_int_long(self):
         """Test that ints are properly shifted and scaled"""
         fit = tuple(fitdecode.FitReader(_test_file('event_timestamp.fit')))
@@ -0,0 +1,237 @@
+#!/usr/bin/env python
+#
+# fitdecode
+#
+# Copyright (c) 2018-2019 Jean-Charles Lefebvre
+# All rights reserved.
+#
+# This code is licensed under the MIT License.
+# See the LICENSE.txt file at the root of this project.
+#
+# Micro-benchmarks of some of fitdecode's hot paths.
+#
+# Usage:
+#     python tools/benchmark.py crc [FITFILE ...]
+#     python tools/benchmark.py json [FITFILE ...]
+#     python tools/benchmark.py import
+#
+
+import argparse
+import compileall
+import glob
+import os.path
+import subprocess
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import fitdecode
+from fitdecode import utils
+from fitdecode.cmd import fitjson
+
+ROOT_DIR = os.path.join(os.path.dirname(__file__), '..')
+TEST_FILES_DIR = os.path.join(ROOT_DIR, 'tests', 'files')
+
+
+def _input_files(options):
+    if options.files:
+        return options.files
+    return sorted(glob.glob(os.path.join(TEST_FILES_DIR, '*.fit')))
+
+
+def _read_files(files):
+    data = []
+    for path in files:
+        with open(path, mode='rb') as fin:
+            data.append(fin.read())
+    return data
+
+
+def _report(label, secs, size):
+    mbps = (size / (1024 * 1024)) / secs if secs > 0 else float('inf')
+    print(f'  {label:<36} {secs * 1000:10.2f} ms {mbps:10.2f} MB/s')
+
+
+def _best_of(func, repeat):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def _compute_crc_nibble(byteslike, crc=utils.CRC_START):
+    # the former nibble-wise implementation, for reference
+    table = utils.CRC_TABLE
+    for byte in byteslike:
+        tmp = table[crc & 0xf]
+        crc = (crc >> 4) & 0x0fff
+        crc = crc ^ tmp ^ table[byte & 0xf]
+
+        tmp = table[crc & 0xf]
+        crc = (crc >> 4) & 0x0fff
+        crc = crc ^ tmp ^ table[(byte >> 4) & 0xf]
+    return crc
+
+
+def bench_crc(options):
+    files = _input_files(options)
+    data = _read_files(files)
+    size = sum(map(len, data))
+    accel = utils._compute_crc_accel
+
+    print(f'CRC over {len(data)} file(s), {size} bytes')
+
+    _report(
+        'nibble-wise (former)',
+        _best_of(lambda: [_compute_crc_nibble(d) for d in data], options.repeat),
+        size)
+
+    try:
+        utils._compute_crc_accel = None
+        _report(
+            'byte-wise table (pure Python)',
+            _best_of(lambda: [utils.compute_crc(d) for d in data], options.repeat),
+            size)
+    finally:
+        utils._compute_crc_accel = accel
+
+    if accel is not None:
+        _report(
+            'crcmod',
+            _best_of(lambda: [utils.compute_crc(d) for d in data], options.repeat),
+            size)
+    else:
+        print('  crcmod                               not installed')
+
+    print(f'FitReader over {len(data)} file(s), {size} bytes')
+
+    for check_crc in fitdecode.CrcCheck:
+        def _decode():
+            for d in data:
+                for _ in fitdecode.FitReader(d, check_crc=check_crc):
+                    pass
+
+        _report(f'check_crc={check_crc.name}', _best_of(_decode, 1), size)
+
+
+def bench_json(options):
+    files = _input_files(options)
+    data = _read_files(files)
+    size = sum(map(len, data))
+
+    frames = []
+    for d in data:
+        frames.extend(fitdecode.FitReader(
+            d, processor=fitdecode.StandardUnitsDataProcessor(),
+            keep_raw_chunks=True))
+
+    print(f'JSON encoding of {len(frames)} frames from {len(data)} file(s), '
+          f'{size} bytes')
+
+    def _encode(encoder):
+        return lambda: [encoder.encode(frame) for frame in frames]
+
+    for compact in (False, True):
+        _report(
+            'FrameJSONEncoder' + (' compact' if compact else ''),
+            _best_of(
+                _encode(fitjson.FrameJSONEncoder(
+                    compact=compact, use_orjson=False)),
+                options.repeat),
+            size)
+
+    if fitjson.orjson is not None:
+        for compact in (False, True):
+            _report(
+                'FrameJSONEncoder orjson' + (' compact' if compact else ''),
+                _best_of(
+                    _encode(fitjson.FrameJSONEncoder(
+                        compact=compact, use_orjson=True)),
+                    options.repeat),
+                size)
+    else:
+        print('  orjson                               not installed')
+
+
+def _import_times(module, repeat):
+    # the best (self, cumulative) import times of each module imported by a
+    # fresh interpreter importing *module*, in microseconds, as reported by
+    # "python -X importtime"
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.path.abspath(ROOT_DIR)
+
+    times = {}
+    for _ in range(repeat):
+        proc = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+            cwd=ROOT_DIR, env=env, stderr=subprocess.PIPE,
+            universal_newlines=True, check=True)
+
+        for line in proc.stderr.splitlines():
+            if not line.startswith('import time:'):
+                continue
+            try:
+                self_time, cumulative, name = line.split('|')
+                self_time = int(self_time.rsplit(':', 1)[1])
+                cumulative = int(cumulative)
+            except ValueError:
+                continue  # header
+            name = name.strip()
+            best = times.get(name, (self_time, cumulative))
+            times[name] = (min(best[0], self_time), min(best[1], cumulative))
+
+    return times
+
+
+def bench_import(options):
+    # so that bytecode compilation is not measured
+    compileall.compile_dir(
+        os.path.join(ROOT_DIR, 'fitdecode'), quiet=1)
+
+    print('Import time of fitdecode (python -X importtime)')
+
+    times = _import_times('fitdecode', options.repeat)
+    for name, label in (
+            ('fitdecode', 'fitdecode'),
+            ('fitdecode.profile', 'fitdecode.profile (profile.bin)')):
+        print(f'  {label:<36} {times[name][1] / 1000:10.2f} ms')
+
+    # what fitdecode.profile costs when it falls back to the Python
+    # definitions, with missing or stale tables (the package itself is
+    # imported first, hence its self time)
+    times = _import_times('fitdecode.profile_defs', options.repeat)
+    label = 'fitdecode.profile_defs (fallback)'
+    print(f'  {label:<36} '
+          f'{times["fitdecode.profile_defs"][0] / 1000:10.2f} ms')
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description='Micro-benchmarks of some of fitdecode\'s hot paths')
+    parser.add_argument(
+        '-r', '--repeat', type=int, default=5,
+        help='Number of times each measure is repeated (best is kept)')
+
+    subparsers = parser.add_subparsers(dest='benchmark')
+    subparsers.required = True
+
+    parser_crc = subparsers.add_parser(
+        'crc', help='CRC computation, standalone and from FitReader')
+    parser_crc.add_argument('files', metavar='FITFILE', nargs='*')
+    parser_crc.set_defaults(func=bench_crc)
+
+    parser_json = subparsers.add_parser(
+        'json', help='JSON encoding of frames, as done by fitjson')
+    parser_json.add_argument('files', metavar='FITFILE', nargs='*')
+    parser_json.set_defaults(func=bench_json)
+
+    parser_import = subparsers.add_parser(
+        'import', help='Import time of the package, in new interpreters')
+    parser_import.set_defaults(func=bench_import)
+
+    options = parser.parse_args(args)
+    options.func(options)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,8 +4,10 @@
 # slightly corrected and improved to fit fitdecode's needs.
 #
 # Horrible, dirty, ugly, awful, and terrible script to export the Profile.xls
-# that comes with the FIT SDK to the Python data structures in profile.py. You
-# shouldn't have to use this unless you're developing python-fitparse.
+# that comes with the FIT SDK to the Python data structures in profile_defs.py,
+# to their binary tables in profile.bin (see fitdecode.profile_bin), and to the
+# profile.py module that loads them. You shouldn't have to use this unless
+# you're developing python-fitparse.
 #
 # You can download the SDK at http://www.thisisant.com/
 #
@@ -17,10 +19,15 @@ import datetime
 import os
 import re
 import sys
+import importlib.util
 import zipfile
 
 import xlrd  # Dev requirement for parsing Excel spreadsheet
 
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from fitdecode import profile_bin
+
 
 FIELD_NUM_TIMESTAMP = 253
 
@@ -46,11 +53,28 @@ IMPORT_HEADER = '''from .types import (
     ComponentField,
     Field,
     FieldType,
+    LazyMapping,
     MessageType,
     ReferenceField,
     SubField,
     BASE_TYPES)'''
 
+# The profile.py module loads the types from the binary tables, or from the
+# Python definitions if the tables are missing or stale
+LOADER_IMPORT_HEADER = 'from . import profile_bin'
+
+LOADER = '''#: the CRC-32 of the tables of ``profile.bin`` generated along with this
+#: module (see `fitdecode.profile_bin`)
+PROFILE_TABLES_CRC = 0x%08x
+
+try:
+    FIELD_TYPES, MESSAGE_TYPES, MESG_NUMS, FIELD_TYPE_TIMESTAMP = \\
+        profile_bin.load(PROFILE_TABLES_CRC)
+except (OSError, ValueError):
+    # missing or stale tables, fall back to the Python definitions
+    from .profile_defs import (  # noqa: F401
+        FIELD_TYPES, MESSAGE_TYPES, MESG_NUMS, FIELD_TYPE_TIMESTAMP)'''
+
 # This allows to prepend the declaration of some message numbers to the
 # generated file.
 # E.g. 'hr' -> MESG_NUM_HR = 132
@@ -58,7 +82,8 @@ MESSAGE_NUM_DECLARATIONS = (
     'file_id',
     'developer_data_id',
     'field_description',
-    'hr')
+    'hr',
+    'record')
 
 # This allows to prepend the declaration of some field numbers of specific
 # messages to the generated file.
@@ -124,14 +149,25 @@ class TypeList(namedtuple('TypeList', ('types'))):
         raise AssertionError("Couldn't find message by name: %s" % name)
 
     def __str__(self):
-        s = 'FIELD_TYPES = {\n'
-        for type in sorted(self.types, key=lambda x: x.name):
-            s += "    '%s': %s,\n" % (type.name, indent(type))
-        s += '}'
+        # field types are built on demand, by their factory function (see
+        # `fitdecode.types.LazyMapping`)
+        types = sorted(self.types, key=lambda x: x.name)
+        s = ''
+        for type in types:
+            s += "def %s():\n    return %s\n\n\n" % (
+                type.factory_name, indent(type))
+        s += 'FIELD_TYPES = LazyMapping({\n'
+        for type in types:
+            s += "    '%s': %s,\n" % (type.name, type.factory_name)
+        s += '})'
         return s
 
 
 class TypeInfo(namedtuple('TypeInfo', ('name', 'base_type', 'enum', 'comment'))):
+    @property
+    def factory_name(self):
+        return '_type_%s' % scrub_symbol_name(self.name)
+
     def get(self, value_name):
         for value in self.enum:
             if value.name == value_name:
@@ -160,22 +196,32 @@ class TypeValueInfo(namedtuple('TypeValueInfo', ('name', 'value', 'comment'))):
 
 class MessageList(namedtuple('MessageList', ('messages'))):
     def __str__(self):
-        s = 'MESSAGE_TYPES = {\n'
-        last_group_name = None
-        for message in sorted(
+        # message types are built on demand, by their factory function (see
+        # `fitdecode.types.LazyMapping`)
+        messages = sorted(
             self.messages,
             key=lambda mi: (
                 0 if mi.group_name.lower().startswith('common') else 1,
                 mi.group_name.lower(), mi.num,
             ),
-        ):
+        )
+        s = ''
+        last_group_name = None
+        for message in messages:
             # Group name comment
             if message.group_name != last_group_name:
-                if last_group_name is not None:
-                    s += '\n\n'
-                s += "%s\n" % header(message.group_name, 4)
+                s += "%s\n\n" % header(message.group_name)
                 last_group_name = message.group_name
-            s += "    %s: %s,\n" % (message.num, indent(message))
+            s += "def %s():\n    return %s\n\n\n" % (
+                message.factory_name, indent(message))
+        s += 'MESSAGE_TYPES = LazyMapping({\n'
+        for message in messages:
+            s += "    %s: %s,\n" % (message.num, message.factory_name)
+        s += '})\n\n\n'
+        s += '#: global message numbers, by message name\n'
+        s += 'MESG_NUMS = {\n'
+        for message in messages:
+            s += "    '%s': %s,\n" % (message.name, message.num)
         s += '}'
         return s
 
@@ -197,6 +243,10 @@ class MessageList(namedtuple('MessageList', ('messages'))):
 
 
 class MessageInfo(namedtuple('MessageInfo', ('name', 'num', 'group_name', 'fields', 'comment'))):
+    @property
+    def factory_name(self):
+        return '_mesg_%s' % scrub_symbol_name(self.name)
+
     def get(self, field_name):
         for field in self.fields:
             if field.name == field_name:
@@ -587,7 +637,7 @@ def main(input_xls_or_zip, output_py_path=None):
 
         field_num_declarations.append(field_decl)
 
-    output = '\n'.join([
+    header_lines = '\n'.join([
         "\n%s" % PROFILE_HEADER_FIRST_PART,
         header('EXPORTED PROFILE FROM %s ON %s' % (
             ('SDK VERSION %s' % profile_version) if profile_version else 'SPREADSHEET',
@@ -597,15 +647,11 @@ def main(input_xls_or_zip, output_py_path=None):
             len(type_list.types), sum(len(ti.enum) for ti in type_list.types),
             len(message_list.messages), sum(len(mi.fields) for mi in message_list.messages),
         )),
-        '', IMPORT_HEADER
-    ]) + '\n'
-
-    if mesg_num_declarations:
-        output += '\n\n' + '\n'.join(mesg_num_declarations) + '\n'
-    if field_num_declarations:
-        output += '\n\n' + '\n'.join(field_num_declarations) + '\n'
+        ''])
 
-    output += '\n\n' + '\n'.join([
+    # the Python definitions of the types (profile_defs.py)
+    defs_output = header_lines + '\n' + IMPORT_HEADER + '\n'
+    defs_output += '\n\n' + '\n'.join([
         str(type_list), '\n',
         SPECIAL_FIELD_DECLARATIONS, '\n',
         str(message_list), ''
@@ -614,13 +660,40 @@ def main(input_xls_or_zip, output_py_path=None):
     # TODO: Apply an additional layer of monkey patching to match reference/component
     # fields to actual field objects? Would clean up accesses to these
 
-    if output_py_path:
-        open(output_py_path, 'w').write(output)
-        print('Profile version %s written to %s' % (
-            profile_version if profile_version else '<unknown>',
-            output_py_path))
-    else:
-        print(output.strip())
+    if not output_py_path:
+        print(defs_output.strip())
+        return
+
+    output_dir = os.path.dirname(os.path.abspath(output_py_path))
+    defs_path = os.path.join(output_dir, 'profile_defs.py')
+    tables_path = os.path.join(output_dir, 'profile.bin')
+
+    open(defs_path, 'w').write(defs_output)
+
+    # the binary tables of the types (profile.bin), serialized from the
+    # objects of the module that has just been written
+    spec = importlib.util.spec_from_file_location(
+        'fitdecode.profile_defs', defs_path)
+    defs = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(defs)
+
+    tables, tables_crc = profile_bin.dump(
+        defs.FIELD_TYPES, defs.MESSAGE_TYPES, defs.FIELD_TYPE_TIMESTAMP)
+    open(tables_path, 'wb').write(tables)
+
+    # the module that loads them (profile.py)
+    output = header_lines + '\n' + LOADER_IMPORT_HEADER + '\n'
+    if mesg_num_declarations:
+        output += '\n\n' + '\n'.join(mesg_num_declarations) + '\n'
+    if field_num_declarations:
+        output += '\n\n' + '\n'.join(field_num_declarations) + '\n'
+    output += '\n\n' + (LOADER % tables_crc) + '\n'
+
+    open(output_py_path, 'w').write(output)
+
+    print('Profile version %s written to %s, %s and %s' % (
+        profile_version if profile_version else '<unknown>',
+        output_py_path, defs_path, tables_path))
 
 
 if __name__ == '__main__':